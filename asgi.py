@@ -0,0 +1,15 @@
+# Async entry point - the list and detail reads run on SQLAlchemy's AsyncSession
+# (asyncpg for Postgres, aiosqlite for SQLite files), everything else is served
+# by the same Flask app as main.py on a thread pool:
+#
+#   uvicorn asgi:app --workers 4
+
+from main import create_app
+from controllers.async_controller import AsyncApp
+
+
+def create_asgi_app():
+    return AsyncApp(create_app())
+
+
+app = create_asgi_app()
@@ -0,0 +1,249 @@
+# Sync vs async serving benchmark for the read routes
+#
+# Starts the app twice on local ports - gunicorn sync workers running
+# main:create_app(), then uvicorn workers running asgi:app - and drives the
+# read routes through each one from an asyncio client holding --concurrency
+# connections open. Writes requests/sec and p50/p95/p99 latency per route and
+# mode to a JSON file. Point DATABASE_URI at a local Postgres (or a SQLite
+# file) before running:
+#
+#   DATABASE_URI=postgresql+psycopg2://localhost/recordstore \
+#       python benchmarks/async_benchmark.py --scale 100000 --workers 4 --concurrency 256
+#
+# Without --skip-generate a synthetic catalogue is generated first, as in route_benchmark.py.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import create_app  # noqa: E402
+from init import db  # noqa: E402
+from models.customers import Customers  # noqa: E402
+from models.suppliers import Suppliers  # noqa: E402
+from models.records import Records  # noqa: E402
+from models.inventory import Inventory  # noqa: E402
+from models.orders import Orders  # noqa: E402
+from utils.synthetic import generate_catalogue  # noqa: E402
+from benchmarks.route_benchmark import build_routes, git_commit, id_range, percentile, sample_artists  # noqa: E402
+
+# Routes asgi.py serves on async sessions
+ASYNC_ROUTES = (
+    "records.list", "records.get", "records.artist", "records.genre",
+    "inventory.list", "inventory.get", "inventory.filter_by_supplier_id",
+    "orders.list", "orders.filter_by_customer_id", "customers.get", "suppliers.list",
+)
+
+SERVERS = {
+    "sync": lambda port, workers: [
+        sys.executable, "-m", "gunicorn", "--workers", str(workers), "--worker-class", "sync",
+        "--bind", f"127.0.0.1:{port}", "--log-level", "warning", "main:create_app()",
+    ],
+    "async": lambda port, workers: [
+        sys.executable, "-m", "uvicorn", "asgi:app", "--workers", str(workers),
+        "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log",
+    ],
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server did not listen on port {port} within {timeout}s")
+
+
+class Connection:
+    # One keep-alive HTTP/1.1 connection; reopened when the server closes it
+    # (gunicorn sync workers close after every response)
+    def __init__(self, port):
+        self.port = port
+        self.reader = self.writer = None
+
+    async def get(self, path):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        self.writer.write(f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1:{self.port}\r\n\r\n".encode())
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length = None
+        close = False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and value.strip().lower() == "close":
+                close = True
+
+        if length is None:
+            await self.reader.read()
+            close = True
+        else:
+            await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def run_route(port, make_path, requests, concurrency, seed):
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def client(index):
+        nonlocal remaining, errors
+        rng = random.Random(seed * 1000 + index)
+        connection = Connection(port)
+        try:
+            while remaining > 0:
+                remaining -= 1
+                path = make_path(rng)
+                started = time.perf_counter()
+                try:
+                    status = await connection.get(path)
+                except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                    connection.close()
+                    status = 599
+                latencies.append(time.perf_counter() - started)
+                if status >= 400:
+                    errors += 1
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(index) for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+def benchmark_mode(mode, routes, args):
+    port = free_port()
+    # The response cache would turn the detail routes into in-memory lookups in sync mode only
+    env = {**os.environ, "CACHE_BACKEND": "none", "METRICS_ENABLED": "false"}
+    process = subprocess.Popen(SERVERS[mode](port, args.workers), cwd=ROOT, env=env)
+    results = {}
+    try:
+        wait_for_port(port, process)
+        for index, (name, make_path) in enumerate(routes.items()):
+            if args.warmup:
+                asyncio.run(run_route(port, make_path, args.warmup, min(args.concurrency, args.warmup), args.seed + index + 10000))
+            results[name] = asyncio.run(run_route(port, make_path, args.requests, args.concurrency, args.seed + index))
+            result = results[name]
+            print(f"{mode:5} {name:32} {result['requests_per_second']:>9} req/s  p50 {result['p50_ms']:>8}ms  "
+                  f"p95 {result['p95_ms']:>8}ms  p99 {result['p99_ms']:>8}ms  errors {result['errors']}")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync (gunicorn) vs async (uvicorn) serving benchmark for the read routes")
+    parser.add_argument("--scale", type=int, default=10000, help="records in the synthetic catalogue (orders = 2x, inventory = 1.5x)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the catalogue and the request mix")
+    parser.add_argument("--skip-generate", action="store_true", help="benchmark the data already in the database")
+    parser.add_argument("--workers", type=int, default=4, help="server worker processes in both modes")
+    parser.add_argument("--concurrency", type=int, default=256, help="connections held open by the client")
+    parser.add_argument("--requests", type=int, default=5000, help="requests per route and mode")
+    parser.add_argument("--warmup", type=int, default=100, help="untimed requests per route and mode first")
+    parser.add_argument("--modes", default="sync,async", help="comma separated modes to run")
+    parser.add_argument("--routes", default="", help="comma separated route name prefixes, e.g. orders,records.get")
+    parser.add_argument("--output", default="async-benchmark-results.json", help="JSON results file")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        generated = None
+        if not args.skip_generate:
+            generated = generate_catalogue(args.scale, seed=args.seed)
+            print(f"generated {generated['rows']} rows in {generated['seconds']}s")
+
+        ids = {
+            "records": id_range(Records),
+            "inventory": id_range(Inventory),
+            "orders": id_range(Orders),
+            "customers": id_range(Customers),
+            "suppliers": id_range(Suppliers),
+        }
+        artists = sample_artists(50)
+        dialect = db.engine.dialect.name
+        db.engine.dispose()
+
+    routes = {name: route for name, route in build_routes(ids, artists).items() if name in ASYNC_ROUTES}
+    prefixes = [prefix.strip() for prefix in args.routes.split(",") if prefix.strip()]
+    if prefixes:
+        routes = {name: route for name, route in routes.items() if any(name.startswith(prefix) for prefix in prefixes)}
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    results = {mode: benchmark_mode(mode, routes, args) for mode in modes}
+
+    if "sync" in results and "async" in results:
+        print(f"\n{'route':32} {'req/s sync':>11} {'async':>9} {'p99 ms sync':>12} {'async':>9}")
+        for name in routes:
+            sync, async_ = results["sync"][name], results["async"][name]
+            print(f"{name:32} {sync['requests_per_second']:>11} {async_['requests_per_second']:>9} {sync['p99_ms']:>12} {async_['p99_ms']:>9}")
+
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "database": dialect,
+            "scale": args.scale,
+            "generated": {table: result["rows"] for table, result in generated["tables"].items()} if generated else None,
+            "seed": args.seed,
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "requests_per_route": args.requests,
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "modes": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(output, file, indent=2, sort_keys=True)
+        file.write("\n")
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# Concurrent checkout benchmark for POST /orders/place
+#
+# Runs N parallel clients placing multi-line orders against a small, hot
+# catalogue and reports orders/sec plus an oversell check. Point DATABASE_URI
+# at a local Postgres (or a SQLite file) before running:
+#
+#   DATABASE_URI=postgresql+psycopg2://localhost/recordstore_bench \
+#       python benchmarks/checkout_benchmark.py --clients 16 --orders 5000
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app  # noqa: E402
+from init import db  # noqa: E402
+from models.inventory import Inventory  # noqa: E402
+
+
+def setup_catalogue(client, records, suppliers, stock):
+    # A few records with inventory from several suppliers, so checkouts contend on the same rows
+    suffix = int(time.time())
+    supplier_ids = []
+    for index in range(suppliers):
+        response = client.post("/suppliers/", json={
+            "name": f"bench-supplier-{suffix}-{index}",
+            "email": f"bench-supplier-{suffix}-{index}@example.com",
+            "phone_number": 400000000 + index,
+        })
+        supplier_ids.append(response.get_json()["supplier_id"])
+
+    response = client.post("/records/bulk", json=[
+        {"title": f"Bench Record {index}", "artist": "Bench Artist", "genre": "bench", "price": 10}
+        for index in range(records)
+    ])
+    record_ids = [result["record_id"] for result in response.get_json()["results"]]
+
+    client.post("/inventory/bulk", json=[
+        {"supplier_id": supplier_id, "record_id": record_id, "stock_quantity": stock, "price": 10}
+        for record_id in record_ids
+        for supplier_id in supplier_ids
+    ])
+    return record_ids
+
+
+def total_stock(app, record_ids):
+    with app.app_context():
+        stmt = db.select(db.func.sum(Inventory.stock_quantity)).where(Inventory.record_id.in_(record_ids))
+        return db.session.scalar(stmt) or 0
+
+
+def run_client(app, record_ids, orders, results):
+    client = app.test_client()
+    placed = rejected = units = 0
+    latencies = []
+    for _ in range(orders):
+        lines = [
+            {"record_id": record_id, "quantity": random.randint(1, 3)}
+            for record_id in random.sample(record_ids, random.randint(1, min(3, len(record_ids))))
+        ]
+        started = time.perf_counter()
+        response = client.post("/orders/place", json={"lines": lines})
+        latencies.append(time.perf_counter() - started)
+        if response.status_code == 201:
+            placed += 1
+            units += sum(line["quantity"] for line in lines)
+        else:
+            rejected += 1
+    results.append((placed, rejected, units, latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent checkout benchmark for POST /orders/place")
+    parser.add_argument("--clients", type=int, default=8, help="parallel clients")
+    parser.add_argument("--orders", type=int, default=2000, help="orders placed in total")
+    parser.add_argument("--records", type=int, default=5, help="records in the hot catalogue")
+    parser.add_argument("--suppliers", type=int, default=3, help="inventory rows per record")
+    parser.add_argument("--stock", type=int, default=1000, help="initial stock per inventory row")
+    args = parser.parse_args()
+
+    app = create_app()
+    record_ids = setup_catalogue(app.test_client(), args.records, args.suppliers, args.stock)
+    stock_before = total_stock(app, record_ids)
+
+    results = []
+    per_client = args.orders // args.clients
+    threads = [
+        threading.Thread(target=run_client, args=(app, record_ids, per_client, results))
+        for _ in range(args.clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    placed = sum(result[0] for result in results)
+    rejected = sum(result[1] for result in results)
+    units = sum(result[2] for result in results)
+    latencies = sorted(latency for result in results for latency in result[3])
+    stock_after = total_stock(app, record_ids)
+
+    print(f"clients:        {args.clients}")
+    print(f"orders placed:  {placed} ({rejected} rejected)")
+    print(f"elapsed:        {elapsed:.2f}s")
+    print(f"orders/sec:     {placed / elapsed:.1f}")
+    print(f"p50 / p99:      {latencies[len(latencies) // 2] * 1000:.1f}ms / {latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms")
+    print(f"stock check:    {stock_before} - {units} = {stock_before - units}, found {stock_after}")
+
+    if stock_before - units != stock_after or stock_after < 0:
+        print("OVERSOLD: stock does not match the units ordered")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
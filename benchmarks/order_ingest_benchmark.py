@@ -0,0 +1,100 @@
+# Order ingestion benchmark for POST /orders
+#
+# Runs N parallel clients posting single orders, the way POS terminals do,
+# first with a commit per request and then with ORDER_GROUP_COMMIT coalescing
+# them. Reports orders/sec and latency for each and checks that every request
+# got its own order_id. Point DATABASE_URI at a local Postgres (or a SQLite
+# file) before running:
+#
+#   DATABASE_URI=postgresql+psycopg2://localhost/recordstore_bench \
+#       python benchmarks/order_ingest_benchmark.py --clients 32 --orders 10000
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app  # noqa: E402
+from init import db  # noqa: E402
+from models.orders import Orders  # noqa: E402
+
+
+def setup_records(client, records):
+    response = client.post("/records/bulk", json=[
+        {"title": f"Bench Record {index}", "artist": "Bench Artist", "genre": "bench", "price": 10}
+        for index in range(records)
+    ])
+    return [result["record_id"] for result in response.get_json()["results"]]
+
+
+def run_client(app, record_ids, orders, results):
+    client = app.test_client()
+    order_ids = []
+    failed = 0
+    latencies = []
+    for _ in range(orders):
+        started = time.perf_counter()
+        response = client.post("/orders/", json={"record_id": random.choice(record_ids), "order_date": "2026-10-18"})
+        latencies.append(time.perf_counter() - started)
+        if response.status_code == 201:
+            order_ids.append(response.get_json()["order_id"])
+        else:
+            failed += 1
+    results.append((order_ids, failed, latencies))
+
+
+def run_mode(app, group_commit, record_ids, clients, orders):
+    app.config["ORDER_GROUP_COMMIT"] = group_commit
+    results = []
+    threads = [
+        threading.Thread(target=run_client, args=(app, record_ids, orders // clients, results))
+        for _ in range(clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    order_ids = [order_id for result in results for order_id in result[0]]
+    failed = sum(result[1] for result in results)
+    latencies = sorted(latency for result in results for latency in result[2])
+    with app.app_context():
+        stored = db.session.scalar(db.select(db.func.count()).select_from(Orders).where(Orders.order_id.in_(order_ids))) if order_ids else 0
+
+    label = "group commit" if group_commit else "per-request commit"
+    print(f"{label}:")
+    print(f"  orders created: {len(order_ids)} ({failed} failed)")
+    print(f"  elapsed:        {elapsed:.2f}s")
+    print(f"  orders/sec:     {len(order_ids) / elapsed:.1f}")
+    print(f"  p50 / p99:      {latencies[len(latencies) // 2] * 1000:.1f}ms / {latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms")
+    print(f"  id check:       {len(set(order_ids))} distinct ids, {stored} rows found")
+    return len(order_ids) / elapsed, len(set(order_ids)) == len(order_ids) == stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Order ingestion benchmark for POST /orders")
+    parser.add_argument("--clients", type=int, default=16, help="parallel clients")
+    parser.add_argument("--orders", type=int, default=4000, help="orders created per mode")
+    parser.add_argument("--records", type=int, default=100, help="records the orders are for")
+    args = parser.parse_args()
+
+    app = create_app()
+    record_ids = setup_records(app.test_client(), args.records)
+
+    baseline, baseline_ok = run_mode(app, False, record_ids, args.clients, args.orders)
+    grouped, grouped_ok = run_mode(app, True, record_ids, args.clients, args.orders)
+    print(f"speedup:          {grouped / baseline:.2f}x")
+
+    if not (baseline_ok and grouped_ok):
+        print("MISMATCH: order ids are not distinct or not all stored")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+# Latency and throughput benchmark for the read routes
+#
+# Generates a synthetic catalogue (unless --skip-generate), then drives each
+# route with parallel clients, either in-process through the Flask test client
+# or over HTTP against a threaded local server, and writes p50/p95/p99 latency
+# and requests/sec per route to a JSON file that can be diffed across commits.
+# Point DATABASE_URI at a local Postgres (or a SQLite file) before running:
+#
+#   DATABASE_URI=sqlite:////tmp/recordstore_bench.sqlite3 \
+#       python benchmarks/route_benchmark.py --scale 100000 --threads 8 --output bench.json
+#
+#   python benchmarks/route_benchmark.py --skip-generate --mode http --routes orders
+#
+# Compare two runs with --compare old.json new.json.
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import create_app  # noqa: E402
+from init import db  # noqa: E402
+from models.customers import Customers  # noqa: E402
+from models.suppliers import Suppliers  # noqa: E402
+from models.records import Records  # noqa: E402
+from models.inventory import Inventory  # noqa: E402
+from models.orders import Orders  # noqa: E402
+from utils.synthetic import generate_catalogue, GENRES, TITLE_WORDS  # noqa: E402
+
+
+def id_range(model):
+    pk_column = model.__mapper__.primary_key[0]
+    low, high = db.session.execute(db.select(db.func.min(pk_column), db.func.max(pk_column))).one()
+    return (low or 1, high or 1)
+
+
+def sample_artists(count):
+    return db.session.scalars(db.select(Records.artist).distinct().limit(count)).all() or ["Nobody"]
+
+
+def build_routes(ids, artists):
+    # Each route is a function of a random.Random returning the path to request
+    def rand_id(rng, table):
+        return rng.randint(*ids[table])
+
+    def date_range(rng):
+        start = f"{rng.randint(2023, 2025)}-{rng.randint(1, 12):02d}-01"
+        return f"from={start}&to={start[:8]}28"
+
+    return {
+        "records.list": lambda rng: "/records/?limit=100",
+        "records.get": lambda rng: f"/records/{rand_id(rng, 'records')}",
+        "records.search": lambda rng: f"/records/search?q={rng.choice(TITLE_WORDS)}",
+        "records.artist": lambda rng: f"/records/artist/{urllib.parse.quote(rng.choice(artists))}",
+        "records.genre": lambda rng: f"/records/genre/{rng.choice(GENRES)}?limit=100",
+        "inventory.list": lambda rng: "/inventory/?limit=100",
+        "inventory.get": lambda rng: f"/inventory/{rand_id(rng, 'inventory')}",
+        "inventory.filter_by_supplier_id": lambda rng: f"/inventory/filter_by_supplier_id?supplier_id={rand_id(rng, 'suppliers')}&limit=100",
+        "inventory.summary": lambda rng: f"/inventory/summary?group_by={rng.choice(['supplier', 'genre'])}",
+        "orders.list": lambda rng: f"/orders/?{date_range(rng)}&limit=100",
+        "orders.get": lambda rng: f"/orders/{rand_id(rng, 'orders')}?expand=record,customer",
+        "orders.filter_by_customer_id": lambda rng: f"/orders/filter_by_customer_id?customer_id={rand_id(rng, 'customers')}&{date_range(rng)}",
+        "customers.get": lambda rng: f"/customers/{rand_id(rng, 'customers')}",
+        "suppliers.list": lambda rng: "/suppliers/",
+        "reports.sales": lambda rng: f"/reports/sales?group_by={rng.choice(['day', 'genre', 'artist'])}&{date_range(rng)}",
+    }
+
+
+class TestClientDriver:
+    def __init__(self, app):
+        self.app = app
+
+    def session(self):
+        client = self.app.test_client()
+
+        def get(path):
+            response = client.get(path)
+            response.close()
+            return response.status_code
+        return get
+
+    def close(self):
+        pass
+
+
+class HTTPDriver:
+    # Threaded werkzeug server on a free local port
+    def __init__(self, app):
+        from werkzeug.serving import make_server  # type: ignore
+        # No access log line per request
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        self.server = make_server("127.0.0.1", 0, app, threaded=True)
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def session(self):
+        def get(path):
+            try:
+                with urllib.request.urlopen(self.base + path, timeout=60) as response:
+                    response.read()
+                    return response.status
+            except urllib.error.HTTPError as err:
+                return err.code
+        return get
+
+    def close(self):
+        self.server.shutdown()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    return round(sorted_values[index] * 1000, 3)
+
+
+def run_route(driver, make_path, requests, threads, seed):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker(worker_index, count):
+        rng = random.Random(seed * 1000 + worker_index)
+        get = driver.session()
+        local = []
+        local_errors = 0
+        for _ in range(count):
+            path = make_path(rng)
+            started = time.perf_counter()
+            status = get(path)
+            local.append(time.perf_counter() - started)
+            if status >= 400:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    per_thread = [requests // threads + (1 if index < requests % threads else 0) for index in range(threads)]
+    workers = [threading.Thread(target=worker, args=(index, count)) for index, count in enumerate(per_thread)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "requests_per_second": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+        "p50_ms": percentile(latencies, 0.50),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path, new_path):
+    with open(old_path) as file:
+        old = json.load(file)["routes"]
+    with open(new_path) as file:
+        new = json.load(file)["routes"]
+
+    print(f"{'route':36} {'p50 ms':>18} {'p99 ms':>18} {'req/s':>18}")
+    for route in sorted(set(old) & set(new)):
+        cells = []
+        for key in ("p50_ms", "p99_ms", "requests_per_second"):
+            before, after = old[route][key], new[route][key]
+            change = f"{(after - before) / before * 100:+.0f}%" if before else ""
+            cells.append(f"{after:>10} {change:>7}")
+        print(f"{route:36} {' '.join(cells)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency and throughput benchmark for the read routes")
+    parser.add_argument("--scale", type=int, default=10000, help="records in the synthetic catalogue (orders = 2x, inventory = 1.5x)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the catalogue and the request mix")
+    parser.add_argument("--skip-generate", action="store_true", help="benchmark the data already in the database")
+    parser.add_argument("--workers", type=int, default=4, help="parallel loaders for the catalogue (Postgres only)")
+    parser.add_argument("--mode", choices=["testclient", "http"], default="testclient")
+    parser.add_argument("--threads", type=int, default=4, help="parallel clients per route")
+    parser.add_argument("--requests", type=int, default=500, help="requests per route")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed requests per route first")
+    parser.add_argument("--routes", default="", help="comma separated route name prefixes, e.g. orders,records.get")
+    parser.add_argument("--output", default="benchmark-results.json", help="JSON results file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="print the change between two results files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    app = create_app()
+    with app.app_context():
+        generated = None
+        if not args.skip_generate:
+            generated = generate_catalogue(args.scale, seed=args.seed, workers=args.workers)
+            print(f"generated {generated['rows']} rows in {generated['seconds']}s")
+
+        ids = {
+            "records": id_range(Records),
+            "inventory": id_range(Inventory),
+            "orders": id_range(Orders),
+            "customers": id_range(Customers),
+            "suppliers": id_range(Suppliers),
+        }
+        artists = sample_artists(50)
+        dialect = db.engine.dialect.name
+
+    routes = build_routes(ids, artists)
+    prefixes = [prefix.strip() for prefix in args.routes.split(",") if prefix.strip()]
+    if prefixes:
+        routes = {name: route for name, route in routes.items() if any(name.startswith(prefix) for prefix in prefixes)}
+
+    driver = HTTPDriver(app) if args.mode == "http" else TestClientDriver(app)
+    results = {}
+    try:
+        for index, (name, make_path) in enumerate(routes.items()):
+            if args.warmup:
+                run_route(driver, make_path, args.warmup, 1, args.seed + index + 10000)
+            results[name] = run_route(driver, make_path, args.requests, args.threads, args.seed + index)
+            result = results[name]
+            print(f"{name:36} {result['requests_per_second']:>9} req/s  p50 {result['p50_ms']:>8}ms  "
+                  f"p95 {result['p95_ms']:>8}ms  p99 {result['p99_ms']:>8}ms  errors {result['errors']}")
+    finally:
+        driver.close()
+
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "database": dialect,
+            "mode": args.mode,
+            "scale": args.scale,
+            "generated": {table: result["rows"] for table, result in generated["tables"].items()} if generated else None,
+            "seed": args.seed,
+            "threads": args.threads,
+            "requests_per_route": args.requests,
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "routes": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(output, file, indent=2, sort_keys=True)
+        file.write("\n")
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
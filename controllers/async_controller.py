@@ -0,0 +1,213 @@
+import time
+from urllib.parse import parse_qsl, quote
+from a2wsgi import WSGIMiddleware  # type: ignore
+from sqlalchemy import select  # type: ignore
+from sqlalchemy.ext.asyncio import async_sessionmaker  # type: ignore
+from werkzeug.datastructures import Headers, MultiDict  # type: ignore
+from werkzeug.exceptions import HTTPException  # type: ignore
+from werkzeug.http import parse_cookie, parse_etags, quote_etag  # type: ignore
+from werkzeug.routing import Map, Rule, RequestRedirect  # type: ignore
+from models.records import Records, records_schema, record_schema
+from models.customers import Customers, customers_schema, customer_schema
+from models.suppliers import Suppliers, suppliers_schema, supplier_schema
+from models.orders import Orders, orders_schema, order_schema
+from models.inventory import Inventory, inventory_schema_many, inventory_schema
+from utils.database import STICKY_COOKIE, create_async_engines
+from utils.dates import get_date_range_args, filter_date_range
+from utils.errors import QueryArgumentError
+from utils.pagination import get_page_args, next_page_url
+from utils.query import filter_query, list_query, encode_cursor
+from utils.search import contains
+from utils.serialize import column_select
+from utils.versions import versions_select, version_etag
+
+# Query arguments only the Flask views handle (expanded rows, NDJSON streaming, cached totals)
+SYNC_ONLY_ARGS = ("expand", "stream", "count")
+
+# model, list schema, single row schema, message for a missing row - per resource
+RESOURCES = {
+    "records": (Records, records_schema, record_schema, "Record with id {} does not exist"),
+    "customers": (Customers, customers_schema, customer_schema, "Customer with id {} does not exist"),
+    "suppliers": (Suppliers, suppliers_schema, supplier_schema, "Supplier with id {} does not exist"),
+    "orders": (Orders, orders_schema, order_schema, "Order with id {} does not exist"),
+    "inventory": (Inventory, inventory_schema_many, inventory_schema, "Inventory item with id {} does not exist"),
+}
+
+# The read routes served on async sessions; the endpoint names the handler and the tables its ETag covers
+url_map = Map([
+    Rule("/records/", endpoint=("list_rows", "records")),
+    Rule("/records/<int:pk>", endpoint=("get_row", "records")),
+    Rule("/records/artist/<string:term>", endpoint=("records_matching", "records")),
+    Rule("/records/genre/<string:term>", endpoint=("records_matching", "records")),
+    Rule("/customers/", endpoint=("list_rows", "customers")),
+    Rule("/customers/<int:pk>", endpoint=("get_row", "customers")),
+    Rule("/suppliers/", endpoint=("list_rows", "suppliers")),
+    Rule("/suppliers/<int:pk>", endpoint=("get_row", "suppliers")),
+    Rule("/orders/", endpoint=("list_orders", "orders")),
+    Rule("/orders/<int:pk>", endpoint=("get_row", "orders")),
+    Rule("/orders/filter_by_customer_id", endpoint=("orders_by_customer", "orders", "customers")),
+    Rule("/inventory/", endpoint=("list_rows", "inventory")),
+    Rule("/inventory/<int:pk>", endpoint=("get_row", "inventory")),
+    Rule("/inventory/filter_by_supplier_id", endpoint=("inventory_by_supplier", "inventory", "suppliers")),
+])
+
+
+class AsyncRequest:
+    # What the async routes read from an ASGI request, named as on Flask's request
+    def __init__(self, scope):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        query_string = scope["query_string"].decode("latin1")
+        self.args = MultiDict(parse_qsl(query_string, keep_blank_values=True))
+        self.headers = Headers([(name.decode("latin1"), value.decode("latin1")) for name, value in scope["headers"]])
+        self.cookies = parse_cookie(self.headers.get("Cookie", ""))
+        host = self.headers.get("Host") or "{}:{}".format(*scope.get("server") or ("localhost", 80))
+        self.base_url = f"{scope.get('scheme', 'http')}://{host}{scope.get('root_path', '')}{quote(self.path)}"
+        self.full_path = f"{self.path}?{query_string}"
+
+
+class JSONResult:
+    def __init__(self, data, status=200, headers=None):
+        self.data = data
+        self.status = status
+        self.headers = headers or {}
+
+
+class AsyncApp:
+    # ASGI application serving the list and detail reads of the five resources
+    # with AsyncSession. Writes, search, reports, exports, expanded and streamed
+    # responses - anything not in url_map - go to the Flask app on a thread pool.
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.json = flask_app.json
+        self.wsgi = WSGIMiddleware(flask_app, workers=flask_app.config["ASYNC_WSGI_THREADS"])
+        self.primary, self.replica = create_async_engines(flask_app.config)
+        self.sessions = {
+            "primary": async_sessionmaker(self.primary, expire_on_commit=False),
+            "replica": async_sessionmaker(self.replica, expire_on_commit=False),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+
+        route = None
+        if scope["type"] == "http" and scope["method"] == "GET":
+            request = AsyncRequest(scope)
+            if not any(name in request.args for name in SYNC_ONLY_ARGS):
+                try:
+                    route = url_map.bind("localhost").match(request.path, method="GET")
+                except (HTTPException, RequestRedirect):
+                    route = None
+
+        if route is None:
+            return await self.wsgi(scope, receive, send)
+        await self.respond(send, await self.dispatch(request, *route))
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.primary.dispose()
+                await self.replica.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def dispatch(self, request, endpoint, values):
+        handler_name, *read_tables = endpoint
+        # Same stickiness as the sync app: a client that just wrote reads from the primary
+        sticky = (request.cookies.get(STICKY_COOKIE, type=float) or 0) > time.time()
+        async with self.sessions["primary" if sticky else "replica"]() as session:
+            # Same strong ETag as utils.versions.conditional
+            versions = dict((await session.execute(versions_select(read_tables))).all())
+            etag = version_etag(read_tables, [versions.get(table_name, 0) for table_name in read_tables], request.full_path)
+            if parse_etags(request.headers.get("If-None-Match")).contains(etag):
+                return JSONResult(None, 304, {"ETag": quote_etag(etag)})
+
+            try:
+                result = await getattr(self, handler_name)(request, session, read_tables[0], **values)
+            except QueryArgumentError as err:
+                return JSONResult({"message": str(err)}, 400)
+        if result.status == 200:
+            result.headers["ETag"] = quote_etag(etag)
+        return result
+
+    async def respond(self, send, result):
+        body = b"" if result.data is None else self.json.dumps_compact(result.data) + b"\n"
+        headers = [("content-length", str(len(body)))]
+        if result.data is not None:
+            headers.append(("content-type", "application/json"))
+        headers.extend((name.lower(), value) for name, value in result.headers.items())
+        await send({
+            "type": "http.response.start",
+            "status": result.status,
+            "headers": [(name.encode("latin1"), value.encode("latin1")) for name, value in headers],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def list_rows(self, request, session, resource, stmt=None):
+        # Keyset page of column tuples, as utils.pagination.paginate's fast path
+        model, schema, _, _ = RESOURCES[resource]
+        pk_column = getattr(model, model.__mapper__.primary_key[0].key)
+        _, limit = get_page_args(request.args)
+
+        stmt = filter_query(select(model) if stmt is None else stmt, pk_column, request.args)
+        stmt, schema, keys = list_query(stmt, pk_column, schema, request.args)
+        columns_stmt, to_dict = column_select(stmt, schema)
+
+        rows = (await session.execute(columns_stmt.add_columns(*(column for column, _ in keys)).limit(limit + 1))).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        headers = {}
+        if has_more:
+            next_cursor = encode_cursor(keys, list(rows[-1][-len(keys):]))
+            headers["X-Next-Cursor"] = str(next_cursor)
+            headers["Link"] = f'<{next_page_url(next_cursor, limit, request.base_url, request.args)}>; rel="next"'
+        return JSONResult([to_dict(row) for row in rows], headers=headers)
+
+    async def get_row(self, request, session, resource, pk):
+        model, _, schema, missing = RESOURCES[resource]
+        pk_column = model.__mapper__.primary_key[0]
+        columns_stmt, to_dict = column_select(select(model).where(pk_column == pk), schema)
+        row = (await session.execute(columns_stmt)).first()
+        if row is None:
+            return JSONResult({"message": missing.format(pk)}, 404)
+        return JSONResult(to_dict(row))
+
+    async def records_matching(self, request, session, resource, term):
+        # /records/artist/<term> and /records/genre/<term>
+        column = Records.artist if request.path.startswith("/records/artist/") else Records.genre
+        # contains() looks up the search tables through the Flask app's engine, once per process
+        with self.flask_app.app_context():
+            condition = contains(column, term)
+        return await self.list_rows(request, session, resource, select(Records).filter(condition))
+
+    async def list_orders(self, request, session, resource):
+        start, end = get_date_range_args(request.args)
+        return await self.list_rows(request, session, resource, filter_date_range(select(Orders), Orders.order_date, start, end))
+
+    async def orders_by_customer(self, request, session, resource):
+        customer_id = request.args.get("customer_id", type=int)
+        if not customer_id:
+            return JSONResult({"message": "Customer ID is required."}, 400)
+        start, end = get_date_range_args(request.args)
+
+        if await session.get(Customers, customer_id) is None:
+            return JSONResult({"message": f"No customer found with id {customer_id}"}, 404)
+
+        stmt = filter_date_range(select(Orders).filter_by(customer_id=customer_id), Orders.order_date, start, end)
+        return await self.list_rows(request, session, resource, stmt)
+
+    async def inventory_by_supplier(self, request, session, resource):
+        supplier_id = request.args.get("supplier_id", type=int)
+        if not supplier_id:
+            return JSONResult({"message": "Supplier number (ID) is required."}, 404)
+
+        if await session.get(Suppliers, supplier_id) is None:
+            return JSONResult({"message": f"No supplier found with id {supplier_id}"}, 404)
+
+        return await self.list_rows(request, session, resource, select(Inventory).filter_by(supplier_id=supplier_id))
@@ -1,13 +1,20 @@
+import os
+import click  # type: ignore
 from flask import Blueprint  # type: ignore
 from flask import Flask # type: ignore
 from flask_sqlalchemy import SQLAlchemy # type: ignore
-from init import db
+from init import db, cache
 from models.orders import Orders
 from models.customers import Customers
 from models.suppliers import Suppliers
 from models.records import Records
 from models.inventory import Inventory
-from datetime import datetime
+from datetime import datetime, date
+from utils.inventory_summary import rebuild as rebuild_inventory_summary
+from utils.customer_stats import rebuild as rebuild_customer_stats
+from utils.export import export_tables, EXPORT_TABLES, EXPORT_BATCH_SIZE
+from utils.synthetic import generate_catalogue, catalogue_sizes
+from utils.jobs import enqueue
 
 db_commands = Blueprint("db", __name__)
 
@@ -19,10 +26,25 @@ def create_tables():
 @db_commands.cli.command("drop")
 def drop_tables():
     db.drop_all()
+    # Recreated tables reuse the ids of the cached responses
+    cache.clear()
     print("Tables dropped")
 
 @db_commands.cli.command("seed")
-def seed_all_data():
+@click.option("--scale", type=int, default=None, help="Generate a synthetic catalogue of this many records instead of the sample rows.")
+@click.option("--workers", type=int, default=4, show_default=True, help="Parallel loaders (Postgres only).")
+@click.option("--random-seed", type=int, default=0, show_default=True, help="Same scale and seed give the same rows.")
+@click.option("--background", is_flag=True, help="Queue a seed job (--scale only) for the job workers instead.")
+def seed_all_data(scale, workers, random_seed, background):
+    if background:
+        if scale is None:
+            raise click.UsageError("--background needs --scale.")
+        queued(enqueue("seed", {"scale": scale, "workers": workers, "random_seed": random_seed}))
+        return
+    if scale is not None:
+        seed_synthetic_data(scale, workers, random_seed)
+        return
+
     # Create some sample customers
     customers = [
         Customers(name="customer1", email="customer1@email.com", phone_number="0412345678", address="201 smith st"),
@@ -55,8 +77,8 @@ def seed_all_data():
 
     # Create orders with proper date formatting
     orders = [
-        Orders(customer_id=1, record_id=1, order_date="09/06/22"),
-        Orders(customer_id=2, record_id=2, order_date="04/04/23")
+        Orders(customer_id=1, record_id=1, order_date=date(2022, 6, 9)),
+        Orders(customer_id=2, record_id=2, order_date=date(2023, 4, 4))
     ]
     db.session.add_all(orders)
     db.session.commit()
@@ -69,4 +91,63 @@ def seed_all_data():
     ]
     db.session.add_all(shipments)
     db.session.commit()
+    rebuild_inventory_summary()
+    rebuild_customer_stats()
     print("Inventory seeded")
+
+def queued(job):
+    print(f"Queued {job.kind} job {job.job_id}; progress at /jobs/{job.job_id}")
+
+def seed_synthetic_data(scale, workers, random_seed):
+    # Staging volumes - orders are 2x and inventory 1.5x the number of records
+    print(f"Seeding {scale} records: {catalogue_sizes(scale)}")
+    result = generate_catalogue(
+        scale,
+        seed=random_seed,
+        workers=workers,
+        progress=lambda table_name, stats: print(f"{table_name}: {stats['rows']} rows in {stats['seconds']}s ({stats['rows_per_second']} rows/sec)"),
+    )
+    print(f"Seeded {result['rows']} rows in {result['seconds']}s ({result['rows_per_second']} rows/sec)")
+
+@db_commands.cli.command("refresh-inventory-summary")
+@click.option("--background", is_flag=True, help="Queue a job for the job workers instead.")
+def refresh_inventory_summary(background):
+    # Recompute the inventory_summary table from scratch, e.g. before turning INVENTORY_SUMMARY_TABLE on
+    if background:
+        queued(enqueue("refresh_inventory_summary"))
+        return
+    rebuild_inventory_summary()
+    print("Inventory summary rebuilt")
+
+@db_commands.cli.command("refresh-customer-stats")
+@click.option("--background", is_flag=True, help="Queue a job for the job workers instead.")
+def refresh_customer_stats(background):
+    # Recompute the customer_stats tables from scratch, e.g. after seeding or before turning CUSTOMER_STATS_TABLE on
+    if background:
+        queued(enqueue("refresh_customer_stats"))
+        return
+    rebuild_customer_stats()
+    print("Customer stats rebuilt")
+
+@db_commands.cli.command("export")
+@click.option("--dest", default="exports", show_default=True, help="Directory the table datasets are written to.")
+@click.option("--format", "file_format", type=click.Choice(["parquet", "lance"]), default="parquet", show_default=True)
+@click.option("--tables", default=",".join(EXPORT_TABLES), show_default=True, help="Comma separated tables to export.")
+@click.option("--batch-size", type=int, default=EXPORT_BATCH_SIZE, show_default=True, help="Rows per Arrow record batch.")
+@click.option("--full", is_flag=True, help="Rewrite each table instead of appending rows past its watermark.")
+@click.option("--background", is_flag=True, help="Queue an export job for the job workers instead.")
+def export_data(dest, file_format, tables, batch_size, full, background):
+    # Columnar snapshot of the tables for analytics, appended to incrementally on each run
+    table_names = [name.strip() for name in tables.split(",") if name.strip()]
+    unknown = [name for name in table_names if name not in EXPORT_TABLES]
+    if unknown:
+        raise click.BadParameter(f"unknown tables: {', '.join(unknown)}", param_hint="--tables")
+
+    if background:
+        # An absolute path, as the worker may run from another directory
+        queued(enqueue("export", {"dest": os.path.abspath(dest), "tables": table_names, "format": file_format, "full": full, "batch_size": batch_size}))
+        return
+
+    results = export_tables(dest, table_names, file_format, full, batch_size)
+    for table_name, result in results.items():
+        print(f"{table_name}: {result['rows']} rows in {result['seconds']}s (watermark {result['watermark']})")
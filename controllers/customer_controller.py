@@ -1,32 +1,67 @@
 from flask import Blueprint, request  # type: ignore
 from sqlalchemy.exc import IntegrityError  # type: ignore
 from psycopg2 import errorcodes  # type: ignore
-from init import db
+from init import db, cache
 from models.customers import Customers, customers_schema, customer_schema
+from utils.pagination import paginate
+from utils.versions import conditional
+from utils.batch import batch_get, get_batch_ids
+from utils.database import read_only
+from utils.expand import expand
+from utils.deletes import delete_customer as delete_customer_rows
+from utils.jobs import submit_job, accepted
+from utils.customer_stats import customer_stats
 
 
 customers_bp = Blueprint("customers", __name__, url_prefix="/customers")
 
-# READ all - /customers - GET
+# READ all - /customers?after=<id>&limit=<n>&expand=orders,orders.record - GET
 @customers_bp.route("/")
+@conditional("customers")
 def get_customers():
-    stmt = db.select(Customers)
-    customers_list = db.session.scalars(stmt)
-    data = customers_schema.dump(customers_list)
-    return data
+    stmt, schema = expand(db.select(Customers), Customers, customers_schema, many=True)
+    return paginate(stmt, Customers.customer_id, schema)
+
+# Read many - /customers/batch?ids=1,2,3 - GET, or a JSON list of ids - POST
+@customers_bp.route("/batch", methods=["GET", "POST"])
+@read_only
+@conditional("customers")
+def get_customers_batch():
+    return batch_get(Customers, customer_schema, "customers")
 
 # Read one - /customers/id - GET
 @customers_bp.route("/<int:customer_id>", methods=["GET"])
+@conditional("customers")
+@cache.cached("customers", "customer_id")
 def get_customer(customer_id):
     stmt = db.select(Customers).filter_by(customer_id=customer_id)
+    stmt, schema = expand(stmt, Customers, customer_schema)
     customer = db.session.scalar(stmt)
     
     if customer:
-        data = customer_schema.dump(customer)
+        data = schema.dump(customer)
         return data
     else:
         return {"message": f"Customer with id {customer_id} does not exist"}, 404
 
+# Order count, lifetime spend, first/last order date and favourite genre - /customers/<id>/stats - GET
+@customers_bp.route("/<int:customer_id>/stats", methods=["GET"])
+@conditional("customers", "orders", "records")
+def get_customer_stats(customer_id):
+    stats = customer_stats([customer_id])
+    if customer_id not in stats:
+        return {"message": f"Customer with id {customer_id} does not exist"}, 404
+    return stats[customer_id]
+
+# Stats of many customers - /customers/stats/batch?ids=1,2,3 - GET, or a JSON list of ids - POST
+@customers_bp.route("/stats/batch", methods=["GET", "POST"])
+@read_only
+@conditional("customers", "orders", "records")
+def get_customer_stats_batch():
+    ids = get_batch_ids()
+    stats = customer_stats(list(dict.fromkeys(ids)))
+    return [stats.get(customer_id, {"customer_id": customer_id, "not_found": True}) for customer_id in ids]
+
 # CREATE - /customers - POST
 @customers_bp.route("/", methods=["POST"])
 def create_customer():
@@ -51,6 +86,7 @@ def create_customer():
         db.session.add(new_customer)
         # Commit to the database
         db.session.commit()
+        cache.invalidate("customers", new_customer.customer_id)
 
         # Return a response with the newly created customer
         return customer_schema.dump(new_customer), 201
@@ -69,17 +105,19 @@ def create_customer():
 @customers_bp.route("/<int:customer_id>", methods=["DELETE"])
 def delete_customer(customer_id):
     # Find the customer to be deleted using the id
-    stmt = db.select(Customers).filter_by(customer_id=customer_id)
-    customer = db.session.scalar(stmt)
+    name = db.session.scalar(db.select(Customers.name).filter_by(customer_id=customer_id))
     
     # If the customer exists
-    if customer:
-        # Delete the customer (this will automatically delete their orders due to cascade)
-        db.session.delete(customer)
-        db.session.commit()
+    if name is not None:
+        # ?mode=background deletes the orders in chunks in a background job
+        if request.args.get("mode") == "background":
+            return accepted(submit_job("delete", {"table": "customers", "id": customer_id}))
+
+        # Set-based deletes of the customer's orders and the customer
+        delete_customer_rows(customer_id)
 
         # Return a response with a confirmation message
-        return {"Message": f"Customer '{customer.name}' and their associated orders were deleted successfully."}
+        return {"Message": f"Customer '{name}' and their associated orders were deleted successfully."}
 
     # Else, return an error response if the customer does not exist
     else:
@@ -106,6 +144,7 @@ def update_customer(customer_id):
             
             # Commit changes
             db.session.commit()
+            cache.invalidate("customers", customer_id)
             
             # Return updated data
             return customer_schema.dump(customer)
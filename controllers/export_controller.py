@@ -0,0 +1,17 @@
+from flask import Blueprint, Response, request, stream_with_context  # type: ignore
+from utils.export import arrow_stream, EXPORT_TABLES
+
+# Define the blueprint for exports
+export_bp = Blueprint("export", __name__, url_prefix="/export")
+
+# Arrow stream of a table - /export/<table>?after=<id> - GET
+@export_bp.route("/<table_name>", methods=["GET"])
+def export_table(table_name):
+    model = EXPORT_TABLES.get(table_name)
+    if model is None:
+        return {"message": f"Table {table_name} cannot be exported."}, 404
+
+    # Only rows past the caller's last seen primary key, for incremental pulls
+    after = request.args.get("after", type=int)
+    body = stream_with_context(arrow_stream(model, after))
+    return Response(body, mimetype="application/vnd.apache.arrow.stream")
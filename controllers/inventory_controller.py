@@ -1,33 +1,50 @@
 from flask import Blueprint, request  # type: ignore
 from sqlalchemy.exc import IntegrityError  # type: ignore
 from psycopg2 import errorcodes  # type: ignore
-from init import db
+from init import db, cache
 from models.inventory import Inventory, inventory_schema, inventory_schema_many
 from models.suppliers import Suppliers
 from models.records import Records
 from flask import jsonify
+from utils.pagination import paginate
+from utils.bulk import get_bulk_rows, bulk_import
+from utils.jobs import submit_job, accepted
+from utils.versions import conditional
+from utils.batch import batch_get
+from utils.database import read_only
+from utils.expand import expand
+from utils.inventory_summary import inventory_summary, apply_change, snapshot, summary_enabled, GROUP_KEYS, LOW_STOCK_LIMIT
 
 # Define the blueprint for the inventory
 inventory_bp = Blueprint("inventory", __name__, url_prefix="/inventory")
 
-# READ all - /inventory - GET
+# READ all - /inventory?after=<id>&limit=<n>&expand=record,supplier - GET
 @inventory_bp.route("/", methods=["GET"])
+@conditional("inventory")
 def get_inventory():
-    stmt = db.select(Inventory)
-    inventory_list = db.session.scalars(stmt)
-    data = inventory_schema_many.dump(inventory_list)
-    return data
+    stmt, schema = expand(db.select(Inventory), Inventory, inventory_schema_many, many=True)
+    return paginate(stmt, Inventory.inventory_id, schema)
+
+# Read many - /inventory/batch?ids=1,2,3 - GET, or a JSON list of ids - POST
+@inventory_bp.route("/batch", methods=["GET", "POST"])
+@read_only
+@conditional("inventory")
+def get_inventory_batch():
+    return batch_get(Inventory, inventory_schema, "inventory")
 
 # READ one - /inventory/<id> - GET
 @inventory_bp.route("/<int:inventory_id>", methods=["GET"])
+@conditional("inventory")
+@cache.cached("inventory", "inventory_id")
 def get_inventory_item(inventory_id):
     # Correct filter to match the primary key in inventory
     stmt = db.select(Inventory).filter_by(inventory_id=inventory_id)
+    stmt, schema = expand(stmt, Inventory, inventory_schema)
     inventory_item = db.session.scalar(stmt)
 
     if inventory_item:
         # Serialize and return the inventory data
-        data = inventory_schema.dump(inventory_item)
+        data = schema.dump(inventory_item)
         return data
     else:
         # error message if inventory item not found
@@ -36,6 +53,7 @@ def get_inventory_item(inventory_id):
 
 # Filter inventory by supplier_id - /inventory/filter_by_supplier_id?supplier_id=<supplier_id> - GET
 @inventory_bp.route("/filter_by_supplier_id", methods=["GET"])
+@conditional("inventory", "suppliers")
 def get_inventory_by_supplier_id():
     supplier_id = request.args.get("supplier_id", type=int)
     
@@ -48,28 +66,31 @@ def get_inventory_by_supplier_id():
     if not supplier:
         return jsonify({"message": f"No supplier found with id {supplier_id}"}), 404
 
-    # Fetch the inventory items for the given supplier
+    # Fetch a page of inventory items for the given supplier
     stmt = db.select(Inventory).filter_by(supplier_id=supplier_id)
-    inventory_list = db.session.scalars(stmt)
-    
-    # Debugging - print the inventory list
-    print(f"Inventory List for Supplier ID {supplier_id}: {inventory_list}")
-
-    # If no inventory records are found
-    if not inventory_list:
-        return jsonify({"message": f"No inventory items found for supplier with id {supplier_id}"}), 404
-    
-    # Return the inventory data in JSON format
-    data = inventory_schema_many.dump(inventory_list)
-    return jsonify(data)
-
-    
-    # Return the inventory data in JSON format
-    data = inventory_schema_many.dump(inventory_list)
-    return jsonify(data)
-
-
-
+    stmt, schema = expand(stmt, Inventory, inventory_schema_many, many=True)
+    return paginate(stmt, Inventory.inventory_id, schema)
+
+# Inventory valuation and low stock - /inventory/summary?group_by=supplier|record|genre&low_stock=<n> - GET
+@inventory_bp.route("/summary", methods=["GET"])
+@conditional("inventory", "records")
+def get_inventory_summary():
+    group_by = request.args.get("group_by", "supplier")
+    if group_by not in GROUP_KEYS:
+        return {"message": "group_by must be one of supplier, record or genre."}, 400
+
+    # Totals are aggregated in SQL (or read from the summary table), never from ORM rows
+    data = inventory_summary(group_by, request.args.get("low_stock", type=int))
+
+    # The lowest-stocked SKUs, read through the stock_quantity index
+    stmt = (
+        db.select(Inventory)
+        .where(Inventory.stock_quantity < data["low_stock_threshold"])
+        .order_by(Inventory.stock_quantity, Inventory.inventory_id)
+        .limit(LOW_STOCK_LIMIT)
+    )
+    data["low_stock"] = inventory_schema_many.dump(db.session.scalars(stmt))
+    return data
 
 # CREATE - /inventory - POST
 @inventory_bp.route("/", methods=["POST"])
@@ -107,7 +128,9 @@ def create_inventory_item():
 
         # Add to the session and commit
         db.session.add(new_inventory_item)
+        apply_change(after=snapshot(new_inventory_item))
         db.session.commit()
+        cache.invalidate("inventory", new_inventory_item.inventory_id)
 
         # Return the created inventory item
         return inventory_schema.dump(new_inventory_item), 201
@@ -118,6 +141,16 @@ def create_inventory_item():
         else:
             return {"message": "An unexpected error occurred."}, 500
 
+# BULK CREATE/UPSERT - /inventory/bulk - POST
+@inventory_bp.route("/bulk", methods=["POST"])
+def bulk_create_inventory_items():
+    # Accepts a JSON array or NDJSON; rows with an inventory_id replace the existing item
+    rows = get_bulk_rows()
+    # ?mode=background writes the rows in chunks in a background job
+    if request.args.get("mode") == "background":
+        return accepted(submit_job("bulk_import", {"table": "inventory", "rows": rows}))
+    return bulk_import("inventory", rows)
+
 # DELETE - /inventory/id - DELETE
 @inventory_bp.route("/<int:inventory_id>", methods=["DELETE"])
 def delete_inventory_item(inventory_id):
@@ -128,8 +161,10 @@ def delete_inventory_item(inventory_id):
     # If the inventory item exists
     if inventory_item:
         # Delete the inventory item
+        apply_change(before=snapshot(inventory_item))
         db.session.delete(inventory_item)
         db.session.commit()
+        cache.invalidate("inventory", inventory_id)
         return {"Message": f"Inventory item '{inventory_id}' deleted successfully"}, 200
 
     # If the inventory item doesn't exist
@@ -149,6 +184,8 @@ def update_inventory_item(inventory_id):
         if not inventory_item:
             return {"message": f"Inventory item with id {inventory_id} not found."}, 404
 
+        before = snapshot(inventory_item)
+
         # Update the fields if they are provided
         if "quantity" in body_data:
             inventory_item.quantity = body_data["quantity"]
@@ -162,7 +199,9 @@ def update_inventory_item(inventory_id):
             inventory_item.supplier_id = body_data["supplier_id"]
 
         # Commit the changes to the database
+        apply_change(before=before, after=snapshot(inventory_item))
         db.session.commit()
+        cache.invalidate("inventory", inventory_id)
 
         # Return the updated inventory item
         return inventory_schema.dump(inventory_item), 200
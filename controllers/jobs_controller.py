@@ -0,0 +1,43 @@
+import time
+import click  # type: ignore
+from flask import Blueprint, current_app, request  # type: ignore
+from init import db
+from models.jobs import Jobs, job_schema
+from utils.jobs import JobRunner, http_job_params, submit_job, accepted
+
+# Define the blueprint for background jobs; "flask jobs worker" runs them outside the web server
+jobs_bp = Blueprint("jobs", __name__, url_prefix="/jobs")
+
+# Submit a job - /jobs - POST {"kind": "seed", "params": {"scale": 100000}}
+@jobs_bp.route("/", methods=["POST"])
+def create_job():
+    body_data = request.get_json(silent=True) or {}
+    kind = body_data.get("kind")
+    return accepted(submit_job(kind, http_job_params(kind, body_data.get("params"))))
+
+# Progress and throughput of a job - /jobs/<id> - GET
+@jobs_bp.route("/<int:job_id>", methods=["GET"])
+def get_job(job_id):
+    job = db.session.get(Jobs, job_id)
+    if job is None:
+        return {"message": f"Job with id {job_id} does not exist"}, 404
+    return job_schema.dump(job)
+
+@jobs_bp.cli.command("worker")
+@click.option("--workers", type=int, default=None, help="Worker processes [default: JOB_WORKERS, or 2].")
+@click.option("--once", is_flag=True, help="Exit once no job is queued or running.")
+def run_worker(workers, once):
+    # Run queued jobs, and resume the ones a crashed worker left running, until stopped
+    app = current_app._get_current_object()
+    runner = JobRunner(app, workers or app.config["JOB_WORKERS"] or 2)
+    print(f"Running jobs on {runner.workers} worker processes")
+    try:
+        while True:
+            submitted = runner.poll()
+            if once and not submitted and not runner.busy():
+                break
+            time.sleep(app.config["JOB_POLL_SECONDS"])
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.shutdown()
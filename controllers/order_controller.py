@@ -2,52 +2,73 @@ from flask import Blueprint, request  # Simplify imports
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import select
 from psycopg2 import errorcodes
-from init import db
+from init import db, cache
 from models.orders import Orders
 from models.records import Records
 from models.customers import Customers
 from models.orders import order_schema, orders_schema  # Import orders schema
+from utils.pagination import paginate
+from utils.bulk import get_bulk_rows, bulk_import
+from utils.jobs import submit_job, accepted
+from utils.versions import conditional
+from utils.batch import batch_get
+from utils.database import read_only
+from utils.expand import expand
+from utils.checkout import place_order, OutOfStock
+from utils.group_commit import order_group_commit, MissingRecord
+from utils.customer_stats import apply_order, order_snapshot
+from utils.dates import parse_date, get_date_range_args, filter_date_range
 
 orders_bp = Blueprint("orders", __name__, url_prefix="/orders")
 
-# READ all - /orders - GET
+# READ all - /orders?from=<date>&to=<date>&after=<id>&limit=<n>&expand=record,customer - GET
 @orders_bp.route("/")
+@conditional("orders")
 def get_orders():
-    stmt = db.select(Orders)
-    orders_list = db.session.scalars(stmt)
-    data = orders_schema.dump(orders_list)
-    return data
+    start, end = get_date_range_args()
+    stmt = filter_date_range(db.select(Orders), Orders.order_date, start, end)
+    stmt, schema = expand(stmt, Orders, orders_schema, many=True)
+    return paginate(stmt, Orders.order_id, schema)
+
+# Read many - /orders/batch?ids=1,2,3 - GET, or a JSON list of ids - POST
+@orders_bp.route("/batch", methods=["GET", "POST"])
+@read_only
+@conditional("orders")
+def get_orders_batch():
+    return batch_get(Orders, order_schema, "orders")
 
 # READ one - /orders/id - GET
 @orders_bp.route("/<int:order_id>")
+@conditional("orders")
+@cache.cached("orders", "order_id")
 def get_order(order_id):
     stmt = db.select(Orders).filter_by(order_id=order_id)
+    stmt, schema = expand(stmt, Orders, order_schema)
     order = db.session.scalar(stmt)
 
     if order:
-        return order_schema.dump(order)
+        return schema.dump(order)
     else:
         return {"message": f"Order with id {order_id} does not exist"}, 404
 
-# Filter orders by customer_id - /orders/filter_by_customer_id - GET
+# Filter orders by customer_id - /orders/filter_by_customer_id?customer_id=<id>&from=<date>&to=<date> - GET
 @orders_bp.route("/filter_by_customer_id")
+@conditional("orders", "customers")
 def get_orders_by_customer_id():
     customer_id = request.args.get("customer_id", type=int)
     
     if not customer_id:
         return {"message": "Customer ID is required."}, 400
+    start, end = get_date_range_args()
     
     customer = db.session.get(Customers, customer_id)
     if not customer:
         return {"message": f"No customer found with id {customer_id}"}, 404
     
-    stmt = db.select(Orders).filter_by(customer_id=customer_id)
-    orders_list = db.session.scalars(stmt)
-
-    if orders_list:
-        return orders_schema.dump(orders_list)
-    else:
-        return {"message": f"No orders found for customer with id {customer_id}"}, 404
+    # Range scan on ix_orders_customer_id_order_date
+    stmt = filter_date_range(db.select(Orders).filter_by(customer_id=customer_id), Orders.order_date, start, end)
+    stmt, schema = expand(stmt, Orders, orders_schema, many=True)
+    return paginate(stmt, Orders.order_id, schema)
 
 # CREATE - /orders - POST
 @orders_bp.route("/", methods=["POST"])
@@ -59,18 +80,40 @@ def create_order():
         if not record_id:
             return {"message": "Record ID is required to create an order."}, 400
 
-        record = db.session.get(Records, record_id)
+        # ORDER_GROUP_COMMIT checks the record against the validated id cache
+        committer = order_group_commit()
+        if committer is not None:
+            record = committer.record_ids.exists(record_id)
+        else:
+            record = db.session.get(Records, record_id)
         if not record:
             return {"message": f"Record with ID {record_id} does not exist."}, 404
 
+        try:
+            order_date = parse_date(body_data.get("order_date"))
+        except ValueError as err:
+            return {"message": f"Invalid order_date: {err}"}, 400
+
+        # Coalesced with concurrent orders into one INSERT and one commit
+        if committer is not None:
+            row = {"customer_id": body_data.get("customer_id"), "record_id": record_id, "order_date": order_date, "quantity": 1}
+            try:
+                new_order = Orders(order_id=committer.insert(row), **row)
+            except MissingRecord as err:
+                return {"message": str(err)}, 404
+            cache.invalidate("orders", new_order.order_id)
+            return order_schema.dump(new_order), 201
+
         new_order = Orders(
             customer_id=body_data.get("customer_id"),
             record_id=record_id,
-            order_date=body_data.get("order_date"),
+            order_date=order_date,
         )
 
         db.session.add(new_order)
+        apply_order(after=order_snapshot(new_order))
         db.session.commit()
+        cache.invalidate("orders", new_order.order_id)
         return order_schema.dump(new_order), 201
 
     except IntegrityError as err:
@@ -78,6 +121,56 @@ def create_order():
             return {"message": f"The field {err.orig.diag.column_name} is required"}, 409
         return {"message": "An error occurred while creating the order."}, 500
 
+# PLACE ORDER - reserves stock for every line - /orders/place - POST
+@orders_bp.route("/place", methods=["POST"])
+def create_placed_order():
+    body_data = request.get_json(silent=True) or {}
+
+    lines = body_data.get("lines")
+    if not isinstance(lines, list) or not lines:
+        return {"message": "An order needs at least one line."}, 400
+
+    parsed_lines = []
+    for line in lines:
+        record_id = line.get("record_id") if isinstance(line, dict) else None
+        quantity = line.get("quantity", 1) if isinstance(line, dict) else None
+        if not isinstance(record_id, int) or not isinstance(quantity, int) or quantity < 1:
+            return {"message": "Each line needs an integer record_id and a positive integer quantity."}, 400
+        parsed_lines.append((record_id, quantity))
+
+    customer_id = body_data.get("customer_id")
+    if customer_id is not None and (not isinstance(customer_id, int) or isinstance(customer_id, bool)):
+        return {"message": "customer_id must be an integer."}, 400
+    if customer_id is not None and not db.session.get(Customers, customer_id):
+        return {"message": f"No customer found with id {customer_id}"}, 404
+
+    try:
+        order_date = parse_date(body_data.get("order_date"))
+    except ValueError as err:
+        return {"message": f"Invalid order_date: {err}"}, 400
+
+    try:
+        orders, reservations = place_order(customer_id, order_date, parsed_lines)
+    except OutOfStock as err:
+        return {"message": str(err), "record_id": err.record_id}, 409
+
+    for order in orders:
+        cache.invalidate("orders", order.order_id)
+    for reservation in reservations:
+        cache.invalidate("inventory", reservation["inventory_id"])
+
+    return {"orders": orders_schema.dump(orders), "reservations": reservations}, 201
+
+# BULK CREATE/UPSERT - /orders/bulk - POST
+@orders_bp.route("/bulk", methods=["POST"])
+def bulk_create_orders():
+    # Accepts a JSON array or NDJSON; rows with an order_id replace the existing order
+    rows = get_bulk_rows()
+    # ?mode=background writes the rows in chunks in a background job
+    if request.args.get("mode") == "background":
+        return accepted(submit_job("bulk_import", {"table": "orders", "rows": rows}))
+    return bulk_import("orders", rows)
+
 # DELETE - /orders/id - DELETE
 @orders_bp.route("/<int:order_id>", methods=["DELETE"])
 def delete_order(order_id):
@@ -88,8 +181,10 @@ def delete_order(order_id):
         if order.customer_id:
             return {"message": f"Cannot delete order with id '{order_id}' because it is linked to a customer."}, 400
         
+        apply_order(before=order_snapshot(order))
         db.session.delete(order)
         db.session.commit()
+        cache.invalidate("orders", order_id)
         return {"message": f"Order '{order_id}' deleted successfully"}
 
     else:
@@ -103,9 +198,16 @@ def update_order(order_id):
     body_data = request.get_json()
 
     if order:
-        order.order_date = body_data.get("order_date", order.order_date)
+        before = order_snapshot(order)
+        if "order_date" in body_data:
+            try:
+                order.order_date = parse_date(body_data["order_date"])
+            except ValueError as err:
+                return {"message": f"Invalid order_date: {err}"}, 400
         
+        apply_order(before, order_snapshot(order))
         db.session.commit()
+        cache.invalidate("orders", order_id)
         return order_schema.dump(order)
     else:
         return {"message": f"Order with id {order_id} does not exist"}, 404
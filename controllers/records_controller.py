@@ -1,29 +1,48 @@
 from flask import Blueprint, request  # type: ignore
 from sqlalchemy.exc import IntegrityError  # type: ignore
 from psycopg2 import errorcodes  # type: ignore
-from init import db
+from init import db, cache
 from models.records import Records, records_schema, record_schema
 from models.inventory import Inventory, inventory_schema, inventory_schema_many  # Ensure Inventory and InventoryShipments are imported
+from models.orders import Orders
+from utils.pagination import paginate
+from utils.bulk import get_bulk_rows, bulk_import
+from utils.jobs import submit_job, accepted
+from utils.search import contains, search_record_ids, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from utils.versions import conditional
+from utils.batch import batch_get
+from utils.database import read_only
+from utils.expand import expand
+from utils.deletes import has_rows
 
 records_bp = Blueprint("records", __name__, url_prefix="/records")
 
-# READ all - /records - GET
+# READ all - /records?after=<id>&limit=<n>&expand=inventory,inventory.supplier - GET
 @records_bp.route("/")
+@conditional("records")
 def get_records():
-    stmt = db.select(Records)
-    record_list = db.session.scalars(stmt)
-    data = records_schema.dump(record_list)
-    return data
+    stmt, schema = expand(db.select(Records), Records, records_schema, many=True)
+    return paginate(stmt, Records.record_id, schema)
+
+# Read many - /records/batch?ids=1,2,3 - GET, or a JSON list of ids - POST
+@records_bp.route("/batch", methods=["GET", "POST"])
+@read_only
+@conditional("records")
+def get_records_batch():
+    return batch_get(Records, record_schema, "records")
 
 # Read one - /records/id - GET
 @records_bp.route("/<int:record_id>")
+@conditional("records")
+@cache.cached("records", "record_id")
 def get_record(record_id):
     stmt = db.select(Records).filter_by(record_id=record_id)
+    stmt, schema = expand(stmt, Records, record_schema)
     record = db.session.scalar(stmt)
 
     if record:
         # Serialize and return the record data
-        data = record_schema.dump(record)
+        data = schema.dump(record)
         return data
     else:
         # error message
@@ -31,25 +50,37 @@ def get_record(record_id):
 
 # Filter records by artist - /records/artist/<artist> - GET
 @records_bp.route("/artist/<string:artist>")
+@conditional("records")
 def get_records_by_artist(artist):
-    stmt = db.select(Records).filter(Records.artist.ilike(f"%{artist}%"))
-    record_list = db.session.scalars(stmt)
-    if record_list:
-        data = records_schema.dump(record_list)
-        return data
-    else:
-        return {"message": f"No records found for artist '{artist}'"}, 404
+    stmt = db.select(Records).filter(contains(Records.artist, artist))
+    stmt, schema = expand(stmt, Records, records_schema, many=True)
+    return paginate(stmt, Records.record_id, schema)
 
 # Filter records by genre - /records/genre/<genre> - GET
 @records_bp.route("/genre/<string:genre>")
+@conditional("records")
 def get_records_by_genre(genre):
-    stmt = db.select(Records).filter(Records.genre.ilike(f"%{genre}%"))
-    record_list = db.session.scalars(stmt)
-    if record_list:
-        data = records_schema.dump(record_list)
-        return data
-    else:
-        return {"message": f"No records found for genre '{genre}'"}, 404
+    stmt = db.select(Records).filter(contains(Records.genre, genre))
+    stmt, schema = expand(stmt, Records, records_schema, many=True)
+    return paginate(stmt, Records.record_id, schema)
+
+# Search records by title, artist and genre - /records/search?q=<query>&limit=<n> - GET
+@records_bp.route("/search")
+@conditional("records")
+def search_records():
+    query = request.args.get("q", "").strip()
+    if not query:
+        return {"message": "A search query (q) is required."}, 400
+
+    limit = request.args.get("limit", default=DEFAULT_SEARCH_LIMIT, type=int)
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+
+    # Ranked ids come from the search index, then the records are loaded in one query
+    record_ids = search_record_ids(query, limit)
+    stmt = db.select(Records).where(Records.record_id.in_(record_ids))
+    records = {record.record_id: record for record in db.session.scalars(stmt)}
+
+    return records_schema.dump([records[record_id] for record_id in record_ids if record_id in records])
 
 # CREATE - /records - POST
 @records_bp.route("/", methods=["POST"])
@@ -77,6 +108,7 @@ def create_record():
         # Add to the session and commit
         db.session.add(new_record)
         db.session.commit()
+        cache.invalidate("records", new_record.record_id)
 
         # Return the created record
         return record_schema.dump(new_record), 201
@@ -89,26 +121,33 @@ def create_record():
         else:
             return {"message": "An unexpected error occurred."}, 500
 
+# BULK CREATE/UPSERT - /records/bulk - POST
+@records_bp.route("/bulk", methods=["POST"])
+def bulk_create_records():
+    # Accepts a JSON array or NDJSON; rows with a record_id replace the existing record
+    rows = get_bulk_rows()
+    # ?mode=background writes the rows in chunks in a background job
+    if request.args.get("mode") == "background":
+        return accepted(submit_job("bulk_import", {"table": "records", "rows": rows}))
+    return bulk_import("records", rows)
+
 # DELETE - /records/<id> - DELETE
 @records_bp.route("/<int:record_id>", methods=["DELETE"])
 def delete_record(record_id):
-    # Find the record to be deleted using id
-    stmt = db.select(Records).filter_by(record_id=record_id)
-    record = db.session.scalar(stmt)  # Fetch the record
-
     # If record exists, proceed to check for associated shipments
-    if record:
+    if has_rows(Records.record_id == record_id):
         # Check if any inventory shipments are linked to this record
-        shipments_stmt = db.select(Inventory).filter_by(record_id=record_id)
-        shipments = db.session.scalars(shipments_stmt).all()
-
-        # If there are associated shipments, return an error
-        if shipments:
+        if has_rows(Inventory.record_id == record_id):
             return {"Message": f"Record with id '{record_id}' cannot be deleted because it has associated shipments."}, 400
 
+        # Orders keep their record (orders.record_id is ON DELETE RESTRICT)
+        if has_rows(Orders.record_id == record_id):
+            return {"Message": f"Record with id '{record_id}' cannot be deleted because it has associated orders."}, 400
+
         # Delete the record if no shipments are linked
-        db.session.delete(record)
+        db.session.execute(db.delete(Records).where(Records.record_id == record_id))
         db.session.commit()  # Commit the changes to the database
+        cache.invalidate("records", record_id)
 
         # Return success response
         return {"Message": f"Record with id '{record_id}' deleted successfully."}, 200
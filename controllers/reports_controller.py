@@ -0,0 +1,26 @@
+from flask import Blueprint, request  # type: ignore
+from utils.versions import conditional
+from utils.errors import QueryArgumentError
+from utils.dates import get_date_range_args
+from utils.reports import sales_report, REPORT_GROUPS, DEFAULT_ROLLING_DAYS, MAX_ROLLING_DAYS
+
+# Define the blueprint for reports
+reports_bp = Blueprint("reports", __name__, url_prefix="/reports")
+
+# Sales and revenue - /reports/sales?from=YYYY-MM-DD&to=YYYY-MM-DD&group_by=day|genre|artist&window=<days> - GET
+@reports_bp.route("/sales", methods=["GET"])
+@conditional("orders", "records")
+def get_sales_report():
+    group_by = request.args.get("group_by", "day")
+    if group_by not in REPORT_GROUPS:
+        raise QueryArgumentError(f"group_by must be one of {', '.join(REPORT_GROUPS)}.")
+
+    # A day report longer than MAX_REPORT_DAYS is rejected by sales_report
+    start, end = get_date_range_args()
+
+    window = request.args.get("window", DEFAULT_ROLLING_DAYS, type=int)
+    if not 1 <= window <= MAX_ROLLING_DAYS:
+        raise QueryArgumentError(f"window must be between 1 and {MAX_ROLLING_DAYS} days.")
+
+    # Aggregated in NumPy over a columnar snapshot of orders, not by querying the tables per report
+    return sales_report(group_by, start, end, window)
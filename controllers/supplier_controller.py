@@ -1,27 +1,42 @@
 from flask import Blueprint, request  # type: ignore
 from sqlalchemy.exc import IntegrityError  # type: ignore
 from psycopg2 import errorcodes  # type: ignore
-from init import db
+from init import db, cache
 from models.suppliers import Suppliers, supplier_schema, suppliers_schema
-from models.inventory import Inventory
+from utils.pagination import paginate
+from utils.versions import conditional
+from utils.batch import batch_get
+from utils.database import read_only
+from utils.expand import expand
+from utils.deletes import delete_supplier as delete_supplier_rows
+from utils.jobs import submit_job, accepted
 
 suppliers_bp = Blueprint("suppliers", __name__, url_prefix="/suppliers")
 
-# READ all - /suppliers - GET
+# READ all - /suppliers?after=<id>&limit=<n>&expand=inventory,inventory.record - GET
 @suppliers_bp.route("/", methods=["GET"])
+@conditional("suppliers")
 def get_suppliers():
-    stmt = db.select(Suppliers)
-    suppliers_list = db.session.scalars(stmt)
-    data = suppliers_schema.dump(suppliers_list)
-    return data
+    stmt, schema = expand(db.select(Suppliers), Suppliers, suppliers_schema, many=True)
+    return paginate(stmt, Suppliers.supplier_id, schema)
+
+# Read many - /suppliers/batch?ids=1,2,3 - GET, or a JSON list of ids - POST
+@suppliers_bp.route("/batch", methods=["GET", "POST"])
+@read_only
+@conditional("suppliers")
+def get_suppliers_batch():
+    return batch_get(Suppliers, supplier_schema, "suppliers")
 
 # READ one - /suppliers/<id> - GET
 @suppliers_bp.route("/<int:supplier_id>", methods=["GET"])
+@conditional("suppliers")
+@cache.cached("suppliers", "supplier_id")
 def get_supplier(supplier_id):
     stmt = db.select(Suppliers).filter_by(supplier_id=supplier_id)
+    stmt, schema = expand(stmt, Suppliers, supplier_schema)
     supplier = db.session.scalar(stmt)
     if supplier:
-        data = supplier_schema.dump(supplier)
+        data = schema.dump(supplier)
         return data
     else:
         return {"message": f"Supplier with id {supplier_id} does not exist"}, 404
@@ -49,6 +64,7 @@ def create_supplier():
         
         # Commit
         db.session.commit()
+        cache.invalidate("suppliers", new_supplier.supplier_id)
         
         # Return the response with the created supplier
         return supplier_schema.dump(new_supplier), 201
@@ -63,20 +79,16 @@ def create_supplier():
 # DELETE - /suppliers/<id> - DELETE
 @suppliers_bp.route("/<int:supplier_id>", methods=["DELETE"])
 def delete_supplier(supplier_id):
-    stmt = db.select(Suppliers).filter_by(supplier_id=supplier_id)
-    supplier = db.session.scalar(stmt)
+    name = db.session.scalar(db.select(Suppliers.name).filter_by(supplier_id=supplier_id))
 
-    if supplier:
-        # Fetch and delete associated inventory items
-        stmt = db.select(Inventory).filter_by(supplier_id=supplier_id)
-        inventory_items = db.session.scalars(stmt)
-        
-        for item in inventory_items:
-            db.session.delete(item)
+    if name is not None:
+        # ?mode=background deletes the inventory in chunks in a background job
+        if request.args.get("mode") == "background":
+            return accepted(submit_job("delete", {"table": "suppliers", "id": supplier_id}))
 
-        db.session.delete(supplier)
-        db.session.commit()
-        return {"Message": f"Supplier '{supplier.name}' and associated inventory items deleted successfully"}, 200
+        # Set-based deletes of the inventory items and the supplier
+        delete_supplier_rows(supplier_id)
+        return {"Message": f"Supplier '{name}' and associated inventory items deleted successfully"}, 200
     else:
         return {"Message": f"Supplier with id '{supplier_id}' does not exist"}, 404
 
@@ -95,6 +107,7 @@ def update_supplier(supplier_id):
             supplier.phone_number = body_data.get("phone_number") or supplier.phone_number
             
             db.session.commit()
+            cache.invalidate("suppliers", supplier_id)
             return supplier_schema.dump(supplier)
         else:
             return {"Message": f"Supplier with id {supplier_id} does not exist"}, 404
@@ -1,9 +1,20 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_marshmallow import Marshmallow
+from flask_migrate import Migrate
+from utils.cache import ResponseCache
+from utils.metrics import RequestMetrics
+from utils.database import RoutingSession
 
 
 # Initialize extensions
-db = SQLAlchemy()
+# GET requests read from the replica bind when one is configured
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 ma = Marshmallow()
+# Registered as "flask migrate ..." so it doesn't clash with the "flask db" blueprint commands
+migrate = Migrate(command="migrate")
+# Read-through cache for single-entity GET responses
+cache = ResponseCache()
+# Per-request SQL/serialization timings, Server-Timing headers and /_metrics
+metrics = RequestMetrics()
 
 
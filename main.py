@@ -3,13 +3,22 @@ load_dotenv()  # Loads environment variables from .env
 
 import os
 from flask import Flask  # type: ignore
-from init import db, ma
+from init import db, ma, migrate, cache, metrics
+from utils.versions import init_versions
+from utils.errors import register_error_handlers
+from utils.serialize import FastJSONProvider
+from utils.database import configure_engines, init_foreign_keys, init_replica_routing
+from utils.jobs import init_jobs
 
 from models.orders import Orders
 from models.customers import Customers
 from models.suppliers import Suppliers
 from models.records import Records
 from models.inventory import Inventory
+from models.table_versions import TableVersions, TableVersionLog
+from models.inventory_summary import InventorySummary
+from models.customer_stats import CustomerStats, CustomerGenreStats
+from models.jobs import Jobs
 
 from controllers.cli_controller import db_commands
 from controllers.customer_controller import customers_bp
@@ -17,17 +26,84 @@ from controllers.supplier_controller import suppliers_bp
 from controllers.order_controller import orders_bp
 from controllers.inventory_controller import inventory_bp
 from controllers.records_controller import records_bp
+from controllers.export_controller import export_bp
+from controllers.reports_controller import reports_bp
+from controllers.jobs_controller import jobs_bp
 
 def create_app():
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)  # orjson encoding, same bytes as Flask's default provider
 
     # App configuration
     app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URI")  # Make sure this is defined in your environment
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False  # Optional: To avoid unnecessary overhead
 
+    # Connection pool - sizes are per worker process; pre-ping replaces connections the server dropped
+    app.config["DB_POOL_SIZE"] = int(os.environ.get("DB_POOL_SIZE", 10))
+    app.config["DB_MAX_OVERFLOW"] = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+    app.config["DB_POOL_TIMEOUT"] = int(os.environ.get("DB_POOL_TIMEOUT", 30))  # Seconds to wait for a free connection
+    app.config["DB_POOL_RECYCLE"] = int(os.environ.get("DB_POOL_RECYCLE", 1800))  # Seconds before a connection is replaced
+    app.config["DB_POOL_PRE_PING"] = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+    app.config["DB_STATEMENT_TIMEOUT"] = int(os.environ.get("DB_STATEMENT_TIMEOUT", 0))  # Milliseconds, 0 for none; Postgres only
+
+    # Read replica - GET requests read from it, except for a client's own requests shortly after it wrote
+    app.config["DATABASE_REPLICA_URI"] = os.environ.get("DATABASE_REPLICA_URI")
+    app.config["REPLICA_STICKY_SECONDS"] = int(os.environ.get("REPLICA_STICKY_SECONDS", 5))
+    configure_engines(app)
+
+    # Async entry point (asgi.py) - threads serving the routes it hands to this Flask app
+    app.config["ASYNC_WSGI_THREADS"] = int(os.environ.get("ASYNC_WSGI_THREADS", 10))
+
+    # Response cache for single-entity GET routes - "sqlite" (shared between the server's workers and
+    # the job workers, so every write invalidates it), "memory" (single process only) or "none"
+    app.config["CACHE_BACKEND"] = os.environ.get("CACHE_BACKEND", "sqlite")
+    app.config["CACHE_TTL"] = int(os.environ.get("CACHE_TTL", 300))  # Seconds
+    app.config["CACHE_MAX_ENTRIES"] = int(os.environ.get("CACHE_MAX_ENTRIES", 10000))
+    app.config["CACHE_PATH"] = os.environ.get("CACHE_PATH")  # SQLite file for the shared backend
+
+    # Inventory summary - keep the inventory_summary table up to date on every inventory write
+    app.config["INVENTORY_SUMMARY_TABLE"] = os.environ.get("INVENTORY_SUMMARY_TABLE", "false").lower() == "true"
+    app.config["LOW_STOCK_THRESHOLD"] = int(os.environ.get("LOW_STOCK_THRESHOLD", 10))
+
+    # Customer stats - keep the customer_stats tables up to date on every order write
+    app.config["CUSTOMER_STATS_TABLE"] = os.environ.get("CUSTOMER_STATS_TABLE", "false").lower() == "true"
+
+    # Sales reports - seconds before the columnar orders snapshot is reloaded in full
+    app.config["REPORT_SNAPSHOT_MAX_AGE"] = int(os.environ.get("REPORT_SNAPSHOT_MAX_AGE", 3600))
+
+    # Request instrumentation - warn when one request runs the same statement more than this many times
+    app.config["METRICS_ENABLED"] = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+    app.config["METRICS_N_PLUS_ONE_THRESHOLD"] = int(os.environ.get("METRICS_N_PLUS_ONE_THRESHOLD", 10))
+
+    # Order ingestion - coalesce concurrent POST /orders into one INSERT and commit per window (threaded servers)
+    app.config["ORDER_GROUP_COMMIT"] = os.environ.get("ORDER_GROUP_COMMIT", "false").lower() == "true"
+    app.config["ORDER_GROUP_COMMIT_WINDOW_MS"] = float(os.environ.get("ORDER_GROUP_COMMIT_WINDOW_MS", 2))
+    app.config["ORDER_GROUP_COMMIT_MAX_ROWS"] = int(os.environ.get("ORDER_GROUP_COMMIT_MAX_ROWS", 100))
+
+    # Background jobs - worker processes per app process (0 leaves jobs to "flask jobs worker"); a running
+    # job whose heartbeat is older than JOB_STALE_SECONDS is taken over, up to JOB_MAX_ATTEMPTS times
+    app.config["JOB_WORKERS"] = int(os.environ.get("JOB_WORKERS", 0))
+    app.config["JOB_POLL_SECONDS"] = float(os.environ.get("JOB_POLL_SECONDS", 2))
+    app.config["JOB_HEARTBEAT_SECONDS"] = float(os.environ.get("JOB_HEARTBEAT_SECONDS", 10))
+    app.config["JOB_STALE_SECONDS"] = int(os.environ.get("JOB_STALE_SECONDS", 60))
+    app.config["JOB_MAX_ATTEMPTS"] = int(os.environ.get("JOB_MAX_ATTEMPTS", 3))
+
+    # POST /jobs limits - the largest seed scale it queues, and the directory its exports are written under
+    app.config["MAX_SEED_SCALE"] = int(os.environ.get("MAX_SEED_SCALE", 1000000))
+    app.config["EXPORT_ROOT"] = os.path.abspath(os.environ.get("EXPORT_ROOT", "exports"))
+
     # Initialize extensions
     db.init_app(app)
+    with app.app_context():
+        init_foreign_keys(db.engines.values())
     ma.init_app(app)
+    migrate.init_app(app, db)
+    cache.init_app(app)
+    metrics.init_app(app)
+    init_jobs(app)
+    init_replica_routing(app)
+    init_versions(app)
+    register_error_handlers(app)
 
     # Register Blueprints
     app.register_blueprint(db_commands)
@@ -36,6 +112,9 @@ def create_app():
     app.register_blueprint(orders_bp)
     app.register_blueprint(inventory_bp)
     app.register_blueprint(records_bp)
+    app.register_blueprint(export_bp)
+    app.register_blueprint(reports_bp)
+    app.register_blueprint(jobs_bp)
 
     # Create tables in the app context
     with app.app_context():
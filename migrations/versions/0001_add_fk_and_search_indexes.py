@@ -0,0 +1,83 @@
+"""Add foreign key indexes and trigram search indexes
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+The tables themselves are created by db.create_all() / "flask db create",
+so this revision only adds the indexes missing from existing databases.
+
+Postgres gets B-tree indexes on the foreign keys and pg_trgm GIN indexes on
+records.title/artist/genre. SQLite can't index a leading-wildcard LIKE, so it
+gets the records_trgm FTS5 trigram table (kept in sync by triggers) instead.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+FK_INDEXES = [
+    ("ix_inventory_supplier_id", "inventory", "supplier_id"),
+    ("ix_inventory_record_id", "inventory", "record_id"),
+    ("ix_orders_customer_id", "orders", "customer_id"),
+    ("ix_orders_record_id", "orders", "record_id"),
+]
+
+TRGM_COLUMNS = ["title", "artist", "genre"]
+
+RECORDS_TRGM_SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS records_trgm USING fts5("
+    "title, artist, genre, content='records', content_rowid='record_id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS records_trgm_ai AFTER INSERT ON records BEGIN "
+    "INSERT INTO records_trgm(rowid, title, artist, genre) VALUES (new.record_id, new.title, new.artist, new.genre); END",
+    "CREATE TRIGGER IF NOT EXISTS records_trgm_ad AFTER DELETE ON records BEGIN "
+    "INSERT INTO records_trgm(records_trgm, rowid, title, artist, genre) VALUES ('delete', old.record_id, old.title, old.artist, old.genre); END",
+    "CREATE TRIGGER IF NOT EXISTS records_trgm_au AFTER UPDATE ON records BEGIN "
+    "INSERT INTO records_trgm(records_trgm, rowid, title, artist, genre) VALUES ('delete', old.record_id, old.title, old.artist, old.genre); "
+    "INSERT INTO records_trgm(rowid, title, artist, genre) VALUES (new.record_id, new.title, new.artist, new.genre); END",
+    # Index the rows that already exist
+    "INSERT INTO records_trgm(records_trgm) VALUES ('rebuild')",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    for name, table, column in FK_INDEXES:
+        op.create_index(name, table, [column], if_not_exists=True)
+
+    if dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for column in TRGM_COLUMNS:
+            op.create_index(
+                f"ix_records_{column}_trgm",
+                "records",
+                [column],
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+                if_not_exists=True,
+            )
+    elif dialect == "sqlite":
+        for statement in RECORDS_TRGM_SQLITE:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        for column in TRGM_COLUMNS:
+            op.drop_index(f"ix_records_{column}_trgm", table_name="records", if_exists=True)
+    elif dialect == "sqlite":
+        for trigger in ("records_trgm_ai", "records_trgm_ad", "records_trgm_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS records_trgm")
+
+    for name, table, _ in FK_INDEXES:
+        op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,66 @@
+"""Add full-text search structures for /records/search
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 11:00:00.000000
+
+Postgres gets a generated, weighted search_vector tsvector column on records
+with a GIN index. SQLite gets the records_fts FTS5 table (word tokenizer with
+prefix indexes), kept in sync by triggers and backfilled with 'rebuild'.
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+RECORDS_SEARCH_POSTGRES = [
+    "ALTER TABLE records ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(artist, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(genre, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_records_search_vector ON records USING gin (search_vector)",
+]
+
+RECORDS_FTS_SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5("
+    "title, artist, genre, content='records', content_rowid='record_id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS records_fts_ai AFTER INSERT ON records BEGIN "
+    "INSERT INTO records_fts(rowid, title, artist, genre) VALUES (new.record_id, new.title, new.artist, new.genre); END",
+    "CREATE TRIGGER IF NOT EXISTS records_fts_ad AFTER DELETE ON records BEGIN "
+    "INSERT INTO records_fts(records_fts, rowid, title, artist, genre) VALUES ('delete', old.record_id, old.title, old.artist, old.genre); END",
+    "CREATE TRIGGER IF NOT EXISTS records_fts_au AFTER UPDATE ON records BEGIN "
+    "INSERT INTO records_fts(records_fts, rowid, title, artist, genre) VALUES ('delete', old.record_id, old.title, old.artist, old.genre); "
+    "INSERT INTO records_fts(rowid, title, artist, genre) VALUES (new.record_id, new.title, new.artist, new.genre); END",
+    # Index the rows that already exist
+    "INSERT INTO records_fts(records_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        for statement in RECORDS_SEARCH_POSTGRES:
+            op.execute(statement)
+    elif dialect == "sqlite":
+        for statement in RECORDS_FTS_SQLITE:
+            op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_records_search_vector")
+        op.execute("ALTER TABLE records DROP COLUMN IF EXISTS search_vector")
+    elif dialect == "sqlite":
+        for trigger in ("records_fts_ai", "records_fts_ad", "records_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS records_fts")
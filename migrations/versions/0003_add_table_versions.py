@@ -0,0 +1,43 @@
+"""Add table_versions for ETag change tracking
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+TRACKED_TABLES = ["customers", "suppliers", "records", "inventory", "orders"]
+
+
+def upgrade():
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("table_versions"):
+        op.create_table(
+            "table_versions",
+            sa.Column("table_name", sa.String(length=64), nullable=False),
+            sa.Column("version", sa.BigInteger(), nullable=False),
+            sa.PrimaryKeyConstraint("table_name"),
+        )
+
+    # Seed the rows so the first writes only ever need an UPDATE
+    existing = {row[0] for row in bind.execute(sa.text("SELECT table_name FROM table_versions"))}
+    for table_name in TRACKED_TABLES:
+        if table_name not in existing:
+            bind.execute(
+                sa.text("INSERT INTO table_versions (table_name, version) VALUES (:table_name, 0)"),
+                {"table_name": table_name},
+            )
+
+
+def downgrade():
+    op.drop_table("table_versions")
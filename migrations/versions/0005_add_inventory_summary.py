@@ -0,0 +1,39 @@
+"""Add inventory_summary and an index on inventory.stock_quantity
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 14:00:00.000000
+
+Run "flask db refresh-inventory-summary" to fill the table before turning
+INVENTORY_SUMMARY_TABLE on.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table("inventory_summary"):
+        op.create_table(
+            "inventory_summary",
+            sa.Column("group_type", sa.String(length=16), nullable=False),
+            sa.Column("group_key", sa.Integer(), nullable=False),
+            sa.Column("units", sa.BigInteger(), nullable=False),
+            sa.Column("valuation", sa.Numeric(14, 2), nullable=False),
+            sa.Column("skus", sa.Integer(), nullable=False),
+            sa.Column("low_stock_skus", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("group_type", "group_key"),
+        )
+    op.create_index("ix_inventory_stock_quantity", "inventory", ["stock_quantity"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_inventory_stock_quantity", table_name="inventory", if_exists=True)
+    op.drop_table("inventory_summary")
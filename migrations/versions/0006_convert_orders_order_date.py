@@ -0,0 +1,98 @@
+"""Convert orders.order_date from a string to a date and index it
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 15:00:00.000000
+
+The old dd/mm/yy strings (and YYYY-MM-DD) are parsed into a new date column
+in batches of BACKFILL_BATCH_SIZE rows, each committed on its own so the
+orders table is never locked for the whole backfill. Rows written while the
+backfill runs are caught up just before the columns are swapped. Strings
+that cannot be parsed become NULL.
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 10000
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%y", "%d/%m/%Y")
+
+orders = sa.table(
+    "orders",
+    sa.column("order_id", sa.Integer),
+    sa.column("order_date", sa.String),
+    sa.column("order_date_new", sa.Date),
+)
+
+
+def parse_date(value):
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).date()
+        except (AttributeError, ValueError):
+            pass
+    return None
+
+
+def backfill(bind, only_missing=False):
+    # Keyset batches over the primary key
+    after = 0
+    while True:
+        stmt = (
+            sa.select(orders.c.order_id, orders.c.order_date)
+            .where(orders.c.order_id > after, orders.c.order_date.is_not(None))
+            .order_by(orders.c.order_id)
+            .limit(BACKFILL_BATCH_SIZE)
+        )
+        if only_missing:
+            stmt = stmt.where(orders.c.order_date_new.is_(None))
+        rows = bind.execute(stmt).all()
+        if not rows:
+            return
+
+        values = [{"id": order_id, "day": parse_date(order_date)} for order_id, order_date in rows]
+        values = [value for value in values if value["day"] is not None]
+        if values:
+            stmt = orders.update().where(orders.c.order_id == sa.bindparam("id")).values(order_date_new=sa.bindparam("day"))
+            bind.execute(stmt, values)
+        after = rows[-1][0]
+
+
+def upgrade():
+    bind = op.get_bind()
+    columns = {column["name"]: column["type"] for column in sa.inspect(bind).get_columns("orders")}
+
+    if not isinstance(columns["order_date"], sa.Date):
+        if "order_date_new" not in columns:
+            op.add_column("orders", sa.Column("order_date_new", sa.Date(), nullable=True))
+
+        # Each batch commits on its own, outside the migration's transaction
+        with op.get_context().autocommit_block():
+            backfill(op.get_bind())
+
+        # Catch up on rows written meanwhile, then swap the columns
+        backfill(bind, only_missing=True)
+        with op.batch_alter_table("orders") as batch_op:
+            batch_op.drop_column("order_date")
+            batch_op.alter_column("order_date_new", new_column_name="order_date")
+
+    op.create_index("ix_orders_order_date", "orders", ["order_date"], if_not_exists=True)
+    op.create_index("ix_orders_customer_id_order_date", "orders", ["customer_id", "order_date"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_orders_customer_id_order_date", table_name="orders", if_exists=True)
+    op.drop_index("ix_orders_order_date", table_name="orders", if_exists=True)
+
+    # Dates go back as YYYY-MM-DD strings
+    with op.batch_alter_table("orders") as batch_op:
+        batch_op.alter_column("order_date", type_=sa.String(length=255), existing_type=sa.Date(), existing_nullable=True, postgresql_using="order_date::text")
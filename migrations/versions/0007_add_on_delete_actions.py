@@ -0,0 +1,67 @@
+"""Add ON DELETE actions to the inventory and orders foreign keys
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 18:00:00.000000
+
+inventory.supplier_id becomes ON DELETE CASCADE, so a supplier's inventory
+goes with it in the database. inventory.record_id and orders.record_id become
+ON DELETE RESTRICT, so a record with stock or orders can't be deleted.
+(orders.customer_id is already ON DELETE CASCADE.)
+
+SQLite can't alter a constraint, so there the tables are rebuilt by batch mode.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+# Names SQLite's unnamed constraints get, so batch mode can drop them
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+# (table, column, referred table, referred column, ON DELETE action)
+FOREIGN_KEYS = [
+    ("inventory", "supplier_id", "suppliers", "supplier_id", "CASCADE"),
+    ("inventory", "record_id", "records", "record_id", "RESTRICT"),
+    ("orders", "record_id", "records", "record_id", "RESTRICT"),
+]
+
+
+def set_on_delete(actions):
+    # actions maps (table, column) to an ON DELETE action, or None for none
+    inspector = sa.inspect(op.get_bind())
+    for table in sorted({table for table, *_ in FOREIGN_KEYS}):
+        existing = {tuple(fk["constrained_columns"]): fk for fk in inspector.get_foreign_keys(table)}
+        changes = []
+        for fk_table, column, referred_table, referred_column, _ in FOREIGN_KEYS:
+            if fk_table != table:
+                continue
+            action = actions[(table, column)]
+            fk = existing.get((column,))
+            current = ((fk or {}).get("options") or {}).get("ondelete")
+            if fk is not None and (current or "").upper() == (action or ""):
+                continue
+            name = (fk or {}).get("name") or f"fk_{table}_{column}_{referred_table}"
+            changes.append((fk is not None, name, column, referred_table, referred_column, action))
+        if not changes:
+            continue
+
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            for exists, name, column, referred_table, referred_column, action in changes:
+                if exists:
+                    batch_op.drop_constraint(name, type_="foreignkey")
+                batch_op.create_foreign_key(name, referred_table, [column], [referred_column], ondelete=action)
+
+
+def upgrade():
+    set_on_delete({(table, column): action for table, column, _, _, action in FOREIGN_KEYS})
+
+
+def downgrade():
+    set_on_delete({(table, column): None for table, column, *_ in FOREIGN_KEYS})
@@ -0,0 +1,48 @@
+"""Add the jobs table for background jobs
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 19:00:00.000000
+
+Each row is one job: its params, status and the checkpoint of its last
+committed chunk of work. Runners find work through ix_jobs_status.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table("jobs"):
+        op.create_table(
+            "jobs",
+            sa.Column("job_id", sa.Integer(), nullable=False),
+            sa.Column("kind", sa.String(length=64), nullable=False),
+            sa.Column("params", sa.JSON(), nullable=False),
+            sa.Column("status", sa.String(length=16), nullable=False),
+            sa.Column("checkpoint", sa.JSON(), nullable=True),
+            sa.Column("result", sa.JSON(), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("processed", sa.BigInteger(), nullable=False),
+            sa.Column("total", sa.BigInteger(), nullable=True),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("worker", sa.String(length=255), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("job_id"),
+        )
+    op.create_index("ix_jobs_status", "jobs", ["status"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_jobs_status", table_name="jobs", if_exists=True)
+    op.drop_table("jobs")
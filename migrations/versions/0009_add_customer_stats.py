@@ -0,0 +1,49 @@
+"""Add the customer_stats and customer_genre_stats rollup tables
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 20:00:00.000000
+
+Run "flask db refresh-customer-stats" to fill the tables before turning
+CUSTOMER_STATS_TABLE on.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("customer_stats"):
+        op.create_table(
+            "customer_stats",
+            sa.Column("customer_id", sa.Integer(), nullable=False),
+            sa.Column("order_count", sa.Integer(), nullable=False),
+            sa.Column("total_spend", sa.Numeric(14, 2), nullable=False),
+            sa.Column("first_order_date", sa.Date(), nullable=True),
+            sa.Column("last_order_date", sa.Date(), nullable=True),
+            sa.Column("favourite_genre", sa.String(length=255), nullable=True),
+            sa.ForeignKeyConstraint(["customer_id"], ["customers.customer_id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("customer_id"),
+        )
+    if not inspector.has_table("customer_genre_stats"):
+        op.create_table(
+            "customer_genre_stats",
+            sa.Column("customer_id", sa.Integer(), nullable=False),
+            sa.Column("genre", sa.String(length=255), nullable=False),
+            sa.Column("order_count", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["customer_id"], ["customers.customer_id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("customer_id", "genre"),
+        )
+
+
+def downgrade():
+    op.drop_table("customer_genre_stats")
+    op.drop_table("customer_stats")
@@ -0,0 +1,49 @@
+"""Add table_version_log, appended to by every write instead of updating table_versions
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 21:00:00.000000
+
+A table's version becomes its table_versions row plus its rows in the log.
+Writers only insert into the log, so concurrent writers to a table no longer
+wait on its version row; the app folds the log back into table_versions.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table("table_version_log"):
+        op.create_table(
+            "table_version_log",
+            sa.Column("log_id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), nullable=False),
+            sa.Column("table_name", sa.String(length=64), nullable=False),
+            sa.PrimaryKeyConstraint("log_id"),
+        )
+    op.create_index("ix_table_version_log_table_name", "table_version_log", ["table_name"], if_not_exists=True)
+
+
+def downgrade():
+    # Fold the log into the base versions first, so no version goes backwards
+    bind = op.get_bind()
+    counts = bind.execute(sa.text("SELECT table_name, count(*) FROM table_version_log GROUP BY table_name")).all()
+    for table_name, count in counts:
+        updated = bind.execute(
+            sa.text("UPDATE table_versions SET version = version + :count WHERE table_name = :table_name"),
+            {"table_name": table_name, "count": count},
+        ).rowcount
+        if not updated:
+            bind.execute(
+                sa.text("INSERT INTO table_versions (table_name, version) VALUES (:table_name, :count)"),
+                {"table_name": table_name, "count": count},
+            )
+    op.drop_index("ix_table_version_log_table_name", table_name="table_version_log", if_exists=True)
+    op.drop_table("table_version_log")
@@ -0,0 +1,21 @@
+from init import db
+
+class CustomerStats(db.Model):
+    __tablename__ = 'customer_stats'
+
+    # Running order totals per customer, kept up to date by the order write handlers
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.customer_id', ondelete='CASCADE'), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    total_spend = db.Column(db.Numeric(14, 2), nullable=False, default=0)  # quantity * records.price over the orders
+    first_order_date = db.Column(db.Date, nullable=True)
+    last_order_date = db.Column(db.Date, nullable=True)
+    favourite_genre = db.Column(db.String(255), nullable=True)  # Genre with the most orders, ties by name
+
+
+class CustomerGenreStats(db.Model):
+    __tablename__ = 'customer_genre_stats'
+
+    # Orders per customer and genre, so the favourite genre can be kept without rescanning the orders
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.customer_id', ondelete='CASCADE'), primary_key=True)
+    genre = db.Column(db.String(255), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
@@ -1,4 +1,5 @@
-from init import db, ma
+from init import db
+from utils.metrics import MeteredSchema
 
 class Customers(db.Model):
     __tablename__ = 'customers'
@@ -8,8 +9,11 @@ class Customers(db.Model):
     email = db.Column(db.String(255), unique=True, nullable=False)
     phone_number = db.Column(db.Integer, nullable=True)
     address = db.Column(db.String(255), nullable=True)
+
+    # Orders are removed by the database (ON DELETE CASCADE), not loaded and deleted by the ORM
+    orders = db.relationship("Orders", back_populates="customer", passive_deletes="all")
     
-class CustomersSchema(ma.Schema):
+class CustomersSchema(MeteredSchema):
     class Meta:
         fields = ("customer_id", "name", "email","phone_number","address")
 
@@ -1,15 +1,20 @@
-from init import db, ma
+from init import db
+from utils.metrics import MeteredSchema
 
 class Inventory(db.Model):
     __tablename__ = 'inventory'
     
     inventory_id = db.Column(db.Integer, primary_key=True)
-    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.supplier_id'), nullable=False)
-    record_id = db.Column(db.Integer, db.ForeignKey('records.record_id'), nullable=False)
-    stock_quantity = db.Column(db.Integer, nullable=False)
+    # Inventory goes with its supplier; a record with stock can't be deleted
+    supplier_id = db.Column(db.Integer, db.ForeignKey('suppliers.supplier_id', ondelete='CASCADE'), nullable=False, index=True)
+    record_id = db.Column(db.Integer, db.ForeignKey('records.record_id', ondelete='RESTRICT'), nullable=False, index=True)
+    stock_quantity = db.Column(db.Integer, nullable=False, index=True)
     price = db.Column(db.Numeric(10, 2), nullable=False)
+
+    supplier = db.relationship("Suppliers", back_populates="inventory")
+    record = db.relationship("Records", back_populates="inventory")
     
-class InventorySchema(ma.Schema):
+class InventorySchema(MeteredSchema):
     class Meta:
         fields = ("inventory_id", "supplier_id","record_id", "stock_quantity", "price")
 
@@ -0,0 +1,12 @@
+from init import db
+
+class InventorySummary(db.Model):
+    __tablename__ = 'inventory_summary'
+    
+    # Running totals per supplier and per record, kept up to date by the inventory write handlers
+    group_type = db.Column(db.String(16), primary_key=True)  # "supplier" or "record"
+    group_key = db.Column(db.Integer, primary_key=True)
+    units = db.Column(db.BigInteger, nullable=False, default=0)
+    valuation = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    skus = db.Column(db.Integer, nullable=False, default=0)
+    low_stock_skus = db.Column(db.Integer, nullable=False, default=0)
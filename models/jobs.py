@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+from marshmallow import fields  # type: ignore
+from init import db
+from utils.metrics import MeteredSchema
+
+class Jobs(db.Model):
+    __tablename__ = 'jobs'
+
+    # One row per background job; the row is the queue, the lock and the checkpoint
+    job_id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)
+    params = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default="queued", index=True)  # queued, running, done or failed
+    checkpoint = db.Column(db.JSON, nullable=True)  # Written in the same transaction as each chunk of work
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    processed = db.Column(db.BigInteger, nullable=False, default=0)  # Rows done so far
+    total = db.Column(db.BigInteger, nullable=True)  # Rows to do, when known up front
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    worker = db.Column(db.String(255), nullable=True)  # host:pid of the process running it
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+
+def utcnow():
+    # Naive UTC, as the DateTime columns store it
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class JobsSchema(MeteredSchema):
+    params = fields.Method("get_params")
+    elapsed_seconds = fields.Method("get_elapsed_seconds")
+    rows_per_second = fields.Method("get_rows_per_second")
+    eta_seconds = fields.Method("get_eta_seconds")
+
+    class Meta:
+        fields = (
+            "job_id", "kind", "params", "status", "checkpoint", "result", "error", "processed", "total", "attempts",
+            "worker", "created_at", "started_at", "heartbeat_at", "finished_at", "elapsed_seconds", "rows_per_second", "eta_seconds",
+        )
+
+    def get_params(self, job):
+        # Bulk import rows are summarised by their count
+        params = dict(job.params or {})
+        if isinstance(params.get("rows"), list):
+            params["rows"] = len(params["rows"])
+        return params
+
+    def get_elapsed_seconds(self, job):
+        if job.started_at is None:
+            return None
+        return round(((job.finished_at or utcnow()) - job.started_at).total_seconds(), 3)
+
+    def get_rows_per_second(self, job):
+        elapsed = self.get_elapsed_seconds(job)
+        return round(job.processed / elapsed, 1) if elapsed else None
+
+    def get_eta_seconds(self, job):
+        rate = self.get_rows_per_second(job)
+        if job.status != "running" or not rate or job.total is None:
+            return None
+        return round(max(job.total - job.processed, 0) / rate, 1)
+
+
+job_schema = JobsSchema()
@@ -1,25 +1,39 @@
-from init import db, ma
+from marshmallow import fields  # type: ignore
+from init import db
+from utils.metrics import MeteredSchema
 
 class Orders(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # A customer's orders in a date range are one index range scan
+        db.Index("ix_orders_customer_id_order_date", "customer_id", "order_date"),
+    )
     
     order_id = db.Column(db.Integer, primary_key=True)
     customer_id = db.Column(
         db.Integer, 
         db.ForeignKey('customers.customer_id', ondelete='CASCADE'), 
-        nullable=True  # Allow null customer_id
+        nullable=True,  # Allow null customer_id
+        index=True
     )
     record_id = db.Column(
         db.Integer, 
-        db.ForeignKey('records.record_id'), 
-        nullable=False  # Assuming record_id is still required
+        db.ForeignKey('records.record_id', ondelete='RESTRICT'), 
+        nullable=False,  # Assuming record_id is still required
+        index=True
     )
-    order_date = db.Column(db.String(255), nullable=True)
+    order_date = db.Column(db.Date, nullable=True, index=True)
+    quantity = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    customer = db.relationship("Customers", back_populates="orders")
+    record = db.relationship("Records", back_populates="orders")
+
 
+class OrdersSchema(MeteredSchema):
+    order_date = fields.Date()
 
-class OrdersSchema(ma.Schema):
     class Meta:
-        fields = ("order_id", "customer_id","record_id", "order_date")
+        fields = ("order_id", "customer_id","record_id", "order_date", "quantity")
 
 
 order_schema = OrdersSchema()  # For a single order
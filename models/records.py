@@ -1,15 +1,79 @@
-from init import db, ma
+from init import db
+from utils.metrics import MeteredSchema
+
+# Statements that keep the SQLite FTS5 trigram index in sync with the records table.
+# It stands in for the Postgres pg_trgm GIN indexes so leading-wildcard searches don't scan the table.
+RECORDS_TRGM_SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS records_trgm USING fts5("
+    "title, artist, genre, content='records', content_rowid='record_id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS records_trgm_ai AFTER INSERT ON records BEGIN "
+    "INSERT INTO records_trgm(rowid, title, artist, genre) VALUES (new.record_id, new.title, new.artist, new.genre); END",
+    "CREATE TRIGGER IF NOT EXISTS records_trgm_ad AFTER DELETE ON records BEGIN "
+    "INSERT INTO records_trgm(records_trgm, rowid, title, artist, genre) VALUES ('delete', old.record_id, old.title, old.artist, old.genre); END",
+    "CREATE TRIGGER IF NOT EXISTS records_trgm_au AFTER UPDATE ON records BEGIN "
+    "INSERT INTO records_trgm(records_trgm, rowid, title, artist, genre) VALUES ('delete', old.record_id, old.title, old.artist, old.genre); "
+    "INSERT INTO records_trgm(rowid, title, artist, genre) VALUES (new.record_id, new.title, new.artist, new.genre); END",
+]
+
+# Full-text catalogue search. Postgres keeps a generated tsvector column with a GIN index,
+# title and artist weighted above genre.
+RECORDS_SEARCH_POSTGRES = [
+    "ALTER TABLE records ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(artist, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(genre, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_records_search_vector ON records USING gin (search_vector)",
+]
+
+# SQLite keeps a word-tokenized FTS5 table with prefix indexes, kept up to date by triggers
+RECORDS_FTS_SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5("
+    "title, artist, genre, content='records', content_rowid='record_id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS records_fts_ai AFTER INSERT ON records BEGIN "
+    "INSERT INTO records_fts(rowid, title, artist, genre) VALUES (new.record_id, new.title, new.artist, new.genre); END",
+    "CREATE TRIGGER IF NOT EXISTS records_fts_ad AFTER DELETE ON records BEGIN "
+    "INSERT INTO records_fts(records_fts, rowid, title, artist, genre) VALUES ('delete', old.record_id, old.title, old.artist, old.genre); END",
+    "CREATE TRIGGER IF NOT EXISTS records_fts_au AFTER UPDATE ON records BEGIN "
+    "INSERT INTO records_fts(records_fts, rowid, title, artist, genre) VALUES ('delete', old.record_id, old.title, old.artist, old.genre); "
+    "INSERT INTO records_fts(rowid, title, artist, genre) VALUES (new.record_id, new.title, new.artist, new.genre); END",
+]
 
 class Records(db.Model):
     __tablename__ = 'records'
+    __table_args__ = (
+        # Trigram GIN indexes so ilike('%x%') searches can use an index (Postgres only)
+        db.Index("ix_records_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        db.Index("ix_records_artist_trgm", "artist", postgresql_using="gin", postgresql_ops={"artist": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+        db.Index("ix_records_genre_trgm", "genre", postgresql_using="gin", postgresql_ops={"genre": "gin_trgm_ops"}).ddl_if(dialect="postgresql"),
+    )
     
     record_id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     artist = db.Column(db.String(255), nullable=False)
     price = db.Column(db.Numeric(10, 2), nullable=False)
     genre = db.Column(db.String(255), nullable=True)
+
+    # Deleting a record never touches its inventory or orders; the foreign keys protect them
+    inventory = db.relationship("Inventory", back_populates="record", passive_deletes="all")
+    orders = db.relationship("Orders", back_populates="record", passive_deletes="all")
+
+# The trigram operator class needs the pg_trgm extension
+db.event.listen(Records.__table__, "before_create", db.DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"))
+
+# SQLite fallback - an FTS5 trigram table kept up to date by triggers
+for statement in RECORDS_TRGM_SQLITE:
+    db.event.listen(Records.__table__, "after_create", db.DDL(statement).execute_if(dialect="sqlite"))
+db.event.listen(Records.__table__, "before_drop", db.DDL("DROP TABLE IF EXISTS records_trgm").execute_if(dialect="sqlite"))
+
+# Search structures for /records/search
+for statement in RECORDS_SEARCH_POSTGRES:
+    db.event.listen(Records.__table__, "after_create", db.DDL(statement).execute_if(dialect="postgresql"))
+for statement in RECORDS_FTS_SQLITE:
+    db.event.listen(Records.__table__, "after_create", db.DDL(statement).execute_if(dialect="sqlite"))
+db.event.listen(Records.__table__, "before_drop", db.DDL("DROP TABLE IF EXISTS records_fts").execute_if(dialect="sqlite"))
     
-class RecordsSchema(ma.Schema):
+class RecordsSchema(MeteredSchema):
     class Meta:
         fields = ("record_id", "title", "artist", "price", "genre")
 
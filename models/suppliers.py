@@ -1,4 +1,5 @@
-from init import db, ma
+from init import db
+from utils.metrics import MeteredSchema
 
 class Suppliers(db.Model):
     __tablename__ = 'suppliers'
@@ -8,7 +9,9 @@ class Suppliers(db.Model):
     email = db.Column(db.String(250),unique=True, nullable=False)
     phone_number = db.Column(db.Integer, nullable=False)
 
-class SuppliersSchema(ma.Schema):
+    inventory = db.relationship("Inventory", back_populates="supplier", passive_deletes="all")
+
+class SuppliersSchema(MeteredSchema):
     class Meta:
         fields = ("supplier_id", "name", "email", "phone_number")
 
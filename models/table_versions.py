@@ -0,0 +1,17 @@
+from init import db
+
+class TableVersions(db.Model):
+    __tablename__ = 'table_versions'
+    
+    # A table's version is this base plus its rows in table_version_log
+    table_name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class TableVersionLog(db.Model):
+    __tablename__ = 'table_version_log'
+
+    # One row per table a transaction wrote, inserted in that transaction. Inserts
+    # take no lock other writers wait on; the rows are folded into table_versions.
+    log_id = db.Column(db.BigInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    table_name = db.Column(db.String(64), nullable=False, index=True)
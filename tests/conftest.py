@@ -0,0 +1,29 @@
+import os
+import sys
+import pytest  # type: ignore
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # A fresh SQLite file per test, with the schema created from the models
+    monkeypatch.setenv("DATABASE_URI", f"sqlite:///{tmp_path / 'recordstore.db'}")
+    monkeypatch.setenv("CACHE_BACKEND", "none")
+    monkeypatch.setenv("JOB_WORKERS", "0")
+    from main import create_app
+    from init import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
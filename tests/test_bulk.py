@@ -0,0 +1,45 @@
+from init import db
+from models.records import Records
+
+
+def record(**values):
+    return {"title": "Blue Train", "artist": "John Coltrane", "genre": "jazz", "price": 20, **values}
+
+
+def test_bulk_rejects_a_repeated_primary_key(app, client):
+    response = client.post("/records/bulk", json=[record(record_id=7), record(), record(record_id=7, price=25)])
+    assert response.status_code == 400
+    assert [error["index"] for error in response.get_json()["errors"]] == [0, 2]
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.count()).select_from(Records)) == 0
+
+
+def test_bulk_upserts_distinct_primary_keys(app, client):
+    response = client.post("/records/bulk", json=[record(record_id=7), record(record_id=8)])
+    assert response.status_code == 201
+    response = client.post("/records/bulk", json=[record(record_id=7, price=25), record()])
+    assert response.status_code == 201
+    with app.app_context():
+        assert db.session.get(Records, 7).price == 25
+        assert db.session.scalar(db.select(db.func.count()).select_from(Records)) == 3
+
+
+def test_bulk_reports_badly_typed_values_per_row(app, client):
+    rows = [record(), record(price="abc"), record(title=5), record(price=10 ** 9), record(record_id="7")]
+    response = client.post("/records/bulk", json=rows)
+    assert response.status_code == 207
+    body = response.get_json()
+    assert [result["index"] for result in body["results"]] == [0]
+    assert [error["index"] for error in body["errors"]] == [1, 2, 3, 4]
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.count()).select_from(Records)) == 1
+
+
+def test_bulk_insert_returns_each_rows_id(app, client):
+    client.post("/records/bulk", json=[record(record_id=5)])
+    rows = [record(title=f"Take {n}") for n in range(30)]
+    response = client.post("/records/bulk", json=rows)
+    assert response.status_code == 201
+    with app.app_context():
+        for result in response.get_json()["results"]:
+            assert db.session.get(Records, result["record_id"]).title == f"Take {result['index']}"
@@ -0,0 +1,57 @@
+from init import db
+from models.customers import Customers
+
+
+def test_sqlite_cache_is_invalidated_by_another_process(app, tmp_path, monkeypatch):
+    # Two app instances stand in for two workers sharing the default backend
+    monkeypatch.setenv("CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    from main import create_app
+    reader, writer = create_app().test_client(), create_app().test_client()
+    with app.app_context():
+        db.session.add(Customers(name="Cached Customer", email="cached@example.com"))
+        db.session.commit()
+
+    assert reader.get("/customers/1").headers["X-Cache"] == "MISS"
+    assert reader.get("/customers/1").headers["X-Cache"] == "HIT"
+    assert writer.patch("/customers/1", json={"address": "2 Low Road"}).status_code == 200
+
+    response = reader.get("/customers/1")
+    assert response.headers["X-Cache"] == "MISS"
+    assert response.get_json()["address"] == "2 Low Road"
+
+
+def test_default_cache_path_is_per_database():
+    from utils.cache import default_cache_path
+    assert default_cache_path("sqlite:////tmp/a.db") != default_cache_path("sqlite:////tmp/b.db")
+
+
+def test_sqlite_cache_drops_a_read_overtaken_by_a_write(app, tmp_path, monkeypatch):
+    # The row was read before a write committed and invalidated it; storing it after would keep the old body
+    monkeypatch.setenv("CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    from main import create_app
+    from init import cache
+    reader = create_app()
+    with reader.app_context():
+        db.session.add(Customers(name="Cached Customer", email="cached@example.com"))
+        db.session.commit()
+        version = cache.version("customers")
+        db.session.get(Customers, 1).address = "2 Low Road"
+        db.session.commit()
+        cache.set_many("customers", version, {1: b"old body"})
+        assert cache.get_many("customers", [1]) == {}
+
+
+def test_sqlite_cache_stats_are_shared_by_processes(app, tmp_path, monkeypatch):
+    monkeypatch.setenv("CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    from main import create_app
+    first, second = create_app().test_client(), create_app().test_client()
+    with app.app_context():
+        db.session.add(Customers(name="Cached Customer", email="cached@example.com"))
+        db.session.commit()
+
+    assert first.get("/customers/1").headers["X-Cache"] == "MISS"
+    assert second.get("/customers/1").headers["X-Cache"] == "HIT"
+    assert first.get("/_cache/stats").get_json()["customers"] == {"hits": 1, "misses": 1}
@@ -0,0 +1,37 @@
+from init import db
+from models.inventory import Inventory
+from models.records import Records
+from models.suppliers import Suppliers
+
+
+def stock_split(app, *quantities):
+    # One record whose stock is spread over a supplier per quantity
+    with app.app_context():
+        db.session.add(Records(title="Blue Train", artist="John Coltrane", genre="jazz", price=20))
+        for index, quantity in enumerate(quantities, start=1):
+            db.session.add(Suppliers(name=f"Supplier{index}", email=f"supplier{index}@example.com", phone_number=f"04000000{index:02}"))
+            db.session.flush()
+            db.session.add(Inventory(supplier_id=index, record_id=1, stock_quantity=quantity, price=20))
+        db.session.commit()
+
+
+def test_place_order_draws_stock_from_several_suppliers(app, client):
+    stock_split(app, 3, 5, 4)
+    response = client.post("/orders/place", json={"lines": [{"record_id": 1, "quantity": 10}]})
+    assert response.status_code == 201
+    reservations = response.get_json()["reservations"]
+    assert [(reservation["inventory_id"], reservation["quantity"]) for reservation in reservations] == [(2, 5), (3, 4), (1, 1)]
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.sum(Inventory.stock_quantity))) == 2
+
+    response = client.post("/orders/place", json={"lines": [{"record_id": 1, "quantity": 3}]})
+    assert response.status_code == 409
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.sum(Inventory.stock_quantity))) == 2
+
+
+def test_place_order_rejects_a_non_integer_customer_id(app, client):
+    stock_split(app, 3)
+    for customer_id in ("1", 1.5, True, [1]):
+        response = client.post("/orders/place", json={"customer_id": customer_id, "lines": [{"record_id": 1}]})
+        assert response.status_code == 400, customer_id
@@ -0,0 +1,43 @@
+from init import db
+from models.customers import Customers
+from models.suppliers import Suppliers
+from utils.export import export_tables, read_watermarks
+
+
+def add_customers(count, start=0):
+    db.session.add_all([Customers(name=f"Customer {start + index}", email=f"customer{start + index}@example.com") for index in range(count)])
+    db.session.commit()
+
+
+def test_full_export_keeps_the_watermarks_of_other_tables(app, tmp_path):
+    dest = str(tmp_path / "export")
+    with app.app_context():
+        add_customers(3)
+        db.session.add(Suppliers(name="Supplier", email="supplier@example.com", phone_number=5550100))
+        db.session.commit()
+        export_tables(dest, ["customers", "suppliers"])
+
+        add_customers(2, start=3)
+        export_tables(dest, ["suppliers"], full=True)
+        watermarks = read_watermarks(dest)
+        assert watermarks["customers"] == 3
+        assert watermarks["suppliers"] == 1
+
+        # The next incremental run of customers only adds the new rows
+        assert export_tables(dest, ["customers"])["customers"]["rows"] == 2
+
+
+def test_full_lance_export_of_an_emptied_table(app, tmp_path):
+    import lance  # type: ignore
+
+    dest = str(tmp_path / "export")
+    with app.app_context():
+        add_customers(3)
+        export_tables(dest, ["customers"], file_format="lance")
+        db.session.execute(db.delete(Customers))
+        db.session.commit()
+        export_tables(dest, ["customers"], file_format="lance", full=True)
+
+    dataset = lance.dataset(str(tmp_path / "export" / "customers"))
+    assert dataset.count_rows() == 0
+    assert dataset.schema.names == [column.key for column in Customers.__table__.columns]
@@ -0,0 +1,61 @@
+import os
+import time
+from datetime import timedelta
+from init import db
+from models.jobs import Jobs, utcnow
+
+
+def test_stale_job_is_resumed_at_startup(app, monkeypatch):
+    # A job left running by a worker that died before the restart, and no new submit
+    with app.app_context():
+        long_ago = utcnow() - timedelta(hours=1)
+        job = Jobs(
+            kind="refresh_customer_stats", params={}, status="running", attempts=1,
+            created_at=long_ago, started_at=long_ago, heartbeat_at=long_ago,
+        )
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.job_id
+
+    monkeypatch.setenv("JOB_WORKERS", "1")
+    monkeypatch.setenv("JOB_POLL_SECONDS", "0.2")
+    from main import create_app
+    restarted = create_app()
+    runner = restarted.extensions.get("job_runner")
+    assert runner is not None
+    try:
+        deadline = time.monotonic() + 60
+        status = None
+        while time.monotonic() < deadline:
+            with app.app_context():
+                status, attempts = db.session.execute(db.select(Jobs.status, Jobs.attempts).where(Jobs.job_id == job_id)).one()
+                db.session.remove()
+            if status != "running":
+                break
+            time.sleep(0.2)
+        assert status == "done"
+        assert attempts == 2
+    finally:
+        runner.shutdown()
+        with restarted.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+def test_post_jobs_limits_kind_scale_and_export_dest(app, client, tmp_path):
+    app.config["EXPORT_ROOT"] = str(tmp_path / "exports")
+    app.config["MAX_SEED_SCALE"] = 1000
+
+    response = client.post("/jobs/", json={"kind": "delete", "params": {"table": "customers", "id": 1}})
+    assert response.status_code == 400
+    response = client.post("/jobs/", json={"kind": "seed", "params": {"scale": 1001}})
+    assert response.status_code == 400
+    for dest in ("../elsewhere", "/tmp", "a/../../b"):
+        response = client.post("/jobs/", json={"kind": "export", "params": {"dest": dest}})
+        assert response.status_code == 400, dest
+
+    response = client.post("/jobs/", json={"kind": "export", "params": {"dest": "nightly", "tables": ["records"]}})
+    assert response.status_code == 202
+    with app.app_context():
+        job = db.session.get(Jobs, response.get_json()["job_id"])
+        assert job.params["dest"] == os.path.realpath(tmp_path / "exports" / "nightly")
@@ -0,0 +1,20 @@
+from init import db
+from models.records import Records
+
+
+def test_ndjson_stream_has_the_same_rows_as_a_list_page(app, client):
+    with app.app_context():
+        db.session.add_all([
+            Records(title=f"Café Tango {index}", artist="Astor Piazzolla", genre="tango", price=10 + index / 4)
+            for index in range(5)
+        ])
+        db.session.commit()
+
+    for fields in ("", "&fields=record_id,title"):
+        page = client.get(f"/records/?limit=10{fields}")
+        stream = client.get(f"/records/?stream=ndjson{fields}")
+        assert stream.mimetype == "application/x-ndjson"
+        lines = stream.get_data().splitlines()
+        assert len(lines) == 5
+        # Line for line the compact encoding of the page's rows
+        assert b"[" + b",".join(lines) + b"]\n" == page.get_data()
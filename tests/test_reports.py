@@ -0,0 +1,32 @@
+from datetime import date
+from init import db
+from models.orders import Orders
+from models.records import Records
+
+
+def add_orders(app, *order_dates):
+    with app.app_context():
+        db.session.add(Records(record_id=1, title="Kind of Blue", artist="Miles Davis", genre="jazz", price=10))
+        db.session.add_all([Orders(record_id=1, quantity=1, order_date=order_date) for order_date in order_dates])
+        db.session.commit()
+
+
+def test_orders_before_1970_are_dated(app, client):
+    add_orders(app, date(1965, 3, 1), date(1969, 12, 31), None, date(2020, 5, 1))
+    report = client.get("/reports/sales?group_by=genre").get_json()
+    assert report["undated_orders"] == 1
+    assert report["totals"]["orders"] == 3
+
+    report = client.get("/reports/sales?from=1965-03-01&to=1965-03-03").get_json()
+    assert [group["orders"] for group in report["groups"]] == [1, 0, 0]
+
+
+def test_day_report_cap_applies_to_a_single_bound(app, client):
+    add_orders(app, date(2020, 5, 1), date(2021, 1, 1))
+    assert client.get("/reports/sales?from=1990-01-01").status_code == 400
+    assert client.get("/reports/sales?to=2040-01-01").status_code == 400
+    assert client.get("/reports/sales?from=1990-01-01&to=2040-01-01").status_code == 400
+
+    report = client.get("/reports/sales?from=2020-01-01").get_json()
+    assert report["groups"][0]["day"] == "2020-01-01"
+    assert report["groups"][-1]["day"] == "2021-01-01"
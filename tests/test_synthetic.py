@@ -0,0 +1,57 @@
+import threading
+import pytest  # type: ignore
+from sqlalchemy import event  # type: ignore
+from init import db
+from models.customers import Customers
+from models.customer_stats import CustomerStats
+from models.orders import Orders
+from models.records import Records
+from utils import synthetic
+from utils.synthetic import catalogue_sizes, generate_catalogue
+
+
+def count(model):
+    return db.session.scalar(db.select(db.func.count()).select_from(model))
+
+
+@pytest.fixture
+def parallel_sqlite(app, monkeypatch):
+    # Force the parallel path on SQLite. Its deferred transactions can fail with
+    # "database is locked" when they upgrade to write at the same time, so the
+    # pool threads' chunk transactions take the write lock up front and queue on it.
+    monkeypatch.setattr(synthetic, "parallel_load", lambda engine, workers: workers > 1)
+
+    def begin(connection):
+        if threading.current_thread().name.startswith("ThreadPoolExecutor"):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "begin", begin)
+    yield
+    event.remove(engine, "begin", begin)
+
+
+def test_seed_with_parallel_workers(app, parallel_sqlite):
+    # The pool threads have no app context
+    with app.app_context():
+        result = generate_catalogue(200, workers=4, chunk_size=50)
+        sizes = catalogue_sizes(200)
+        assert count(Records) == sizes["records"]
+        assert count(Customers) == sizes["customers"]
+        assert count(Orders) == sizes["orders"]
+        # Every customer with an order has its rollup row
+        ordering = db.select(db.func.count(db.distinct(Orders.customer_id))).where(Orders.customer_id.is_not(None))
+        assert count(CustomerStats) == db.session.scalar(ordering) > 0
+        assert result["rows"] == sum(result["tables"][name]["rows"] for name in result["tables"])
+
+
+def test_seed_is_the_same_for_any_number_of_workers(app, parallel_sqlite):
+    with app.app_context():
+        generate_catalogue(100, workers=1, chunk_size=30, seed=7)
+        serial = db.session.execute(db.select(Records.title, Records.price).order_by(Records.record_id)).all()
+        db.drop_all()
+        db.create_all()
+        generate_catalogue(100, workers=3, chunk_size=30, seed=7)
+        parallel = db.session.execute(db.select(Records.title, Records.price).order_by(Records.record_id)).all()
+        assert serial == parallel
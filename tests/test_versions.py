@@ -0,0 +1,64 @@
+import pytest  # type: ignore
+from init import db
+from models.customers import Customers
+from utils import versions
+from utils.versions import current_versions, rewrites
+
+
+def add_customer(name):
+    db.session.add(Customers(name=name, email=f"{name.lower().replace(' ', '.')}@example.com"))
+    db.session.commit()
+
+
+def test_commit_bumps_the_versions_of_written_tables(app):
+    with app.app_context():
+        before = current_versions(["customers", rewrites("customers")])
+        add_customer("First Customer")
+        assert current_versions(["customers", rewrites("customers")]) == [before[0] + 1, before[1]]
+
+        db.session.execute(db.update(Customers).values(address="1 High Street"))
+        db.session.commit()
+        assert current_versions(["customers", rewrites("customers")]) == [before[0] + 2, before[1] + 1]
+
+
+def test_failed_bump_rolls_the_write_back(app, monkeypatch):
+    # The bump is part of the writer's transaction, so data never changes without its version
+    def fail(connection, table_names):
+        raise RuntimeError("version bump failed")
+
+    with app.app_context():
+        version = current_versions(["customers"])[0]
+        with monkeypatch.context() as patch:
+            patch.setattr(versions, "bump_versions", fail)
+            with pytest.raises(RuntimeError):
+                add_customer("Lost Customer")
+        db.session.rollback()
+
+        assert db.session.scalar(db.select(db.func.count()).select_from(Customers)) == 0
+        assert current_versions(["customers"])[0] == version
+
+
+def test_compacting_the_log_keeps_the_versions(app):
+    with app.app_context():
+        for index in range(3):
+            add_customer(f"Customer {index}")
+        before = current_versions(["customers", rewrites("customers"), "orders"])
+        assert db.session.scalar(db.select(db.func.count()).select_from(versions.log_table)) > 0
+
+        with db.engine.begin() as connection:
+            versions.compact_versions(connection, ["customers", "orders"])
+        assert current_versions(["customers", rewrites("customers"), "orders"]) == before
+        assert db.session.scalar(db.select(db.func.count()).select_from(versions.log_table)) == 0
+
+        add_customer("Customer 3")
+        assert current_versions(["customers"])[0] == before[0] + 1
+
+
+def test_log_is_compacted_after_enough_writes(app, monkeypatch):
+    monkeypatch.setattr(versions, "VERSION_LOG_COMPACT_EVERY", 4)
+    monkeypatch.setitem(versions._appended, "rows", 0)
+    with app.app_context():
+        for index in range(6):
+            add_customer(f"Customer {index}")
+        assert current_versions(["customers"])[0] == 6
+        assert db.session.scalar(db.select(db.func.count()).select_from(versions.log_table)) < 6
@@ -0,0 +1,75 @@
+from flask import current_app, request  # type: ignore
+from init import db, cache
+from utils.errors import QueryArgumentError
+from utils.expand import expand
+from utils.serialize import column_select
+
+# Ids accepted by one batch request
+MAX_BATCH_IDS = 10000
+
+# Ids per WHERE pk IN (...) query
+BATCH_CHUNK_SIZE = 500
+
+
+def get_batch_ids():
+    # ?ids=1,2,3 on GET; {"ids": [1, 2, 3]} or [1, 2, 3] as the POST body
+    if request.method == "POST":
+        body = request.get_json(silent=True)
+        ids = body.get("ids") if isinstance(body, dict) else body
+        if not isinstance(ids, list) or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+            raise QueryArgumentError("The body must be a JSON list of integer ids, or {\"ids\": [...]}.")
+    else:
+        try:
+            ids = [int(pk) for pk in request.args.get("ids", "").split(",") if pk.strip()]
+        except ValueError:
+            raise QueryArgumentError("ids must be a comma separated list of integer ids.")
+
+    if not ids:
+        raise QueryArgumentError("At least one id is required.")
+    if len(ids) > MAX_BATCH_IDS:
+        raise QueryArgumentError(f"At most {MAX_BATCH_IDS} ids can be requested at once.")
+    return ids
+
+
+def fetch_bodies(model, schema, pks):
+    # JSON body of each found row, as the single-entity GET route would return it, keyed by pk
+    pk_column = model.__mapper__.primary_key[0]
+    stmt, schema = expand(db.select(model), model, schema)
+    fast = column_select(stmt, schema)
+    bodies = {}
+    for start in range(0, len(pks), BATCH_CHUNK_SIZE):
+        chunk = pks[start:start + BATCH_CHUNK_SIZE]
+        if fast is not None:
+            columns_stmt, to_dict = fast
+            rows = db.session.execute(columns_stmt.add_columns(pk_column).where(pk_column.in_(chunk))).all()
+            bodies.update((row[-1], current_app.json.dumps_compact(to_dict(row)) + b"\n") for row in rows)
+        else:
+            rows = db.session.scalars(stmt.where(pk_column.in_(chunk))).all()
+            bodies.update((getattr(row, pk_column.key), current_app.json.dumps_compact(schema.dump(row)) + b"\n") for row in rows)
+    return bodies
+
+
+def batch_get(model, schema, namespace):
+    # Rows for a list of ids in request order; a missing id gets {"<pk>": id, "not_found": true}.
+    # Plain responses are shared with the single-entity routes' cache entries.
+    ids = get_batch_ids()
+    pk_key = model.__mapper__.primary_key[0].key
+    unique_ids = list(dict.fromkeys(ids))
+
+    # Expanded rows embed other tables, whose writes don't invalidate this namespace
+    use_cache = not request.args.get("expand")
+    bodies = cache.get_many(namespace, unique_ids) if use_cache else {}
+    missing = [pk for pk in unique_ids if pk not in bodies]
+    if missing:
+        version = cache.version(namespace) if use_cache else None
+        fetched = fetch_bodies(model, schema, missing)
+        if use_cache:
+            cache.set_many(namespace, version, fetched)
+        bodies.update(fetched)
+
+    # Cached bodies end in a newline, as responses do
+    items = [
+        bodies[pk][:-1] if pk in bodies else current_app.json.dumps_compact({pk_key: pk, "not_found": True})
+        for pk in ids
+    ]
+    return current_app.response_class(b"[" + b",".join(items) + b"]\n", mimetype=current_app.json.mimetype)
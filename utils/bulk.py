@@ -0,0 +1,300 @@
+import json
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from flask import request  # type: ignore
+from sqlalchemy import insert, text  # type: ignore
+from sqlalchemy.dialects import postgresql, sqlite  # type: ignore
+from sqlalchemy.exc import IntegrityError, StatementError  # type: ignore
+from sqlalchemy.sql.compiler import InsertmanyvaluesSentinelOpts  # type: ignore
+from init import db, cache
+from models.customers import Customers
+from models.suppliers import Suppliers
+from models.records import Records
+from models.inventory import Inventory
+from models.orders import Orders
+from utils.dates import parse_date
+from utils.inventory_summary import bulk_groups, refresh_groups
+from utils.customer_stats import bulk_customers, refresh_customers
+from utils.versions import changed_tables, rewrites
+
+# Rows per multi-row INSERT statement
+BULK_BATCH_SIZE = 1000
+
+# Ids per IN (...) list when checking foreign keys, to stay under bind parameter limits
+ID_LOOKUP_CHUNK_SIZE = 5000
+
+
+def get_bulk_rows():
+    # Accept either a JSON array or newline-delimited JSON (one object per line)
+    if request.mimetype == "application/x-ndjson":
+        rows = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                # Keep the row's position so the error can be reported against it
+                rows.append(None)
+        return rows
+
+    body_data = request.get_json(silent=True)
+    if isinstance(body_data, list):
+        return body_data
+    return None
+
+
+def chunked(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def existing_ids(pk_column, ids):
+    # Set-based existence check - one SELECT ... WHERE pk IN (...) per chunk of ids
+    found = set()
+    for chunk in chunked(list(ids), ID_LOOKUP_CHUNK_SIZE):
+        found.update(db.session.scalars(db.select(pk_column).where(pk_column.in_(chunk))))
+    return found
+
+
+def repeated_keys(valid_rows, pk_name):
+    # Errors for the rows that share a primary key with another row of the request
+    indexes = defaultdict(list)
+    for index, values in valid_rows:
+        pk = values.get(pk_name)
+        if isinstance(pk, (int, float, str)):
+            indexes[pk].append(index)
+    return [
+        {"index": index, "message": f"{pk_name} {pk} is repeated in rows {', '.join(map(str, repeated))}."}
+        for pk, repeated in indexes.items() if len(repeated) > 1
+        for index in repeated
+    ]
+
+
+def column_value(column, value):
+    # The JSON value of a row checked against its column's type, so a value the
+    # database would reject is reported against its row instead of failing the batch
+    if value is None:
+        if not column.nullable and not column.primary_key:
+            raise ValueError("must not be null")
+        return None
+    column_type = column.type
+    if isinstance(column_type, db.Integer):
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError("must be an integer")
+        if not -2**31 <= value < 2**31 and not isinstance(column_type, db.BigInteger):
+            raise ValueError("is out of range")
+        return value
+    if isinstance(column_type, db.Numeric):
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError("must be a number")
+        try:
+            number = Decimal(str(value))
+        except InvalidOperation:
+            raise ValueError("must be a number")
+        if not number.is_finite():
+            raise ValueError("must be a number")
+        if column_type.precision is not None and abs(number) >= 10 ** (column_type.precision - (column_type.scale or 0)):
+            raise ValueError("is out of range")
+        return number
+    if isinstance(column_type, db.String):
+        if not isinstance(value, str):
+            raise ValueError("must be a string")
+        if column_type.length is not None and len(value) > column_type.length:
+            raise ValueError(f"must be at most {column_type.length} characters")
+        return value
+    return value
+
+
+def upsert_statement(model, pk_column, fields):
+    # INSERT ... ON CONFLICT (pk) DO UPDATE for the dialects that support it
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(model)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model)
+    else:
+        return None
+
+    return stmt.on_conflict_do_update(
+        index_elements=[pk_column],
+        set_={field: stmt.excluded[field] for field in fields if field != pk_column.key},
+    )
+
+
+def insert_batch(model, pk_column, rows):
+    # New ids of a batch of rows, in the rows' order
+    dialect = db.session.get_bind().dialect
+    if not dialect.insertmanyvalues_implicit_sentinel & InsertmanyvaluesSentinelOpts.NOT_SUPPORTED:
+        stmt = insert(model).returning(pk_column, sort_by_parameter_order=True)
+        return db.session.scalars(stmt, rows).all()
+    # A dialect that can't sort batched RETURNING by the autoincrement id (SQLite)
+    # would run the statement above once per row.
+    # One multi-row INSERT gives its rows ascending new ids in VALUES order, so
+    # its RETURNING ids sorted are the rows' ids.
+    return sorted(db.session.scalars(insert(model).values(rows).returning(pk_column)))
+
+
+def reset_pk_sequence(model, pk_column):
+    # Rows written with explicit ids do not advance the Postgres sequence
+    if db.session.get_bind().dialect.name != "postgresql":
+        return
+    table = model.__tablename__
+    db.session.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{table}', '{pk_column.key}'), "
+        f"GREATEST((SELECT max({pk_column.key}) FROM {table}), 1))"
+    ))
+
+
+def bulk_write(model, rows, required, foreign_keys=None, converters=None):
+    # Validate every row, check foreign keys with one IN query per referenced table,
+    # then write in batched multi-row INSERT / upsert statements inside one transaction
+    if not rows:
+        return {"message": "A JSON array or NDJSON body of rows is required."}, 400
+
+    pk_column = model.__mapper__.primary_key[0]
+    columns = {column.key: column for column in model.__table__.columns}
+    fields = list(columns)
+    # Every row of an executemany needs the same keys, so absent values fall back to the column default
+    defaults = {
+        column.key: column.default.arg
+        for column in model.__table__.columns
+        if column.default is not None and column.default.is_scalar
+    }
+    errors = []
+    valid_rows = []
+
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.append({"index": index, "message": "Row must be a JSON object."})
+            continue
+
+        missing = [field for field in required if row.get(field) in (None, "")]
+        if missing:
+            errors.append({"index": index, "message": f"Missing required fields: {', '.join(missing)}"})
+            continue
+
+        values = {
+            field: row[field] if row.get(field) is not None else defaults.get(field)
+            for field in fields
+            if field != pk_column.key
+        }
+        if row.get(pk_column.key) is not None:
+            values[pk_column.key] = row[pk_column.key]
+
+        # Per-field parsing of JSON values, e.g. date strings to dates, and a type check of the rest
+        try:
+            for field, convert in (converters or {}).items():
+                values[field] = convert(values.get(field))
+            for field, column in columns.items():
+                if field in values and field not in (converters or {}):
+                    values[field] = column_value(column, values[field])
+        except ValueError as err:
+            errors.append({"index": index, "message": f"Invalid {field}: {err}"})
+            continue
+        valid_rows.append((index, values))
+
+    # An upsert can't write one row twice (Postgres rejects the whole statement),
+    # and which of the repeated rows should win is ambiguous, so nothing is written
+    repeated = repeated_keys(valid_rows, pk_column.key)
+    if repeated:
+        repeated.sort(key=lambda error: error["index"])
+        return {"message": f"Rows repeat {pk_column.key} values, no rows were written.", "errors": repeated}, 400
+
+    for field, ref_column in (foreign_keys or {}).items():
+        wanted = {values[field] for _, values in valid_rows if values.get(field) is not None}
+        bad_type = {value for value in wanted if not isinstance(value, int)}
+        found = existing_ids(ref_column, wanted - bad_type)
+
+        checked_rows = []
+        for index, values in valid_rows:
+            value = values.get(field)
+            if value is not None and value not in found:
+                errors.append({"index": index, "message": f"{field} {value} does not exist."})
+            else:
+                checked_rows.append((index, values))
+        valid_rows = checked_rows
+
+    # Rows carrying their primary key are upserted, the rest are inserted
+    upserts = [(index, values) for index, values in valid_rows if pk_column.key in values]
+    inserts = [(index, values) for index, values in valid_rows if pk_column.key not in values]
+    results = []
+
+    try:
+        if upserts:
+            stmt = upsert_statement(model, pk_column, fields)
+            if stmt is None:
+                for index, _ in upserts:
+                    errors.append({"index": index, "message": "Upsert is not supported by this database."})
+            else:
+                # The rows carry their ids, so no RETURNING is needed
+                for batch in chunked(upserts, BULK_BATCH_SIZE):
+                    db.session.execute(stmt, [values for _, values in batch])
+                    results.extend({"index": index, pk_column.key: values[pk_column.key]} for index, values in batch)
+                reset_pk_sequence(model, pk_column)
+                # Upserts may replace existing rows
+                changed_tables(db.session).add(rewrites(model.__tablename__))
+
+        for batch in chunked(inserts, BULK_BATCH_SIZE):
+            ids = insert_batch(model, pk_column, [values for _, values in batch])
+            results.extend({"index": index, pk_column.key: pk} for (index, _), pk in zip(batch, ids))
+
+        db.session.commit()
+
+    except IntegrityError as err:
+        db.session.rollback()
+        return {"message": f"No rows were written: {err.orig}"}, 409
+    except StatementError as err:
+        # A value the checks above let through but the database rejected
+        db.session.rollback()
+        return {"message": f"No rows were written: {getattr(err, 'orig', None) or err}"}, 400
+
+    results.sort(key=lambda result: result["index"])
+    errors.sort(key=lambda error: error["index"])
+
+    if not results:
+        status = 400
+    elif errors:
+        status = 207
+    else:
+        status = 201
+    return {"results": results, "errors": errors}, status
+
+
+# Model, required fields, foreign keys and value converters of each table's /bulk route
+BULK_TABLES = {
+    "records": (Records, ("title", "artist", "genre", "price"), None, None),
+    "orders": (
+        Orders,
+        ("record_id",),
+        {"record_id": Records.record_id, "customer_id": Customers.customer_id},
+        {"order_date": parse_date},
+    ),
+    "inventory": (
+        Inventory,
+        ("supplier_id", "record_id", "stock_quantity", "price"),
+        {"supplier_id": Suppliers.supplier_id, "record_id": Records.record_id},
+        None,
+    ),
+}
+
+
+def bulk_import(table_name, rows):
+    # A table's bulk write: rows with a primary key replace the existing row. Keeps
+    # the inventory summary and customer stats current and drops the table's cached responses.
+    model, required, foreign_keys, converters = BULK_TABLES[table_name]
+    affected = bulk_groups(rows) if table_name == "inventory" else None
+    customers = bulk_customers(table_name, rows) if table_name in ("orders", "records") else set()
+
+    response = bulk_write(model, rows, required, foreign_keys, converters)
+    if affected is not None:
+        refresh_groups("supplier", affected["supplier"])
+        refresh_groups("record", affected["record"])
+        db.session.commit()
+    if customers:
+        refresh_customers(customers)
+        db.session.commit()
+    # Upserted rows can be any row, so drop every cached one
+    cache.invalidate(table_name)
+    return response
+
@@ -0,0 +1,300 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import wraps
+from flask import current_app, request  # type: ignore
+from utils.database import read_from_primary
+
+
+class MemoryCacheBackend:
+    # In-process LRU cache with a TTL per entry. Each process has its own copy and
+    # only sees its own invalidations, so a write made by another gunicorn worker or
+    # a job worker shows up here only once CACHE_TTL has passed. Single process only.
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.counts = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def get_many(self, keys):
+        return {key: value for key in keys if (value := self.get(key)) is not None}
+
+    def set(self, key, value, ttl):
+        with self.lock:
+            self.entries[key] = (time.time() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def set_many(self, items, ttl):
+        for key, value in items.items():
+            self.set(key, value, ttl)
+
+    def delete_many(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self.lock:
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                del self.entries[key]
+
+    def count(self, namespace, hits, misses):
+        with self.lock:
+            self.counts[namespace]["hits"] += hits
+            self.counts[namespace]["misses"] += misses
+
+    def stats(self):
+        with self.lock:
+            return {namespace: dict(counts) for namespace, counts in self.counts.items()}
+
+
+class SQLiteCacheBackend:
+    # Cache shared by every worker process on the host, stored in a local SQLite file
+
+    # Evict least recently used entries once every this many writes
+    EVICT_EVERY = 100
+
+    # Keys per IN (...) lookup, under SQLite's bound parameter limit
+    KEYS_PER_QUERY = 500
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self.local = threading.local()
+        self.writes = 0
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_accessed_at ON response_cache (accessed_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_stats ("
+                "namespace TEXT PRIMARY KEY, hits INTEGER NOT NULL, misses INTEGER NOT NULL)"
+            )
+            self.local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self.connection()
+        now = time.time()
+        row = conn.execute("SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] < now:
+            conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def get_many(self, keys):
+        # Live entries among keys, looked up a chunk of keys per query
+        conn = self.connection()
+        now = time.time()
+        found = {}
+        for start in range(0, len(keys), self.KEYS_PER_QUERY):
+            chunk = keys[start:start + self.KEYS_PER_QUERY]
+            rows = conn.execute(
+                f"SELECT key, value FROM response_cache WHERE key IN ({', '.join('?' for _ in chunk)}) AND expires_at >= ?",
+                (*chunk, now),
+            ).fetchall()
+            found.update(rows)
+        conn.executemany("UPDATE response_cache SET accessed_at = ? WHERE key = ?", [(now, key) for key in found])
+        return found
+
+    def set(self, key, value, ttl):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items, ttl):
+        conn = self.connection()
+        now = time.time()
+        conn.executemany(
+            "INSERT OR REPLACE INTO response_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            [(key, value, now + ttl, now) for key, value in items.items()],
+        )
+        self.writes += len(items)
+        if self.writes >= self.EVICT_EVERY:
+            self.writes = 0
+            conn.execute(
+                "DELETE FROM response_cache WHERE key NOT IN "
+                "(SELECT key FROM response_cache ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+    def delete_many(self, keys):
+        self.connection().executemany("DELETE FROM response_cache WHERE key = ?", [(key,) for key in keys])
+
+    def delete_prefix(self, prefix):
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        self.connection().execute("DELETE FROM response_cache WHERE key LIKE ? ESCAPE '\\'", (escaped + "%",))
+
+    def count(self, namespace, hits, misses):
+        # Counted in the file, so the stats cover every process that shares it
+        self.connection().execute(
+            "INSERT INTO cache_stats (namespace, hits, misses) VALUES (?, ?, ?) "
+            "ON CONFLICT (namespace) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+            (namespace, hits, misses),
+        )
+
+    def stats(self):
+        rows = self.connection().execute("SELECT namespace, hits, misses FROM cache_stats ORDER BY namespace").fetchall()
+        return {namespace: {"hits": hits, "misses": misses} for namespace, hits, misses in rows}
+
+
+def default_cache_path(database_uri):
+    # One cache file per database on the host, so apps on different databases don't share entries
+    digest = hashlib.sha1(str(database_uri).encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"recordstoredb-cache-{digest}.sqlite3")
+
+
+def table_version(table_name):
+    # Committed version of a table on a primary connection of its own, as the
+    # request's transaction may still be reading an older snapshot
+    from utils.versions import versions_select  # Imported here as utils.versions imports init, which imports this module
+    db = current_app.extensions["sqlalchemy"]
+    with db.engine.connect() as connection:
+        return dict(connection.execute(versions_select([table_name])).all()).get(table_name, 0)
+
+
+def entity_key(namespace, pk, query_string=""):
+    return f"{namespace}:{pk}:{query_string}"
+
+
+class ResponseCache:
+    # Read-through cache of serialized single-entity GET responses, keyed by
+    # namespace (the blueprint's table) and primary key
+
+    def __init__(self):
+        self.backend = None
+        self.ttl = 0
+
+    def init_app(self, app):
+        backend = app.config.get("CACHE_BACKEND", "sqlite")
+        max_entries = app.config.get("CACHE_MAX_ENTRIES", 10000)
+        self.ttl = app.config.get("CACHE_TTL", 300)
+
+        if backend == "memory":
+            self.backend = MemoryCacheBackend(max_entries)
+        elif backend == "sqlite":
+            path = app.config.get("CACHE_PATH") or default_cache_path(app.config.get("SQLALCHEMY_DATABASE_URI"))
+            self.backend = SQLiteCacheBackend(path, max_entries)
+        else:
+            self.backend = None
+
+        app.extensions["response_cache"] = self
+        app.add_url_rule("/_cache/stats", "cache_stats", self.stats_view)
+
+    def cached(self, namespace, pk_arg):
+        # Decorator for a single-entity GET view; only 200 responses are cached
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # Expanded responses embed rows from other tables, whose writes
+                # don't invalidate this namespace, so they are never cached
+                if self.backend is None or request.args.get("expand"):
+                    return view(*args, **kwargs)
+
+                key = entity_key(namespace, kwargs[pk_arg], request.query_string.decode())
+                data = self.backend.get(key)
+                if data is not None:
+                    self.backend.count(namespace, 1, 0)
+                    response = current_app.response_class(data, mimetype="application/json")
+                    response.headers["X-Cache"] = "HIT"
+                    return response
+
+                self.backend.count(namespace, 0, 1)
+                # A replica that lags a write would put the old row back in the cache for the whole TTL
+                read_from_primary()
+                version = table_version(namespace)
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    self.store(namespace, version, {key: response.get_data()})
+                response.headers["X-Cache"] = "MISS"
+                return response
+            return wrapper
+        return decorator
+
+    def get_many(self, namespace, pks):
+        # Cached bodies of the plain GET /<namespace>/<pk> responses, as {pk: body}
+        if self.backend is None:
+            return {}
+        found = self.backend.get_many([entity_key(namespace, pk) for pk in pks])
+        bodies = {pk: found[entity_key(namespace, pk)] for pk in pks if entity_key(namespace, pk) in found}
+        self.backend.count(namespace, len(bodies), len(pks) - len(bodies))
+        # Misses will be cached, so they are read from the primary, as in cached()
+        if len(bodies) < len(pks):
+            read_from_primary()
+        return bodies
+
+    def version(self, namespace):
+        # The version to pass to set_many, read before the rows it stores
+        if self.backend is None:
+            return None
+        return table_version(namespace)
+
+    def set_many(self, namespace, version, bodies):
+        # Store {pk: body} as the responses of GET /<namespace>/<pk>
+        if self.backend is not None and bodies:
+            self.store(namespace, version, {entity_key(namespace, pk): body for pk, body in bodies.items()})
+
+    def store(self, namespace, version, items):
+        # A write committed after the rows were read invalidates its keys once it
+        # has committed, which can be before these are stored. So they are stored
+        # first and dropped again if the table's version has moved since `version`
+        # was read before the rows. A write that commits after the check still
+        # invalidates them itself.
+        self.backend.set_many(items, self.ttl)
+        if table_version(namespace) != version:
+            self.backend.delete_many(list(items))
+
+    def get_value(self, namespace, key):
+        # A value stored by set_value, or None
+        if self.backend is None:
+            return None
+        value = self.backend.get(f"{namespace}:{key}")
+        self.backend.count(namespace, int(value is not None), int(value is None))
+        return value
+
+    def set_value(self, namespace, key, value):
+        if self.backend is not None:
+            self.backend.set(f"{namespace}:{key}", value, self.ttl)
+
+    def invalidate(self, namespace, pk=None):
+        # Drop one entity's cached responses, or the whole namespace when no pk is given
+        if self.backend is None:
+            return
+        prefix = f"{namespace}:" if pk is None else f"{namespace}:{pk}:"
+        self.backend.delete_prefix(prefix)
+
+    def clear(self):
+        # Drop every entry, e.g. once the tables are dropped and their ids may be reused
+        if self.backend is not None:
+            self.backend.delete_prefix("")
+
+    def stats_view(self):
+        return self.backend.stats() if self.backend is not None else {}
@@ -0,0 +1,136 @@
+import random
+import time
+from sqlalchemy import select, update  # type: ignore
+from sqlalchemy.exc import DBAPIError  # type: ignore
+from init import db
+from models.inventory import Inventory
+from models.orders import Orders
+from utils.inventory_summary import apply_change
+from utils.customer_stats import apply_order, order_snapshot
+
+# Attempts at reserving one order line. All but the last skip inventory rows
+# that a concurrent checkout has locked; the last one waits for them.
+MAX_RESERVE_ATTEMPTS = 3
+
+# Attempts at the whole order after a deadlock, serialization failure or lock timeout
+MAX_TRANSACTION_ATTEMPTS = 3
+
+# Base delay between retries in seconds, doubled per attempt with jitter
+RETRY_BACKOFF = 0.01
+
+# Postgres serialization_failure, deadlock_detected and lock_not_available
+RETRYABLE_PGCODES = {"40001", "40P01", "55P03"}
+
+
+class OutOfStock(Exception):
+    def __init__(self, record_id, quantity):
+        super().__init__(f"Not enough stock for record {record_id} (requested {quantity})")
+        self.record_id = record_id
+        self.quantity = quantity
+
+
+def take_stock(inventory_row, record_id, quantity):
+    # Decrement stock on one inventory row with a single conditional UPDATE ... RETURNING.
+    # The stock check is part of the UPDATE's WHERE clause, so it is re-evaluated
+    # against the latest row version and two checkouts can never oversell a row.
+    stmt = (
+        update(Inventory)
+        .where(Inventory.inventory_id == inventory_row, Inventory.stock_quantity >= quantity)
+        .values(stock_quantity=Inventory.stock_quantity - quantity)
+        .returning(Inventory.inventory_id, Inventory.stock_quantity, Inventory.supplier_id, Inventory.price)
+        .execution_options(synchronize_session=False)
+    )
+    row = db.session.execute(stmt).first()
+    if row is None:
+        return None
+    inventory_id, stock_remaining, supplier_id, price = row
+    apply_change(
+        before=(supplier_id, record_id, stock_remaining + quantity, price),
+        after=(supplier_id, record_id, stock_remaining, price),
+    )
+    return {"inventory_id": inventory_id, "quantity": quantity, "stock_remaining": stock_remaining}
+
+
+def reserve_stock(record_id, quantity):
+    # Reservations of quantity across the record's inventory rows: one row when a
+    # supplier has it all, else the fullest rows until the quantity is met
+    for attempt in range(1, MAX_RESERVE_ATTEMPTS + 1):
+        skip_locked = attempt < MAX_RESERVE_ATTEMPTS
+        candidate = (
+            select(Inventory.inventory_id)
+            .where(Inventory.record_id == record_id, Inventory.stock_quantity >= quantity)
+            .order_by(Inventory.stock_quantity.desc())
+            .limit(1)
+            .with_for_update(skip_locked=skip_locked)
+            .scalar_subquery()
+        )
+        reservation = take_stock(candidate, record_id, quantity)
+        if reservation:
+            return [reservation]
+
+        # Stock split across suppliers. The rows are locked in inventory_id order,
+        # so two checkouts splitting the same record can't deadlock each other.
+        rows = db.session.execute(
+            select(Inventory.inventory_id, Inventory.stock_quantity)
+            .where(Inventory.record_id == record_id, Inventory.stock_quantity > 0)
+            .order_by(Inventory.inventory_id)
+            .with_for_update(skip_locked=skip_locked)
+        ).all()
+        if sum(stock for _, stock in rows) < quantity:
+            continue
+
+        reservations = []
+        remaining = quantity
+        for inventory_id, stock in sorted(rows, key=lambda row: (-row.stock_quantity, row.inventory_id)):
+            reservation = take_stock(inventory_id, record_id, min(stock, remaining))
+            if reservation is None:
+                # Only if the locked row changed anyway; the order is rolled back rather than oversold
+                raise OutOfStock(record_id, quantity)
+            reservations.append(reservation)
+            remaining -= reservation["quantity"]
+            if not remaining:
+                return reservations
+
+    raise OutOfStock(record_id, quantity)
+
+
+def is_retryable(err):
+    if getattr(err.orig, "pgcode", None) in RETRYABLE_PGCODES:
+        return True
+    return "database is locked" in str(err.orig)
+
+
+def place_order(customer_id, order_date, lines):
+    # Reserve stock for every line and create the order rows in one transaction.
+    # Lines for the same record are merged and reserved in record_id order, so
+    # concurrent multi-line orders always lock inventory rows in the same order.
+    quantities = {}
+    for record_id, quantity in lines:
+        quantities[record_id] = quantities.get(record_id, 0) + quantity
+
+    for attempt in range(1, MAX_TRANSACTION_ATTEMPTS + 1):
+        try:
+            reservations = []
+            for record_id in sorted(quantities):
+                for reservation in reserve_stock(record_id, quantities[record_id]):
+                    reservations.append({"record_id": record_id, **reservation})
+
+            orders = [
+                Orders(customer_id=customer_id, record_id=record_id, order_date=order_date, quantity=quantities[record_id])
+                for record_id in sorted(quantities)
+            ]
+            db.session.add_all(orders)
+            for order in orders:
+                apply_order(after=order_snapshot(order))
+            db.session.commit()
+            return orders, reservations
+
+        except OutOfStock:
+            db.session.rollback()
+            raise
+
+        except DBAPIError as err:
+            db.session.rollback()
+            if attempt == MAX_TRANSACTION_ATTEMPTS or not is_retryable(err):
+                raise
+            time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
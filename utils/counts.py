@@ -0,0 +1,97 @@
+import hashlib
+import json
+from flask import request  # type: ignore
+from sqlalchemy import func, select, text  # type: ignore
+from init import db, cache
+from utils.errors import QueryArgumentError
+from utils.versions import current_versions
+
+# ?count= values; HEAD requests count exactly unless asked otherwise
+COUNT_METHODS = ("exact", "estimated")
+
+# Cache namespace of the totals, keyed by table version so any committed write to the table retires them
+COUNTS_NAMESPACE = "counts"
+
+
+def get_count_arg():
+    method = request.args.get("count")
+    if method is None:
+        return "exact" if request.method == "HEAD" else None
+    if method not in COUNT_METHODS:
+        raise QueryArgumentError(f"count must be one of {', '.join(COUNT_METHODS)}.")
+    return method
+
+
+def count_select(stmt, model):
+    # SELECT count(*) with the list select's WHERE clause - no ordering, cursor or loader options
+    count_stmt = select(func.count()).select_from(model.__table__)
+    if stmt.whereclause is not None:
+        count_stmt = count_stmt.where(stmt.whereclause)
+    return count_stmt
+
+
+def count_key(count_stmt, table_name, method):
+    compiled = count_stmt.compile(compile_kwargs={"render_postcompile": True})
+    source = json.dumps([str(compiled), {name: str(value) for name, value in compiled.params.items()}], sort_keys=True)
+    version = current_versions([table_name])[0]
+    return f"{table_name}:{version}:{method}:{hashlib.sha1(source.encode()).hexdigest()}"
+
+
+def exact_count(count_stmt):
+    return db.session.scalar(count_stmt)
+
+
+def estimated_count(table, whereclause):
+    # Planner statistics where the database keeps them; None when it has none yet
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+    table_name = table.name
+    if dialect == "postgresql":
+        if whereclause is None:
+            # -1 until the table is first vacuumed or analyzed
+            estimate = connection.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+                {"table_name": table_name},
+            ).scalar()
+            return estimate if estimate is not None and estimate >= 0 else None
+
+        # The planner's row estimate for the filtered rows
+        query = select(text("1")).select_from(table).where(whereclause)
+        compiled = query.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    if dialect == "sqlite" and whereclause is None:
+        # Row count ANALYZE stored for the table's indexes (the first number of stat)
+        has_stats = connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")).first()
+        if has_stats:
+            stat = connection.execute(
+                text("SELECT stat FROM sqlite_stat1 WHERE tbl = :table_name LIMIT 1"), {"table_name": table_name}
+            ).scalar()
+            if stat:
+                return int(stat.split()[0])
+    return None
+
+
+def count_rows(stmt, model, method):
+    # (count, method used) for the rows a list select would return over all its pages.
+    # Estimates fall back to an exact count where the database has no statistics.
+    table_name = model.__tablename__
+    count_stmt = count_select(stmt, model)
+    key = count_key(count_stmt, table_name, method)
+    cached = cache.get_value(COUNTS_NAMESPACE, key)
+    if cached is not None:
+        count, method = json.loads(cached)
+        return count, method
+
+    count = estimated_count(model.__table__, stmt.whereclause) if method == "estimated" else None
+    if count is None:
+        count, method = exact_count(count_stmt), "exact"
+    cache.set_value(COUNTS_NAMESPACE, key, json.dumps([count, method]).encode())
+    return count, method
+
+
+def count_headers(stmt, model, method):
+    count, method = count_rows(stmt, model, method)
+    return {"X-Total-Count": str(count), "X-Total-Count-Method": method}
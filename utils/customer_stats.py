@@ -0,0 +1,236 @@
+from decimal import Decimal
+from flask import current_app  # type: ignore
+from sqlalchemy import case, delete, func, insert, or_, select, true, update  # type: ignore
+from init import db
+from models.customers import Customers
+from models.customer_stats import CustomerStats, CustomerGenreStats
+from models.orders import Orders
+from models.records import Records
+
+# Customer ids per IN (...) statement
+STATS_CHUNK_SIZE = 500
+
+stats_table = CustomerStats.__table__
+genre_table = CustomerGenreStats.__table__
+
+
+def stats_enabled():
+    return current_app.config.get("CUSTOMER_STATS_TABLE", False)
+
+
+def order_snapshot(order):
+    # The values of an order row that the stats depend on; quantity is None until a new order is flushed
+    return (order.customer_id, order.record_id, order.quantity or 1, order.order_date)
+
+
+def apply_order(before=None, after=None):
+    # Incrementally move an order's contribution from its old customer to its new one.
+    # Runs in the caller's transaction, so the stats commit together with the write.
+    if not stats_enabled():
+        return
+
+    removed = set()
+    changed = set()
+    for sign, row in ((-1, before), (1, after)):
+        if row is None or row[0] is None:
+            continue
+        customer_id, record_id, quantity, order_date = row
+        price, genre = db.session.execute(select(Records.price, Records.genre).where(Records.record_id == record_id)).first() or (0, None)
+        adjust(customer_id, sign, sign * quantity * Decimal(str(price or 0)), order_date)
+        if genre is not None:
+            adjust_genre(customer_id, genre, sign)
+        changed.add(customer_id)
+        if sign < 0:
+            removed.add(customer_id)
+
+    # A removed order may have been the first or last one
+    if removed:
+        refresh_dates(stats_table.c.customer_id.in_(removed))
+    if changed:
+        refresh_favourites(stats_table.c.customer_id.in_(changed))
+
+
+def adjust(customer_id, sign, spend, order_date):
+    values = {"order_count": stats_table.c.order_count + sign, "total_spend": stats_table.c.total_spend + spend}
+    if sign > 0 and order_date is not None:
+        first, last = stats_table.c.first_order_date, stats_table.c.last_order_date
+        values["first_order_date"] = case((or_(first.is_(None), first > order_date), order_date), else_=first)
+        values["last_order_date"] = case((or_(last.is_(None), last < order_date), order_date), else_=last)
+    stmt = update(stats_table).where(stats_table.c.customer_id == customer_id).values(values)
+    if db.session.execute(stmt).rowcount == 0:
+        dates = order_date if sign > 0 else None
+        db.session.execute(insert(stats_table).values(
+            customer_id=customer_id, order_count=sign, total_spend=spend, first_order_date=dates, last_order_date=dates
+        ))
+
+
+def adjust_genre(customer_id, genre, sign):
+    stmt = (
+        update(genre_table)
+        .where(genre_table.c.customer_id == customer_id, genre_table.c.genre == genre)
+        .values(order_count=genre_table.c.order_count + sign)
+    )
+    if db.session.execute(stmt).rowcount == 0:
+        db.session.execute(insert(genre_table).values(customer_id=customer_id, genre=genre, order_count=sign))
+
+
+def refresh_dates(condition):
+    # First and last order dates from the orders table - a range read of ix_orders_customer_id_order_date
+    db.session.flush()
+    customer_orders = Orders.customer_id == stats_table.c.customer_id
+    db.session.execute(
+        update(stats_table)
+        .where(condition)
+        .values(
+            first_order_date=select(func.min(Orders.order_date)).where(customer_orders).scalar_subquery(),
+            last_order_date=select(func.max(Orders.order_date)).where(customer_orders).scalar_subquery(),
+        )
+    )
+
+
+def refresh_favourites(condition):
+    favourite = (
+        select(genre_table.c.genre)
+        .where(genre_table.c.customer_id == stats_table.c.customer_id, genre_table.c.order_count > 0)
+        .order_by(genre_table.c.order_count.desc(), genre_table.c.genre)
+        .limit(1)
+        .scalar_subquery()
+    )
+    db.session.execute(update(stats_table).where(condition).values(favourite_genre=favourite))
+
+
+def fill(condition):
+    # Insert the stats of the customers matching condition with one GROUP BY per table
+    orders = select(Orders).join(Records, Records.record_id == Orders.record_id).where(Orders.customer_id.is_not(None), condition)
+    rows = orders.with_only_columns(
+        Orders.customer_id,
+        func.count(),
+        func.coalesce(func.sum(Orders.quantity * Records.price), 0),
+        func.min(Orders.order_date),
+        func.max(Orders.order_date),
+    ).group_by(Orders.customer_id)
+    db.session.execute(insert(stats_table).from_select(
+        ["customer_id", "order_count", "total_spend", "first_order_date", "last_order_date"], rows
+    ))
+    genres = (
+        orders.with_only_columns(Orders.customer_id, Records.genre, func.count())
+        .where(Records.genre.is_not(None))
+        .group_by(Orders.customer_id, Records.genre)
+    )
+    db.session.execute(insert(genre_table).from_select(["customer_id", "genre", "order_count"], genres))
+
+
+def refresh_customers(customer_ids):
+    # Recompute a set of customers from the orders table - used after bulk writes,
+    # where the rows' previous values aren't known
+    if not stats_enabled():
+        return
+    customer_ids = [customer_id for customer_id in set(customer_ids) if customer_id is not None]
+    # Core statements don't autoflush, so push pending ORM changes to orders first
+    db.session.flush()
+    for start in range(0, len(customer_ids), STATS_CHUNK_SIZE):
+        chunk = customer_ids[start:start + STATS_CHUNK_SIZE]
+        db.session.execute(delete(stats_table).where(stats_table.c.customer_id.in_(chunk)))
+        db.session.execute(delete(genre_table).where(genre_table.c.customer_id.in_(chunk)))
+        fill(Orders.customer_id.in_(chunk))
+        refresh_favourites(stats_table.c.customer_id.in_(chunk))
+
+
+def forget_customer(customer_id):
+    # A deleted customer's rows; the foreign keys are also ON DELETE CASCADE
+    if not stats_enabled():
+        return
+    db.session.execute(delete(genre_table).where(genre_table.c.customer_id == customer_id))
+    db.session.execute(delete(stats_table).where(stats_table.c.customer_id == customer_id))
+
+
+def bulk_customers(table_name, rows):
+    # Customers a bulk write to orders or records touches: those named by the order
+    # rows and those the upserted orders belonged to before, or those who ordered
+    # an upserted record, whose price or genre may change. Read before the write.
+    if not stats_enabled() or not rows:
+        return set()
+    rows_with_id = [row for row in rows if isinstance(row, dict)]
+    if table_name == "orders":
+        affected = {row.get("customer_id") for row in rows_with_id if isinstance(row.get("customer_id"), int)}
+        condition = Orders.order_id.in_([row["order_id"] for row in rows_with_id if isinstance(row.get("order_id"), int)])
+    else:
+        affected = set()
+        condition = Orders.record_id.in_([row["record_id"] for row in rows_with_id if isinstance(row.get("record_id"), int)])
+    affected.update(db.session.scalars(select(Orders.customer_id).where(condition, Orders.customer_id.is_not(None)).distinct()))
+    return affected
+
+
+def rebuild():
+    # Recompute both tables from scratch with one GROUP BY each
+    db.session.flush()
+    db.session.execute(delete(genre_table))
+    db.session.execute(delete(stats_table))
+    fill(true())
+    refresh_favourites(true())
+    db.session.commit()
+
+
+def live_stats(customer_ids):
+    # GROUP BY over the customers' orders - O(their orders)
+    stats = {}
+    favourites = {}
+    orders = (
+        select(Orders)
+        .join(Records, Records.record_id == Orders.record_id)
+        .where(Orders.customer_id.in_(customer_ids))
+    )
+    rows = orders.with_only_columns(
+        Orders.customer_id,
+        func.count(),
+        func.coalesce(func.sum(Orders.quantity * Records.price), 0),
+        func.min(Orders.order_date),
+        func.max(Orders.order_date),
+    ).group_by(Orders.customer_id)
+    for customer_id, *values in db.session.execute(rows):
+        stats[customer_id] = values
+
+    genres = (
+        orders.with_only_columns(Orders.customer_id, Records.genre, func.count())
+        .where(Records.genre.is_not(None))
+        .group_by(Orders.customer_id, Records.genre)
+    )
+    for customer_id, genre, count in db.session.execute(genres):
+        best = favourites.get(customer_id)
+        if best is None or (-count, genre) < (-best[1], best[0]):
+            favourites[customer_id] = (genre, count)
+    return {customer_id: (*values, favourites.get(customer_id, (None,))[0]) for customer_id, values in stats.items()}
+
+
+def table_stats(customer_ids):
+    # Read the precomputed rows - O(customers)
+    stmt = select(
+        stats_table.c.customer_id,
+        stats_table.c.order_count,
+        stats_table.c.total_spend,
+        stats_table.c.first_order_date,
+        stats_table.c.last_order_date,
+        stats_table.c.favourite_genre,
+    ).where(stats_table.c.customer_id.in_(customer_ids), stats_table.c.order_count > 0)
+    return {customer_id: values for customer_id, *values in db.session.execute(stmt)}
+
+
+def customer_stats(customer_ids):
+    # Stats of each existing customer, keyed by id; customers without orders get zeros
+    found = {}
+    read = table_stats if stats_enabled() else live_stats
+    for start in range(0, len(customer_ids), STATS_CHUNK_SIZE):
+        chunk = customer_ids[start:start + STATS_CHUNK_SIZE]
+        existing = db.session.scalars(select(Customers.customer_id).where(Customers.customer_id.in_(chunk))).all()
+        rows = read(existing)
+        for customer_id in existing:
+            order_count, total_spend, first, last, genre = rows.get(customer_id, (0, 0, None, None, None))
+            found[customer_id] = {
+                "customer_id": customer_id,
+                "order_count": int(order_count),
+                "total_spend": Decimal(str(total_spend)).quantize(Decimal("0.01")),
+                "first_order_date": first.isoformat() if first else None,
+                "last_order_date": last.isoformat() if last else None,
+                "favourite_genre": genre,
+            }
+    return found
@@ -0,0 +1,181 @@
+import time
+from flask import current_app, g, has_request_context, request  # type: ignore
+from flask_sqlalchemy.session import Session  # type: ignore
+from sqlalchemy import event  # type: ignore
+from sqlalchemy.engine import make_url  # type: ignore
+from sqlalchemy.ext.asyncio import create_async_engine  # type: ignore
+from sqlalchemy.pool import QueuePool  # type: ignore
+from utils.metrics import Histogram, add_pool_wait
+
+# Bind key of the read replica engine
+REPLICA_BIND = "replica"
+
+# Cookie holding the time until which a client that just wrote reads from the primary
+STICKY_COOKIE = "read_primary_until"
+
+# Methods that never write, so they can read from the replica
+READ_METHODS = ("GET", "HEAD")
+
+# Driver used for each backend by the async entry point (asgi.py)
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+class MeteredQueuePool(QueuePool):
+    # QueuePool that records how long each checkout waited for a connection
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = Histogram()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.checkout_wait = self.checkout_wait
+        return pool
+
+    def connect(self):
+        started = time.perf_counter()
+        connection = super().connect()
+        waited = time.perf_counter() - started
+        self.checkout_wait.observe(waited)
+        add_pool_wait(waited)
+        return connection
+
+    def utilization(self):
+        # Checked out connections over the most the pool will open
+        capacity = self.size() + max(self._max_overflow, 0)
+        return self.checkedout() / capacity if capacity else 0.0
+
+
+def is_memory_sqlite(url):
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(uri, config):
+    # Pool and timeout options for one database URL. In-memory SQLite keeps
+    # Flask-SQLAlchemy's single shared connection.
+    url = make_url(uri)
+    if is_memory_sqlite(url):
+        return {}
+
+    options = {
+        "poolclass": MeteredQueuePool,
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+    }
+    # Set per connection, so every statement on it is cancelled after the timeout
+    if config["DB_STATEMENT_TIMEOUT"] and url.get_backend_name() == "postgresql":
+        options["connect_args"] = {"options": f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT']}"}
+    return options
+
+
+def async_url(uri):
+    # The same database through its async driver, e.g. postgresql+psycopg2 -> postgresql+asyncpg
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {backend} databases")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def async_engine_options(url, config):
+    # engine_options() for an async engine, which keeps SQLAlchemy's asyncio-aware pool class.
+    # aiosqlite engines don't pool: each checkout opens the file.
+    if url.get_backend_name() == "sqlite":
+        return {}
+
+    options = {
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+    }
+    if config["DB_STATEMENT_TIMEOUT"] and url.get_backend_name() == "postgresql":
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(config["DB_STATEMENT_TIMEOUT"])}}
+    return options
+
+
+def create_async_engines(config):
+    # (primary, replica) async engines; the replica is the primary when none is configured
+    engines = []
+    for uri in (config["SQLALCHEMY_DATABASE_URI"], config.get("DATABASE_REPLICA_URI")):
+        if uri:
+            url = async_url(uri)
+            engines.append(create_async_engine(url, **async_engine_options(url, config)))
+    init_foreign_keys(engines)
+    return engines[0], engines[-1]
+
+
+def enforce_foreign_keys(dbapi_connection, connection_record):
+    # SQLite only applies foreign keys, and their ON DELETE actions, when asked to on each connection
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def init_foreign_keys(engines):
+    for engine in engines:
+        engine = getattr(engine, "sync_engine", engine)
+        if engine.dialect.name == "sqlite" and not event.contains(engine, "connect", enforce_foreign_keys):
+            event.listen(engine, "connect", enforce_foreign_keys)
+
+
+def configure_engines(app):
+    # Engine options for the primary and, when DATABASE_REPLICA_URI is set, the replica bind
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"], app.config)
+    replica_uri = app.config.get("DATABASE_REPLICA_URI")
+    if replica_uri:
+        app.config["SQLALCHEMY_BINDS"] = {REPLICA_BIND: {"url": replica_uri, **engine_options(replica_uri, app.config)}}
+
+
+class RoutingSession(Session):
+    # Sends the reads of GET requests to the replica; everything else, and any
+    # session with pending changes, uses the primary
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and reads_from_replica() and not (self._flushing or self.new or self.dirty or self.deleted):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    # Marks a view that only reads although it takes POST (e.g. a long id list in the body)
+    view.read_only = True
+    return view
+
+
+def is_read_request():
+    view = current_app.view_functions.get(request.endpoint)
+    return request.method in READ_METHODS or getattr(view, "read_only", False)
+
+
+def reads_from_replica():
+    return has_request_context() and g.get("read_replica", False)
+
+
+def read_from_primary():
+    # For the rest of the request, e.g. before filling a cache that outlives replica lag
+    if has_request_context():
+        g.read_replica = False
+
+
+def init_replica_routing(app):
+    # Only with a replica bind configured; without one every read uses the primary
+    if not app.config.get("DATABASE_REPLICA_URI"):
+        return
+
+    @app.before_request
+    def choose_bind():
+        sticky_until = request.cookies.get(STICKY_COOKIE, type=float) or 0
+        g.read_replica = is_read_request() and sticky_until < time.time()
+
+    @app.after_request
+    def stick_to_primary(response):
+        # A client that wrote reads its own writes from the primary until the replica has caught up
+        if not is_read_request() and request.method != "OPTIONS":
+            sticky_seconds = app.config["REPLICA_STICKY_SECONDS"]
+            response.set_cookie(STICKY_COOKIE, f"{time.time() + sticky_seconds:.3f}", max_age=sticky_seconds, httponly=True, samesite="Lax")
+        return response
@@ -0,0 +1,46 @@
+from datetime import date, datetime
+from flask import request  # type: ignore
+from utils.errors import QueryArgumentError
+
+# Accepted order date formats - ISO, then the legacy dd/mm/yy strings orders used to be stored as
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%y", "%d/%m/%Y")
+
+
+def parse_date(value):
+    # A date from a date, datetime or string in one of DATE_FORMATS; None stays None
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        for fmt in DATE_FORMATS:
+            try:
+                return datetime.strptime(value.strip(), fmt).date()
+            except ValueError:
+                pass
+    raise ValueError(f"{value!r} is not a date in YYYY-MM-DD or dd/mm/yy format")
+
+
+def get_date_arg(name, args=None):
+    try:
+        return parse_date((request.args if args is None else args).get(name))
+    except ValueError:
+        raise QueryArgumentError(f"{name} must be a date in YYYY-MM-DD or dd/mm/yy format.")
+
+
+def get_date_range_args(args=None):
+    # ?from=&to= as an inclusive date range; either end may be left open
+    start, end = get_date_arg("from", args), get_date_arg("to", args)
+    if start and end and start > end:
+        raise QueryArgumentError("from must not be after to.")
+    return start, end
+
+
+def filter_date_range(stmt, column, start, end):
+    if start is not None:
+        stmt = stmt.where(column >= start)
+    if end is not None:
+        stmt = stmt.where(column <= end)
+    return stmt
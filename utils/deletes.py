@@ -0,0 +1,73 @@
+from sqlalchemy import delete, exists, select  # type: ignore
+from init import db, cache
+from models.customers import Customers
+from models.suppliers import Suppliers
+from models.inventory import Inventory
+from models.orders import Orders
+from utils.inventory_summary import refresh_groups, summary_enabled
+from utils.customer_stats import forget_customer
+
+# Child rows deleted per statement, each chunk committed on its own, by a background delete job
+DELETE_CHUNK_SIZE = 10000
+
+
+def has_rows(condition):
+    # EXISTS check - stops at the first matching row
+    return db.session.scalar(select(exists().where(condition)))
+
+
+def delete_in_chunks(model, condition, chunk_size=DELETE_CHUNK_SIZE, progress=None):
+    # Delete the rows matching condition a chunk of primary keys at a time, so
+    # no transaction holds locks on the whole fan-out
+    pk_column = model.__mapper__.primary_key[0]
+    deleted = 0
+    while True:
+        ids = db.session.scalars(select(pk_column).where(condition).order_by(pk_column).limit(chunk_size)).all()
+        if not ids:
+            return deleted
+        db.session.execute(delete(model).where(pk_column.in_(ids)), execution_options={"synchronize_session": False})
+        deleted += len(ids)
+        # Before the commit, so a job's checkpoint commits with the chunk
+        if progress:
+            progress(deleted)
+        db.session.commit()
+
+
+def delete_supplier(supplier_id, chunked=False, progress=None):
+    # The supplier and its inventory, as set-based deletes; inventory.supplier_id
+    # is also ON DELETE CASCADE in the database
+    condition = Inventory.supplier_id == supplier_id
+    record_ids = db.session.scalars(select(Inventory.record_id).where(condition).distinct()).all() if summary_enabled() else []
+    if chunked:
+        delete_in_chunks(Inventory, condition, progress=progress)
+
+    # Rows added while the chunks ran go in the same transaction as the supplier
+    db.session.execute(delete(Inventory).where(condition), execution_options={"synchronize_session": False})
+    db.session.execute(delete(Suppliers).where(Suppliers.supplier_id == supplier_id))
+    refresh_groups("supplier", [supplier_id])
+    refresh_groups("record", record_ids)
+    db.session.commit()
+    cache.invalidate("suppliers", supplier_id)
+    cache.invalidate("inventory")
+
+
+def delete_customer(customer_id, chunked=False, progress=None):
+    # The customer and their orders; orders.customer_id is ON DELETE CASCADE in the database
+    condition = Orders.customer_id == customer_id
+    if chunked:
+        delete_in_chunks(Orders, condition, progress=progress)
+
+    db.session.execute(delete(Orders).where(condition), execution_options={"synchronize_session": False})
+    forget_customer(customer_id)
+    db.session.execute(delete(Customers).where(Customers.customer_id == customer_id))
+    db.session.commit()
+    cache.invalidate("customers", customer_id)
+    cache.invalidate("orders")
+
+
+# Delete function, child model and foreign key column of the tables with a background delete job
+CASCADES = {
+    "suppliers": (delete_supplier, Inventory, Inventory.supplier_id),
+    "customers": (delete_customer, Orders, Orders.customer_id),
+}
+
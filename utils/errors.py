@@ -0,0 +1,9 @@
+class QueryArgumentError(ValueError):
+    # Raised for an invalid query string argument; answered with a 400 and the message
+    pass
+
+
+def register_error_handlers(app):
+    @app.errorhandler(QueryArgumentError)
+    def handle_query_argument_error(err):
+        return {"message": str(err)}, 400
@@ -0,0 +1,98 @@
+from flask import request  # type: ignore
+from marshmallow import fields  # type: ignore
+from sqlalchemy.orm import joinedload, selectinload  # type: ignore
+from utils.errors import QueryArgumentError
+from models.customers import Customers, CustomersSchema
+from models.suppliers import Suppliers, SuppliersSchema
+from models.records import Records, RecordsSchema
+from models.inventory import Inventory, InventorySchema
+from models.orders import Orders, OrdersSchema
+
+# Relationships each model can expand with ?expand=, and the model on the other end
+EXPANSIONS = {
+    Orders: {"record": Records, "customer": Customers},
+    Inventory: {"record": Records, "supplier": Suppliers},
+    Customers: {"orders": Orders},
+    Suppliers: {"inventory": Inventory},
+    Records: {"inventory": Inventory},
+}
+
+SCHEMAS = {
+    Orders: OrdersSchema,
+    Inventory: InventorySchema,
+    Customers: CustomersSchema,
+    Suppliers: SuppliersSchema,
+    Records: RecordsSchema,
+}
+
+# Expanded schema classes are built once per model and expansion tree
+_schema_classes = {}
+
+
+def parse_expand(model):
+    # ?expand=orders,orders.record -> {"orders": {"record": {}}}
+    tree = {}
+    value = request.args.get("expand", "")
+    for path in filter(None, (part.strip() for part in value.split(","))):
+        node, current = tree, model
+        for name in path.split("."):
+            if name not in EXPANSIONS.get(current, {}):
+                raise QueryArgumentError(f"Cannot expand '{path}' on {model.__tablename__}")
+            current = EXPANSIONS[current][name]
+            node = node.setdefault(name, {})
+    return tree
+
+
+def expanded_table_names(table_name):
+    # Tables an expanded response also reads from, for ETags
+    model = next((model for model in EXPANSIONS if model.__tablename__ == table_name), None)
+    if model is None:
+        return []
+    try:
+        tree = parse_expand(model)
+    except QueryArgumentError:
+        return []
+
+    names = []
+    def walk(current, node):
+        for name, children in node.items():
+            related = EXPANSIONS[current][name]
+            names.append(related.__tablename__)
+            walk(related, children)
+    walk(model, tree)
+    return sorted(set(names))
+
+
+def loader_options(model, tree):
+    # selectinload for collections and joinedload for many-to-one, so an expanded
+    # page costs one extra statement per collection rather than one per row
+    options = []
+    for name, children in tree.items():
+        attribute = getattr(model, name)
+        related = EXPANSIONS[model][name]
+        loader = selectinload(attribute) if attribute.property.uselist else joinedload(attribute)
+        child_options = loader_options(related, children)
+        options.append(loader.options(*child_options) if child_options else loader)
+    return options
+
+
+def schema_class(model, tree):
+    key = (model, repr(sorted(tree.items())))
+    if key not in _schema_classes:
+        base = SCHEMAS[model]
+        attrs = {}
+        for name, children in tree.items():
+            related = EXPANSIONS[model][name]
+            many = getattr(model, name).property.uselist
+            attrs[name] = fields.Nested(schema_class(related, children), many=many)
+        attrs["Meta"] = type("Meta", (), {"fields": base.Meta.fields + tuple(tree)})
+        _schema_classes[key] = type(f"Expanded{base.__name__}", (base,), attrs)
+    return _schema_classes[key]
+
+
+def expand(stmt, model, schema, many=False):
+    # Apply the request's ?expand= to a select and its schema
+    tree = parse_expand(model)
+    if not tree:
+        return stmt, schema
+    return stmt.options(*loader_options(model, tree)), schema_class(model, tree)(many=many)
@@ -0,0 +1,183 @@
+import io
+import json
+import os
+import time
+import pyarrow as pa  # type: ignore
+import pyarrow.parquet as pq  # type: ignore
+from sqlalchemy import select, types  # type: ignore
+from init import db
+from models.orders import Orders
+from models.inventory import Inventory
+from models.records import Records
+from models.customers import Customers
+from models.suppliers import Suppliers
+
+# Tables that can be exported, in the order a full export writes them
+EXPORT_TABLES = {
+    "orders": Orders,
+    "inventory": Inventory,
+    "records": Records,
+    "customers": Customers,
+    "suppliers": Suppliers,
+}
+
+# Rows fetched from the server-side cursor per Arrow record batch
+EXPORT_BATCH_SIZE = 50000
+
+# Last exported primary key per table, kept at the root of the destination
+WATERMARK_FILE = "_watermarks.json"
+
+
+def arrow_type(column):
+    column_type = column.type
+    if isinstance(column_type, types.Integer):
+        return pa.int64()
+    if isinstance(column_type, types.Numeric) and not isinstance(column_type, types.Float):
+        return pa.decimal128(column_type.precision or 38, column_type.scale or 0)
+    if isinstance(column_type, types.Float):
+        return pa.float64()
+    if isinstance(column_type, types.DateTime):
+        return pa.timestamp("us", tz="UTC" if column_type.timezone else None)
+    if isinstance(column_type, types.Date):
+        return pa.date32()
+    return pa.string()
+
+
+def arrow_schema(model):
+    return pa.schema([pa.field(column.key, arrow_type(column), nullable=column.nullable) for column in model.__table__.columns])
+
+
+def record_batches(model, after=None, batch_size=EXPORT_BATCH_SIZE):
+    # Stream a table in primary key order as Arrow record batches. Plain column
+    # tuples are read from a server-side cursor, never as ORM objects.
+    table = model.__table__
+    pk_column = model.__mapper__.primary_key[0]
+    schema = arrow_schema(model)
+
+    stmt = select(*table.columns).order_by(pk_column)
+    if after is not None:
+        stmt = stmt.where(pk_column > after)
+
+    result = db.session.execute(stmt.execution_options(yield_per=batch_size))
+    for rows in result.partitions():
+        columns = list(zip(*rows))
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema,
+        )
+
+
+def read_watermarks(dest):
+    path = os.path.join(dest, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)
+
+
+def write_watermarks(dest, watermarks):
+    path = os.path.join(dest, WATERMARK_FILE)
+    with open(path + ".tmp", "w") as file:
+        json.dump(watermarks, file, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def tracked(batches, pk_name, stats):
+    # Pass batches through while counting rows and remembering the last primary key
+    for batch in batches:
+        if batch.num_rows:
+            stats["rows"] += batch.num_rows
+            stats["watermark"] = batch.column(pk_name)[-1].as_py()
+            yield batch
+
+
+def write_parquet(path, schema, batches, full, start):
+    # Each export run adds one part file to the table's directory, named after
+    # the watermark it starts from
+    os.makedirs(path, exist_ok=True)
+    if full:
+        for name in os.listdir(path):
+            if name.endswith(".parquet"):
+                os.remove(os.path.join(path, name))
+
+    part = os.path.join(path, f"part-{start:012d}.parquet")
+    writer = None
+    try:
+        for batch in batches:
+            if writer is None:
+                writer = pq.ParquetWriter(part, schema)
+            writer.write_batch(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_lance(path, schema, batches, full, start):
+    import lance  # type: ignore  # Imported here as it is only needed for Lance exports
+
+    batches = iter(batches)
+    first = next(batches, None)
+    if first is None and not full and os.path.exists(path):
+        return  # Nothing to append
+
+    def all_batches():
+        # An empty table still writes a dataset with its schema, replacing a full export's old rows
+        if first is not None:
+            yield first
+            yield from batches
+
+    if not os.path.exists(path):
+        mode = "create"
+    else:
+        mode = "overwrite" if full else "append"
+    reader = pa.RecordBatchReader.from_batches(schema, all_batches())
+    lance.write_dataset(reader, path, schema=schema, mode=mode)
+
+
+def export_tables(dest, table_names=None, file_format="parquet", full=False, batch_size=EXPORT_BATCH_SIZE):
+    # Export tables to dest/<table> as Parquet or Lance. Unless full is set, only
+    # rows past each table's primary key watermark are read and appended.
+    os.makedirs(dest, exist_ok=True)
+    # The watermarks of tables not in this run are kept, full or not
+    watermarks = read_watermarks(dest)
+    writer = write_lance if file_format == "lance" else write_parquet
+    results = {}
+
+    for table_name in table_names or EXPORT_TABLES:
+        model = EXPORT_TABLES[table_name]
+        pk_name = model.__mapper__.primary_key[0].key
+        after = None if full else watermarks.get(table_name)
+        stats = {"rows": 0, "watermark": after}
+
+        started = time.perf_counter()
+        batches = tracked(record_batches(model, after, batch_size), pk_name, stats)
+        writer(os.path.join(dest, table_name), arrow_schema(model), batches, full, after or 0)
+        elapsed = time.perf_counter() - started
+
+        watermarks[table_name] = stats["watermark"]
+        write_watermarks(dest, watermarks)
+        results[table_name] = {
+            "rows": stats["rows"],
+            "watermark": stats["watermark"],
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(stats["rows"] / elapsed) if elapsed else None,
+        }
+
+    return results
+
+
+def arrow_stream(model, after=None, batch_size=EXPORT_BATCH_SIZE):
+    # Arrow IPC stream of a table, sent batch by batch as a streaming HTTP response
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, arrow_schema(model)) as writer:
+        for batch in record_batches(model, after, batch_size):
+            writer.write_batch(batch)
+            yield drain(sink)
+    yield drain(sink)
+
+
+def drain(sink):
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
@@ -0,0 +1,168 @@
+import threading
+from flask import current_app  # type: ignore
+from sqlalchemy import insert, select  # type: ignore
+from sqlalchemy.exc import DBAPIError  # type: ignore
+from init import db
+from models.orders import Orders
+from models.records import Records
+from utils.customer_stats import apply_order
+from utils.versions import current_versions, rewrites
+
+# Record ids the existence cache holds before it starts over
+RECORD_ID_CACHE_SIZE = 100000
+
+
+class RecordIds:
+    # Record ids known to exist, so an order doesn't look its record up. Deleting a
+    # record bumps the records rewrites version, which empties the cache at the
+    # next validate(); the orders.record_id foreign key catches a record deleted
+    # in between.
+
+    def __init__(self, max_size=RECORD_ID_CACHE_SIZE):
+        self.max_size = max_size
+        self.ids = set()
+        self.version = None
+        self.lock = threading.Lock()
+
+    def validate(self):
+        version = current_versions([rewrites(Records.__tablename__)])[0]
+        with self.lock:
+            if version != self.version:
+                self.ids.clear()
+                self.version = version
+
+    def exists(self, record_id):
+        if record_id in self.ids:
+            return True
+        if self.version is None:
+            self.validate()
+        found = db.session.scalar(select(Records.record_id).where(Records.record_id == record_id)) is not None
+        if found:
+            with self.lock:
+                if len(self.ids) >= self.max_size:
+                    self.ids.clear()
+                self.ids.add(record_id)
+        return found
+
+    def discard(self, record_id):
+        with self.lock:
+            self.ids.discard(record_id)
+
+
+def row_snapshot(row):
+    # An inserted row's values, as customer_stats.order_snapshot gives them for an order
+    return (row["customer_id"], row["record_id"], row["quantity"], row["order_date"])
+
+
+class MissingRecord(Exception):
+    # The order's record was deleted after its id was cached
+    def __init__(self, record_id):
+        super().__init__(f"Record with ID {record_id} does not exist.")
+        self.record_id = record_id
+
+
+class PendingOrder:
+    def __init__(self, row):
+        self.row = row
+        self.order_id = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class Batch:
+    def __init__(self):
+        self.orders = []
+        self.full = threading.Event()
+
+
+class OrderGroupCommit:
+    # Coalesces concurrent single-order inserts. The first request into an empty
+    # batch leads it: it waits up to window seconds for others to join (or until
+    # max_rows have), then writes the whole batch with one multi-row INSERT and
+    # one commit. The others wait for it and get their own order_id or error back.
+
+    def __init__(self, window, max_rows):
+        self.window = window
+        self.max_rows = max_rows
+        self.lock = threading.Lock()
+        self.pending = None
+        self.record_ids = RecordIds()
+
+    def insert(self, row):
+        order = PendingOrder(row)
+        with self.lock:
+            batch = self.pending
+            leader = batch is None or len(batch.orders) >= self.max_rows
+            if leader:
+                batch = self.pending = Batch()
+            batch.orders.append(order)
+            if len(batch.orders) >= self.max_rows:
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self.lock:
+                if self.pending is batch:
+                    self.pending = None
+            self.flush(batch.orders)
+        else:
+            order.done.wait()
+
+        if order.error is not None:
+            raise order.error
+        return order.order_id
+
+    def flush(self, orders):
+        # Runs on the leader's request thread and session
+        try:
+            try:
+                stmt = insert(Orders).returning(Orders.order_id, sort_by_parameter_order=True)
+                order_ids = db.session.scalars(stmt, [order.row for order in orders]).all()
+                for order in orders:
+                    apply_order(after=row_snapshot(order.row))
+                db.session.commit()
+                for order, order_id in zip(orders, order_ids):
+                    order.order_id = order_id
+            except DBAPIError:
+                # One bad row fails the whole INSERT; write them one at a time
+                # so each request gets its own outcome
+                db.session.rollback()
+                for order in orders:
+                    self.insert_one(order)
+            # Records deleted while the batch waited show up as foreign key errors
+            self.record_ids.validate()
+        except Exception as err:
+            db.session.rollback()
+            for order in orders:
+                if order.order_id is None and order.error is None:
+                    order.error = err
+        finally:
+            for order in orders:
+                order.done.set()
+
+    def insert_one(self, order):
+        try:
+            order.order_id = db.session.scalar(insert(Orders).returning(Orders.order_id), order.row)
+            apply_order(after=row_snapshot(order.row))
+            db.session.commit()
+        except DBAPIError as err:
+            db.session.rollback()
+            record_id = order.row["record_id"]
+            self.record_ids.discard(record_id)
+            if db.session.scalar(select(Records.record_id).where(Records.record_id == record_id)) is None:
+                order.error = MissingRecord(record_id)
+            else:
+                order.error = err
+
+
+def order_group_commit():
+    # This process's order coalescer; None unless ORDER_GROUP_COMMIT is on
+    app = current_app._get_current_object()
+    if not app.config["ORDER_GROUP_COMMIT"]:
+        return None
+    committer = app.extensions.get("order_group_commit")
+    if committer is None:
+        committer = app.extensions.setdefault("order_group_commit", OrderGroupCommit(
+            app.config["ORDER_GROUP_COMMIT_WINDOW_MS"] / 1000, app.config["ORDER_GROUP_COMMIT_MAX_ROWS"]
+        ))
+    return committer
@@ -0,0 +1,190 @@
+from decimal import Decimal
+from flask import current_app  # type: ignore
+from sqlalchemy import case, delete, func, insert, literal, select, update  # type: ignore
+from init import db
+from models.inventory import Inventory
+from models.inventory_summary import InventorySummary
+from models.records import Records
+
+# Inventory columns the summary table is grouped by; genre is derived from the record groups
+GROUP_COLUMNS = {
+    "supplier": Inventory.supplier_id,
+    "record": Inventory.record_id,
+}
+
+# Lowest-stocked SKUs listed by /inventory/summary
+LOW_STOCK_LIMIT = 100
+
+# Output key for each grouping
+GROUP_KEYS = {
+    "supplier": "supplier_id",
+    "record": "record_id",
+    "genre": "genre",
+}
+
+summary_table = InventorySummary.__table__
+
+
+def summary_enabled():
+    return current_app.config.get("INVENTORY_SUMMARY_TABLE", False)
+
+
+def low_stock_threshold():
+    return current_app.config.get("LOW_STOCK_THRESHOLD", 10)
+
+
+def snapshot(item):
+    # The values of an inventory row that the summary depends on
+    return (item.supplier_id, item.record_id, item.stock_quantity, item.price)
+
+
+def apply_change(before=None, after=None):
+    # Incrementally move an inventory row's contribution from its old groups to its new ones.
+    # Runs in the caller's transaction, so the summary commits together with the write.
+    if not summary_enabled():
+        return
+
+    threshold = low_stock_threshold()
+    for sign, row in ((-1, before), (1, after)):
+        if row is None:
+            continue
+        supplier_id, record_id, stock_quantity, price = row
+        stock_quantity = stock_quantity or 0
+        deltas = {
+            "units": sign * stock_quantity,
+            "valuation": sign * stock_quantity * Decimal(str(price or 0)),
+            "skus": sign,
+            "low_stock_skus": sign if stock_quantity < threshold else 0,
+        }
+        adjust("supplier", supplier_id, deltas)
+        adjust("record", record_id, deltas)
+
+
+def adjust(group_type, group_key, deltas):
+    stmt = (
+        update(summary_table)
+        .where(summary_table.c.group_type == group_type, summary_table.c.group_key == group_key)
+        .values({name: summary_table.c[name] + delta for name, delta in deltas.items()})
+    )
+    if db.session.execute(stmt).rowcount == 0:
+        db.session.execute(insert(summary_table).values(group_type=group_type, group_key=group_key, **deltas))
+
+
+def aggregates(threshold):
+    return [
+        func.coalesce(func.sum(Inventory.stock_quantity), 0),
+        func.coalesce(func.sum(Inventory.stock_quantity * Inventory.price), 0),
+        func.count(Inventory.inventory_id),
+        func.coalesce(func.sum(case((Inventory.stock_quantity < threshold, 1), else_=0)), 0),
+    ]
+
+
+def refresh_groups(group_type, group_keys):
+    # Recompute a set of groups from the inventory table - used after bulk writes,
+    # where the rows' previous values aren't known
+    if not summary_enabled() or not group_keys:
+        return
+    column = GROUP_COLUMNS[group_type]
+    group_keys = list(group_keys)
+    # Core statements don't autoflush, so push pending ORM changes to inventory first
+    db.session.flush()
+    db.session.execute(
+        delete(summary_table)
+        .where(summary_table.c.group_type == group_type, summary_table.c.group_key.in_(group_keys))
+    )
+    rows = (
+        select(literal(group_type), column, *aggregates(low_stock_threshold()))
+        .where(column.in_(group_keys))
+        .group_by(column)
+    )
+    db.session.execute(insert(summary_table).from_select(
+        ["group_type", "group_key", "units", "valuation", "skus", "low_stock_skus"], rows
+    ))
+
+
+def bulk_groups(rows):
+    # Groups a bulk inventory write touches; upserted rows may move between
+    # groups, so this is read before the write
+    affected = {"supplier": set(), "record": set()}
+    if not summary_enabled() or not rows:
+        return affected
+    rows_with_id = [row for row in rows if isinstance(row, dict)]
+    affected["supplier"].update(row.get("supplier_id") for row in rows_with_id if isinstance(row.get("supplier_id"), int))
+    affected["record"].update(row.get("record_id") for row in rows_with_id if isinstance(row.get("record_id"), int))
+    upsert_ids = [row["inventory_id"] for row in rows_with_id if isinstance(row.get("inventory_id"), int)]
+    if upsert_ids:
+        stmt = select(Inventory.supplier_id, Inventory.record_id).where(Inventory.inventory_id.in_(upsert_ids))
+        for supplier_id, record_id in db.session.execute(stmt):
+            affected["supplier"].add(supplier_id)
+            affected["record"].add(record_id)
+    return affected
+
+
+def rebuild():
+    # Recompute the whole summary table with one GROUP BY per grouping
+    db.session.flush()
+    db.session.execute(delete(summary_table))
+    for group_type, column in GROUP_COLUMNS.items():
+        rows = select(literal(group_type), column, *aggregates(low_stock_threshold())).group_by(column)
+        db.session.execute(insert(summary_table).from_select(
+            ["group_type", "group_key", "units", "valuation", "skus", "low_stock_skus"], rows
+        ))
+    db.session.commit()
+
+
+def live_groups(group_by, threshold):
+    # GROUP BY over the inventory table - O(rows)
+    if group_by == "genre":
+        stmt = (
+            select(Records.genre, *aggregates(threshold))
+            .join(Records, Records.record_id == Inventory.record_id)
+            .group_by(Records.genre)
+        )
+    else:
+        column = GROUP_COLUMNS[group_by]
+        stmt = select(column, *aggregates(threshold)).group_by(column).order_by(column)
+    return db.session.execute(stmt).all()
+
+
+def table_groups(group_by):
+    # Read the precomputed summary table - O(groups)
+    summary = InventorySummary
+    totals = [summary.units, summary.valuation, summary.skus, summary.low_stock_skus]
+    if group_by == "genre":
+        stmt = (
+            select(Records.genre, *[func.sum(total) for total in totals])
+            .join(Records, Records.record_id == summary.group_key)
+            .where(summary.group_type == "record", summary.skus > 0)
+            .group_by(Records.genre)
+        )
+    else:
+        stmt = (
+            select(summary.group_key, *totals)
+            .where(summary.group_type == group_by, summary.skus > 0)
+            .order_by(summary.group_key)
+        )
+    return db.session.execute(stmt).all()
+
+
+def inventory_summary(group_by, threshold=None):
+    # The summary table only holds low-stock counts for the configured threshold
+    use_table = summary_enabled() and threshold in (None, low_stock_threshold())
+    threshold = low_stock_threshold() if threshold is None else threshold
+    rows = table_groups(group_by) if use_table else live_groups(group_by, threshold)
+
+    key = GROUP_KEYS[group_by]
+    groups = [
+        {key: group, "units": int(units), "valuation": Decimal(str(valuation)).quantize(Decimal("0.01")), "skus": int(skus), "low_stock_skus": int(low)}
+        for group, units, valuation, skus, low in rows
+    ]
+    totals = {
+        name: sum((group[name] for group in groups), Decimal("0.00") if name == "valuation" else 0)
+        for name in ("units", "valuation", "skus", "low_stock_skus")
+    }
+    return {
+        "group_by": group_by,
+        "low_stock_threshold": threshold,
+        "source": "summary_table" if use_table else "inventory",
+        "totals": totals,
+        "groups": groups,
+    }
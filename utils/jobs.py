@@ -0,0 +1,495 @@
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import click  # type: ignore
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from flask import current_app  # type: ignore
+from flask.helpers import get_debug_flag  # type: ignore
+from sqlalchemy import and_, func, or_, select, update  # type: ignore
+from init import db, metrics
+from models.jobs import Jobs, job_schema, utcnow
+from utils.bulk import BULK_TABLES, bulk_import
+from utils.deletes import CASCADES
+from utils.errors import QueryArgumentError
+from utils.export import export_tables, EXPORT_TABLES, EXPORT_BATCH_SIZE
+from utils.inventory_summary import rebuild as rebuild_inventory_summary
+from utils.customer_stats import rebuild as rebuild_customer_stats
+from utils.synthetic import generate_catalogue, catalogue_sizes
+
+logger = logging.getLogger(__name__)
+
+# Rows per chunk of a background bulk import; each chunk commits with the job's checkpoint
+BULK_JOB_CHUNK_SIZE = 5000
+
+# Row errors a bulk import job keeps in its result
+MAX_JOB_ERRORS = 100
+
+# Queued or stalled jobs the poller claims per pass, on top of the running ones
+POLL_BATCH_SIZE = 100
+
+jobs_table = Jobs.__table__
+
+
+def update_job(job_id, connection=None, **values):
+    # Core UPDATE of the job row - through connection when given, so it joins that
+    # transaction, else the session's. Not committed here.
+    connection = connection or db.session.connection()
+    return connection.execute(update(jobs_table).where(jobs_table.c.job_id == job_id).values(**values))
+
+
+class JobRun:
+    # What a job handler works with: the job's params, the checkpoint its last
+    # committed chunk left, and save() to record the next one
+
+    def __init__(self, job):
+        self.job_id = job.job_id
+        self.params = job.params
+        self.checkpoint = job.checkpoint
+        self.processed = job.processed
+
+    def save(self, checkpoint, processed, total=None, connection=None):
+        # Written in the chunk's own transaction, so the checkpoint and the work commit together
+        self.checkpoint = checkpoint
+        self.processed = processed
+        values = {"checkpoint": checkpoint, "processed": processed, "heartbeat_at": utcnow()}
+        if total is not None:
+            values["total"] = total
+        update_job(self.job_id, connection, **values)
+
+
+def int_param(params, name, default=None, minimum=0):
+    value = params.get(name, default)
+    if value is None:
+        raise QueryArgumentError(f"params.{name} is required.")
+    if not isinstance(value, int) or isinstance(value, bool) or value < minimum:
+        raise QueryArgumentError(f"params.{name} must be an integer of at least {minimum}.")
+    return value
+
+
+def seed_params(params):
+    return {
+        "scale": int_param(params, "scale", minimum=1),
+        "workers": int_param(params, "workers", 4, minimum=1),
+        "random_seed": int_param(params, "random_seed", 0),
+    }
+
+
+def export_params(params):
+    tables = params.get("tables", list(EXPORT_TABLES))
+    if not isinstance(tables, list) or not tables or any(name not in EXPORT_TABLES for name in tables):
+        raise QueryArgumentError(f"params.tables must be a list of {', '.join(EXPORT_TABLES)}.")
+    file_format = params.get("format", "parquet")
+    if file_format not in ("parquet", "lance"):
+        raise QueryArgumentError("params.format must be parquet or lance.")
+    return {
+        "dest": str(params.get("dest", "exports")),
+        "tables": tables,
+        "format": file_format,
+        "full": bool(params.get("full", False)),
+        "batch_size": int_param(params, "batch_size", EXPORT_BATCH_SIZE, minimum=1),
+    }
+
+
+def delete_params(params):
+    if params.get("table") not in CASCADES:
+        raise QueryArgumentError(f"params.table must be one of {', '.join(CASCADES)}.")
+    return {"table": params["table"], "id": int_param(params, "id", minimum=1)}
+
+
+def bulk_import_params(params):
+    if params.get("table") not in BULK_TABLES:
+        raise QueryArgumentError(f"params.table must be one of {', '.join(BULK_TABLES)}.")
+    if not isinstance(params.get("rows"), list) or not params["rows"]:
+        raise QueryArgumentError("params.rows must be a non-empty list of rows.")
+    return {"table": params["table"], "rows": params["rows"]}
+
+
+def no_params(params):
+    return {}
+
+
+def run_seed(job):
+    # Synthetic catalogue, resumed chunk by chunk after a crash
+    params = job.params
+    sizes = catalogue_sizes(params["scale"])
+    # Inventory has about 1.5 rows per record
+    total = sum(sizes.values()) + sizes["records"] * 3 // 2
+    job.save(job.checkpoint, job.processed, total)
+    db.session.commit()
+
+    result = generate_catalogue(
+        params["scale"],
+        seed=params["random_seed"],
+        workers=params["workers"],
+        checkpoint=job.checkpoint,
+        on_checkpoint=lambda connection, state: job.save(state, state["rows"], connection=connection),
+    )
+    return {"rows": result["rows"], "seconds": result["seconds"], "rows_per_second": result["rows_per_second"]}
+
+
+def run_export(job):
+    # One table at a time; a finished table is checkpointed along with its watermark
+    params = job.params
+    state = job.checkpoint or {}
+    for table_name in params["tables"]:
+        if table_name in state:
+            continue
+        results = export_tables(params["dest"], [table_name], params["format"], params["full"], params["batch_size"])
+        state[table_name] = results[table_name]
+        job.save(state, sum(result["rows"] for result in state.values()))
+        db.session.commit()
+    return state
+
+
+def run_refresh_inventory_summary(job):
+    rebuild_inventory_summary()
+    return {}
+
+
+def run_refresh_customer_stats(job):
+    rebuild_customer_stats()
+    return {}
+
+
+def run_delete(job):
+    # A supplier's inventory or a customer's orders in committed chunks, then the row itself
+    table_name, pk = job.params["table"], job.params["id"]
+    delete_rows, child_model, child_column = CASCADES[table_name]
+    done = job.processed
+    if job.checkpoint is None:
+        total = db.session.scalar(select(func.count()).select_from(child_model).where(child_column == pk))
+        job.save({"deleted": 0}, 0, total)
+        db.session.commit()
+
+    delete_rows(pk, chunked=True, progress=lambda deleted: job.save({"deleted": done + deleted}, done + deleted))
+    return {"deleted": job.processed}
+
+
+def run_bulk_import(job):
+    # The rows in chunks; each chunk's write commits with the index of the next one
+    table_name, rows = job.params["table"], job.params["rows"]
+    state = job.checkpoint or {"next": 0, "written": 0, "errors": [], "error_count": 0}
+    if job.checkpoint is None:
+        job.save(state, 0, len(rows))
+        db.session.commit()
+
+    while state["next"] < len(rows):
+        start = state["next"]
+        chunk = rows[start:start + BULK_JOB_CHUNK_SIZE]
+        state = dict(state, next=start + len(chunk))
+        job.save(state, state["next"])
+        body, status = bulk_import(table_name, chunk)
+
+        # bulk_import commits, and rolls back when a chunk is rejected as a whole;
+        # then rows without an error of their own get the chunk's message
+        if status in (400, 409) and "message" in body:
+            own = {error["index"]: error for error in body.get("errors", [])}
+            body = {"results": [], "errors": [own.get(index, {"index": index, "message": body["message"]}) for index in range(len(chunk))]}
+        errors = [dict(error, index=error["index"] + start) for error in body.get("errors", [])]
+        state = dict(
+            state,
+            written=state["written"] + len(body.get("results", [])),
+            errors=(state["errors"] + errors)[:MAX_JOB_ERRORS],
+            error_count=state["error_count"] + len(errors),
+        )
+        job.save(state, state["next"])
+        db.session.commit()
+    return {"written": state["written"], "error_count": state["error_count"], "errors": state["errors"]}
+
+
+# Handler and params validator of each job kind
+JOB_KINDS = {
+    "seed": (run_seed, seed_params),
+    "export": (run_export, export_params),
+    "refresh_inventory_summary": (run_refresh_inventory_summary, no_params),
+    "refresh_customer_stats": (run_refresh_customer_stats, no_params),
+    "delete": (run_delete, delete_params),
+    "bulk_import": (run_bulk_import, bulk_import_params),
+}
+
+# Kinds POST /jobs queues
+HTTP_JOB_KINDS = ("seed", "export", "refresh_inventory_summary", "refresh_customer_stats")
+
+
+def enqueue(kind, params=None):
+    # Validate and insert a queued job; whichever runner claims it first runs it
+    if kind not in JOB_KINDS:
+        raise QueryArgumentError(f"Unknown job kind '{kind}', expected one of {', '.join(JOB_KINDS)}.")
+    if params is not None and not isinstance(params, dict):
+        raise QueryArgumentError("params must be a JSON object.")
+    _, validate = JOB_KINDS[kind]
+    job = Jobs(kind=kind, params=validate(params or {}), status="queued", created_at=utcnow())
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def http_job_params(kind, params):
+    # Extra limits on a job queued by POST /jobs, which anyone can call: only the
+    # kinds in HTTP_JOB_KINDS, a seed of at most MAX_SEED_SCALE and an export
+    # written under EXPORT_ROOT. Deletes and imports go through their own routes.
+    if kind not in HTTP_JOB_KINDS:
+        raise QueryArgumentError(f"Job kind '{kind}' can't be queued here, expected one of {', '.join(HTTP_JOB_KINDS)}.")
+    if params is None:
+        params = {}
+    if not isinstance(params, dict):
+        raise QueryArgumentError("params must be a JSON object.")
+    if kind == "seed":
+        int_param(params, "scale", minimum=1)
+        if params["scale"] > current_app.config["MAX_SEED_SCALE"]:
+            raise QueryArgumentError(f"params.scale must be at most {current_app.config['MAX_SEED_SCALE']}.")
+    if kind == "export":
+        root = os.path.realpath(current_app.config["EXPORT_ROOT"])
+        dest = params.get("dest", ".")
+        if not isinstance(dest, str):
+            raise QueryArgumentError("params.dest must be a path under the export root.")
+        # Symlinks and .. resolved before the check, so neither leads out of the root
+        resolved = os.path.realpath(os.path.join(root, dest))
+        if os.path.commonpath([root, resolved]) != root:
+            raise QueryArgumentError("params.dest must be a path under the export root.")
+        params = {**params, "dest": resolved}
+    return params
+
+
+def submit_job(kind, params=None):
+    # Enqueue, and hand the job to this process's runner when jobs run in the app
+    job = enqueue(kind, params)
+    runner = job_runner()
+    if runner is not None:
+        runner.submit(job.job_id)
+    return job
+
+
+def accepted(job):
+    # 202 response of a route that handed its work to a job
+    return job_schema.dump(job), 202, {"Location": f"/jobs/{job.job_id}"}
+
+
+def runnable(stale_before):
+    # Queued jobs, and running ones whose worker stopped sending heartbeats
+    return or_(
+        jobs_table.c.status == "queued",
+        and_(jobs_table.c.status == "running", jobs_table.c.heartbeat_at < stale_before),
+    )
+
+
+def claim(job_id):
+    # Take the job with a conditional UPDATE, so only one runner gets it
+    config = current_app.config
+    now = utcnow()
+    stale_before = now - timedelta(seconds=config["JOB_STALE_SECONDS"])
+    claimed = db.session.connection().execute(
+        update(jobs_table)
+        .where(jobs_table.c.job_id == job_id, runnable(stale_before))
+        .values(
+            status="running",
+            attempts=jobs_table.c.attempts + 1,
+            worker=f"{socket.gethostname()}:{os.getpid()}",
+            started_at=func.coalesce(jobs_table.c.started_at, now),
+            heartbeat_at=now,
+        )
+    )
+    db.session.commit()
+    if claimed.rowcount != 1:
+        return None
+
+    job = db.session.get(Jobs, job_id)
+    if job.attempts > config["JOB_MAX_ATTEMPTS"]:
+        update_job(job_id, status="failed", error="Gave up after the worker running it stopped", finished_at=utcnow())
+        db.session.commit()
+        return None
+    return job
+
+
+def heartbeat(engine, job_id, stop, interval):
+    # Tells other runners the job's worker is alive between checkpoints
+    while not stop.wait(interval):
+        try:
+            with engine.begin() as connection:
+                update_job(job_id, connection, heartbeat_at=utcnow())
+        except Exception:
+            logger.warning("Heartbeat of job %s failed", job_id, exc_info=True)
+
+
+def run_job(job_id):
+    # Runs in a pool worker process: claim the job, run its handler, record the outcome
+    with worker_app().app_context():
+        job = claim(job_id)
+        if job is None:
+            return
+        kind = job.kind
+        handler, _ = JOB_KINDS[kind]
+        run = JobRun(job)
+        db.session.expunge(job)
+
+        stop = threading.Event()
+        beat = threading.Thread(
+            target=heartbeat,
+            args=(db.engine, job_id, stop, current_app.config["JOB_HEARTBEAT_SECONDS"]),
+            name=f"job-{job_id}-heartbeat",
+            daemon=True,
+        )
+        beat.start()
+        try:
+            result = handler(run)
+            update_job(job_id, status="done", result=result, finished_at=utcnow(), heartbeat_at=utcnow())
+            db.session.commit()
+        except Exception as err:
+            db.session.rollback()
+            logger.exception("Job %s (%s) failed", job_id, kind)
+            update_job(job_id, status="failed", error=str(err), finished_at=utcnow())
+            db.session.commit()
+        finally:
+            stop.set()
+            beat.join()
+            db.session.remove()
+
+
+# The Flask app of a pool worker process, created once per process
+_worker_app = None
+# Set in pool worker processes, which run jobs but never start a runner of their own
+_in_worker = False
+
+
+def worker_app():
+    global _worker_app, _in_worker
+    if _worker_app is None:
+        _in_worker = True
+        from main import create_app
+        _worker_app = create_app()
+    return _worker_app
+
+
+class JobRunner:
+    # A bounded pool of worker processes, each with its own app and connections,
+    # and a poller that feeds it queued jobs and ones a crashed worker left running
+
+    def __init__(self, app, workers):
+        self.app = app
+        self.workers = workers
+        self.pool = self.new_pool()
+        self.running = set()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def new_pool(self):
+        # Spawned, not forked, so no worker inherits the parent's open connections
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"), initializer=worker_app)
+
+    def submit(self, job_id):
+        with self.lock:
+            if job_id in self.running:
+                return
+            self.running.add(job_id)
+        try:
+            future = self.pool.submit(run_job, job_id)
+        except BrokenProcessPool:
+            # A worker died; the job stays queued for the next poll, on a new pool
+            logger.warning("Job pool broken, starting a new one")
+            self.pool = self.new_pool()
+            self.finished(job_id)
+            return
+        future.add_done_callback(lambda _: self.finished(job_id))
+
+    def finished(self, job_id):
+        with self.lock:
+            self.running.discard(job_id)
+
+    def busy(self):
+        with self.lock:
+            return len(self.running)
+
+    def poll(self):
+        # Submit runnable jobs while the pool has idle workers; returns how many
+        free = self.workers - self.busy()
+        if free <= 0:
+            return 0
+        with self.app.app_context():
+            stale_before = utcnow() - timedelta(seconds=self.app.config["JOB_STALE_SECONDS"])
+            job_ids = db.session.scalars(
+                select(jobs_table.c.job_id).where(runnable(stale_before)).order_by(jobs_table.c.job_id).limit(min(free, POLL_BATCH_SIZE))
+            ).all()
+            db.session.remove()
+        for job_id in job_ids:
+            self.submit(job_id)
+        return len(job_ids)
+
+    def poll_forever(self, interval):
+        while not self.stopped.wait(interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Polling for jobs failed")
+
+    def start(self):
+        threading.Thread(target=self.poll_forever, args=(self.app.config["JOB_POLL_SECONDS"],), name="job-poller", daemon=True).start()
+
+    def shutdown(self):
+        self.stopped.set()
+        self.pool.shutdown(wait=True)
+
+
+def job_runner():
+    # This process's runner, started by init_jobs in a serving process or on first
+    # use; None when JOB_WORKERS is 0 and jobs are left to "flask jobs worker"
+    app = current_app._get_current_object()
+    if app.config["JOB_WORKERS"] <= 0:
+        return None
+    runner = app.extensions.get("job_runner")
+    if runner is None:
+        runner = app.extensions["job_runner"] = JobRunner(app, app.config["JOB_WORKERS"])
+        runner.start()
+    return runner
+
+
+def job_metric_lines():
+    # Jobs by kind and status, and the throughput of the running ones, read at scrape time
+    counts = db.session.execute(
+        select(Jobs.kind, Jobs.status, func.count(), func.sum(Jobs.processed)).group_by(Jobs.kind, Jobs.status)
+    ).all()
+    yield "# HELP recordstore_jobs Background jobs"
+    yield "# TYPE recordstore_jobs gauge"
+    for kind, status, count, _ in counts:
+        yield f'recordstore_jobs{{kind="{kind}",status="{status}"}} {count}'
+    yield "# HELP recordstore_job_rows_processed Rows processed by background jobs"
+    yield "# TYPE recordstore_job_rows_processed gauge"
+    for kind, status, _, processed in counts:
+        yield f'recordstore_job_rows_processed{{kind="{kind}",status="{status}"}} {processed or 0}'
+
+    now = utcnow()
+    running = db.session.execute(select(Jobs.job_id, Jobs.kind, Jobs.processed, Jobs.started_at).where(Jobs.status == "running")).all()
+    yield "# HELP recordstore_job_rows_per_second Rows per second of each running job since it started"
+    yield "# TYPE recordstore_job_rows_per_second gauge"
+    for job_id, kind, processed, started_at in running:
+        elapsed = (now - started_at).total_seconds() if started_at else 0
+        yield f'recordstore_job_rows_per_second{{job_id="{job_id}",kind="{kind}"}} {round(processed / elapsed, 1) if elapsed > 0 else 0}'
+
+
+def serving():
+    # True under a WSGI/ASGI server or "flask run" (in the reloader's child, not its watcher).
+    # Other flask commands are one-off processes and leave jobs to the server.
+    command = click.get_current_context(silent=True)
+    if command is None:
+        return True
+    if command.info_name != "run":
+        return False
+    reload = command.params.get("reload")
+    if reload is None:
+        reload = get_debug_flag()
+    return not reload or os.environ.get("WERKZEUG_RUN_MAIN") == "true"
+
+
+def init_jobs(app):
+    # Job counts and throughput on /_metrics
+    if job_metric_lines not in metrics.line_sources:
+        metrics.line_sources.append(job_metric_lines)
+
+    # Start the runner with the app, so jobs queued or left running before a
+    # restart are picked up by the poller without waiting for a new submit
+    if app.config["JOB_WORKERS"] > 0 and not _in_worker and serving():
+        with app.app_context():
+            job_runner()
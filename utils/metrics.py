@@ -0,0 +1,269 @@
+import json
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from flask import current_app, g, has_app_context, request  # type: ignore
+from flask_marshmallow import Schema  # type: ignore
+from sqlalchemy import event  # type: ignore
+from sqlalchemy.engine import Engine  # type: ignore
+from utils.serialize import FastJSONProvider
+
+logger = logging.getLogger("recordstoredb.metrics")
+
+# Upper bounds in seconds of the histogram buckets
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Runs of bound parameters, e.g. an IN list, collapse to one so statements differing only in list length share a shape
+PARAMETER_LIST = re.compile(r"\((?:\?|%s|%\(\w+\)s)(?:,\s*(?:\?|%s|%\(\w+\)s))*\)")
+
+
+def statement_shape(statement):
+    return PARAMETER_LIST.sub("(?)", " ".join(statement.split()))
+
+
+class Histogram:
+    # Observed from any thread, e.g. every thread checking out a pooled connection
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def lines(self, name, labels):
+        # A consistent copy, so the buckets, sum and count of one scrape agree
+        with self.lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            yield f'{name}_bucket{{{labels},le="{le}"}} {cumulative}'
+        yield f"{name}_sum{{{labels}}} {total:.6f}"
+        yield f"{name}_count{{{labels}}} {count}"
+
+
+def add_serialize_time(started):
+    if has_app_context() and "metrics" in g:
+        g.metrics["serialize_time"] += time.perf_counter() - started
+
+
+def count_serialized(rows, started):
+    # Rows dumped without Marshmallow (the column tuple fast path) and the time it took
+    if has_app_context() and "metrics" in g:
+        g.metrics["rows"] += rows
+        g.metrics["serialize_time"] += time.perf_counter() - started
+
+
+def add_pool_wait(seconds):
+    # Time the request waited for a pooled connection
+    if has_app_context() and "metrics" in g:
+        g.metrics["pool_wait"] += seconds
+
+
+class TimedJSONProvider(FastJSONProvider):
+    # Adds JSON encoding time to the request's serialization time
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            add_serialize_time(started)
+
+    def dumps_compact(self, obj):
+        started = time.perf_counter()
+        try:
+            return super().dumps_compact(obj)
+        finally:
+            add_serialize_time(started)
+
+
+class MeteredSchema(Schema):
+    # Base of the models' schemas: adds Marshmallow dump time and rows dumped to the
+    # request's metrics; nested schemas count towards the outermost dump only
+
+    def dump(self, obj, *args, **kwargs):
+        if not has_app_context() or "metrics" not in g or g.metrics["dump_depth"]:
+            return super().dump(obj, *args, **kwargs)
+
+        g.metrics["dump_depth"] += 1
+        started = time.perf_counter()
+        try:
+            result = super().dump(obj, *args, **kwargs)
+        finally:
+            g.metrics["dump_depth"] -= 1
+            g.metrics["serialize_time"] += time.perf_counter() - started
+        g.metrics["rows"] += len(result) if isinstance(result, list) else 1
+        return result
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context() and "metrics" in g:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started")
+    if not started or not has_app_context() or "metrics" not in g:
+        return
+    metrics = g.metrics
+    metrics["db_time"] += time.perf_counter() - started.pop()
+    metrics["statements"] += 1
+    metrics["shapes"][statement_shape(statement)] += 1
+
+
+class RequestMetrics:
+    # Per-request SQL count, DB time, serialization time, rows and response size,
+    # reported as a Server-Timing header and a log line, and aggregated per
+    # endpoint for GET /_metrics in the Prometheus text format
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(Histogram)
+        self.counters = defaultdict(int)
+        self.n_plus_one_threshold = 10
+        # Functions yielding more /_metrics lines at scrape time, e.g. background jobs
+        self.line_sources = []
+
+    def init_app(self, app):
+        app.extensions["request_metrics"] = self
+        if not app.config.get("METRICS_ENABLED", True):
+            return
+        self.n_plus_one_threshold = app.config.get("METRICS_N_PLUS_ONE_THRESHOLD", 10)
+
+        app.json = TimedJSONProvider(app)
+        if not event.contains(Engine, "before_cursor_execute", before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", after_cursor_execute)
+
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        app.add_url_rule("/_metrics", "metrics", self.metrics_view)
+
+    def start_request(self):
+        g.metrics = {
+            "started": time.perf_counter(),
+            "statements": 0,
+            "db_time": 0.0,
+            "pool_wait": 0.0,
+            "serialize_time": 0.0,
+            "dump_depth": 0,
+            "rows": 0,
+            "shapes": Counter(),
+        }
+
+    def finish_request(self, response):
+        metrics = g.pop("metrics", None)
+        if metrics is None:
+            return response
+
+        total_time = time.perf_counter() - metrics["started"]
+        endpoint = request.endpoint or "unmatched"
+        # Streamed bodies (NDJSON, Arrow) have no length up front and are left out
+        response_bytes = 0 if response.is_streamed else response.calculate_content_length() or 0
+
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={metrics["db_time"] * 1000:.2f};desc="{metrics["statements"]} queries", '
+            f'pool;dur={metrics["pool_wait"] * 1000:.2f};desc="connection checkout", '
+            f'serialize;dur={metrics["serialize_time"] * 1000:.2f}, '
+            f"total;dur={total_time * 1000:.2f}",
+        )
+
+        repeated = {shape: count for shape, count in metrics["shapes"].items() if count > self.n_plus_one_threshold}
+        for shape, count in repeated.items():
+            logger.warning("Possible N+1 on %s %s: statement ran %d times: %s", request.method, request.path, count, shape)
+
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "endpoint": endpoint,
+            "status": response.status_code,
+            "statements": metrics["statements"],
+            "db_ms": round(metrics["db_time"] * 1000, 2),
+            "pool_ms": round(metrics["pool_wait"] * 1000, 2),
+            "serialize_ms": round(metrics["serialize_time"] * 1000, 2),
+            "total_ms": round(total_time * 1000, 2),
+            "rows": metrics["rows"],
+            "bytes": response_bytes,
+        }))
+
+        with self.lock:
+            self.histograms[("request_duration_seconds", endpoint)].observe(total_time)
+            self.histograms[("db_duration_seconds", endpoint)].observe(metrics["db_time"])
+            self.histograms[("serialize_duration_seconds", endpoint)].observe(metrics["serialize_time"])
+            self.counters[("statements_total", endpoint)] += metrics["statements"]
+            self.counters[("rows_total", endpoint)] += metrics["rows"]
+            self.counters[("response_bytes_total", endpoint)] += response_bytes
+            self.counters[("n_plus_one_total", endpoint)] += len(repeated)
+        return response
+
+    def metrics_view(self):
+        lines = []
+        with self.lock:
+            for kind, items, help_text in (
+                ("histogram", self.histograms, {
+                    "request_duration_seconds": "Request wall time",
+                    "db_duration_seconds": "Time spent executing SQL per request",
+                    "serialize_duration_seconds": "Time spent in Marshmallow dump and JSON encoding per request",
+                }),
+                ("counter", self.counters, {
+                    "statements_total": "SQL statements executed",
+                    "rows_total": "Rows serialized",
+                    "response_bytes_total": "Response body bytes",
+                    "n_plus_one_total": "Statements repeated more than METRICS_N_PLUS_ONE_THRESHOLD times in one request",
+                }),
+            ):
+                for name, description in help_text.items():
+                    metric = f"recordstore_{name}"
+                    lines.append(f"# HELP {metric} {description}")
+                    lines.append(f"# TYPE {metric} {kind}")
+                    for (item_name, endpoint), value in sorted(items.items()):
+                        if item_name != name:
+                            continue
+                        labels = f'endpoint="{endpoint}"'
+                        if kind == "histogram":
+                            lines.extend(value.lines(metric, labels))
+                        else:
+                            lines.append(f"{metric}{{{labels}}} {value}")
+            lines.extend(self.pool_lines())
+            for source in self.line_sources:
+                lines.extend(source())
+
+        return current_app.response_class("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
+
+    def pool_lines(self):
+        # Connection pool state per engine, read at scrape time; only pools that time their checkouts
+        pools = [
+            (f'bind="{bind_key or "primary"}"', engine.pool)
+            for bind_key, engine in current_app.extensions["sqlalchemy"].engines.items()
+            if hasattr(engine.pool, "checkout_wait")
+        ]
+        if not pools:
+            return
+
+        yield "# HELP recordstore_pool_checkout_wait_seconds Time spent waiting for a pooled connection"
+        yield "# TYPE recordstore_pool_checkout_wait_seconds histogram"
+        for labels, pool in pools:
+            yield from pool.checkout_wait.lines("recordstore_pool_checkout_wait_seconds", labels)
+        for name, description, value in (
+            ("pool_size", "Connections the pool keeps open", lambda pool: pool.size()),
+            ("pool_checked_out", "Connections currently checked out", lambda pool: pool.checkedout()),
+            ("pool_overflow", "Connections open beyond the pool size", lambda pool: max(pool.overflow(), 0)),
+            ("pool_utilization", "Checked out connections over pool size plus max overflow", lambda pool: round(pool.utilization(), 4)),
+        ):
+            yield f"# HELP recordstore_{name} {description}"
+            yield f"# TYPE recordstore_{name} gauge"
+            for labels, pool in pools:
+                yield f"recordstore_{name}{{{labels}}} {value(pool)}"
@@ -0,0 +1,107 @@
+import time
+from urllib.parse import urlencode
+from flask import request, jsonify, current_app, Response, stream_with_context  # type: ignore
+from init import db
+from utils.serialize import column_select
+from utils.metrics import count_serialized
+from utils.query import filter_query, list_query, narrow_columns, encode_cursor
+from utils.counts import get_count_arg, count_headers
+
+# Page sizes for the keyset paginated list routes
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+# Number of rows fetched from the server-side cursor per chunk when streaming
+STREAM_CHUNK_SIZE = 1000
+
+
+def get_page_args(args=None):
+    # Read ?after=<id>&limit=<n> from the query string, clamping the limit
+    args = request.args if args is None else args
+    after = args.get("after", type=int)
+    limit = args.get("limit", default=DEFAULT_PAGE_LIMIT, type=int)
+    limit = max(1, min(limit, MAX_PAGE_LIMIT))
+    return after, limit
+
+
+def paginate(stmt, pk_column, schema):
+    # Keyset paginate a select over its sort keys (the primary key unless
+    # ?sort= is given), or stream it as NDJSON. ?filter[...] and ?fields= apply to both.
+    _, limit = get_page_args()
+    stmt = filter_query(stmt, pk_column)
+
+    # ?count=exact|estimated adds the total over all pages; HEAD returns only that
+    count_method = get_count_arg()
+    headers = count_headers(stmt, pk_column.class_, count_method) if count_method else {}
+    if request.method == "HEAD":
+        return current_app.response_class(headers=headers, mimetype=current_app.json.mimetype)
+
+    stmt, schema, keys = list_query(stmt, pk_column, schema)
+
+    # Plain column schemas select column tuples and skip the ORM and Marshmallow
+    fast = column_select(stmt, schema)
+    if fast is None and "fields" in request.args:
+        stmt = narrow_columns(stmt, pk_column, schema, keys)
+
+    if request.args.get("stream") == "ndjson":
+        response = stream_ndjson(stmt, schema, fast)
+        response.headers.update(headers)
+        return response
+
+    # Fetch one extra row to find out whether there is another page
+    if fast is not None:
+        columns_stmt, to_dict = fast
+        # The sort keys go last, for the cursor
+        rows = db.session.execute(columns_stmt.add_columns(*(column for column, _ in keys)).limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        started = time.perf_counter()
+        data = [to_dict(row) for row in rows]
+        count_serialized(len(data), started)
+        last_values = list(rows[-1][-len(keys):]) if rows else None
+    else:
+        rows = db.session.scalars(stmt.limit(limit + 1)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        data = schema.dump(rows)
+        last_values = [getattr(rows[-1], column.key) for column, _ in keys] if rows else None
+
+    response = jsonify(data)
+    response.headers.update(headers)
+
+    # The cursor for the next page holds the sort key values of the last row returned
+    if has_more:
+        next_cursor = encode_cursor(keys, last_values)
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+        response.headers["Link"] = f'<{next_page_url(next_cursor, limit)}>; rel="next"'
+
+    return response
+
+
+def next_page_url(next_cursor, limit, base_url=None, args=None):
+    args = (request.args if args is None else args).to_dict()
+    args["after"] = next_cursor
+    args["limit"] = limit
+    return f"{request.base_url if base_url is None else base_url}?{urlencode(args)}"
+
+
+def stream_ndjson(stmt, schema, fast=None):
+    # Rows are read from a server-side cursor in chunks, so memory stays flat.
+    # Each line is the provider's compact orjson encoding, the same bytes as a list page's rows.
+    dumps = current_app.json.dumps_compact
+
+    def generate():
+        if fast is not None:
+            columns_stmt, to_dict = fast
+            result = db.session.execute(columns_stmt.execution_options(yield_per=STREAM_CHUNK_SIZE))
+            for chunk in result.partitions():
+                yield b"".join(dumps(to_dict(row)) + b"\n" for row in chunk)
+            return
+
+        result = db.session.execute(stmt.execution_options(yield_per=STREAM_CHUNK_SIZE))
+        for chunk in result.scalars().partitions():
+            yield b"".join(dumps(row) + b"\n" for row in schema.dump(chunk))
+            # Drop the chunk's objects from the session before fetching the next one
+            db.session.expunge_all()
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
@@ -0,0 +1,194 @@
+import base64
+import binascii
+import datetime
+import decimal
+import json
+import re
+from flask import request  # type: ignore
+from sqlalchemy import and_, false, or_  # type: ignore
+from sqlalchemy.orm import load_only  # type: ignore
+from utils.errors import QueryArgumentError
+from utils.expand import SCHEMAS
+
+# ?filter[<column>][<op>]=<value>, or ?filter[<column>]=<value> for eq
+FILTER_ARG = re.compile(r"^filter\[(\w+)\](?:\[(\w+)\])?$")
+
+# Operators a filter can use; in takes a comma separated list, null takes true or false
+OPERATORS = {
+    "eq": lambda column, value: column == value,
+    "ne": lambda column, value: column != value,
+    "lt": lambda column, value: column < value,
+    "lte": lambda column, value: column <= value,
+    "gt": lambda column, value: column > value,
+    "gte": lambda column, value: column >= value,
+    "in": lambda column, values: column.in_(values),
+    "null": lambda column, value: column.is_(None) if value else column.is_not(None),
+}
+
+# Filters one request may combine
+MAX_FILTERS = 20
+
+
+def queryable_columns(model):
+    # The columns a client can filter, sort and select on - those the model's schema dumps
+    columns = model.__table__.columns
+    return {name: getattr(model, name) for name in SCHEMAS[model].Meta.fields if name in columns}
+
+
+def parse_value(column, value):
+    # A query string value as the column's Python type
+    python_type = column.type.python_type
+    try:
+        if python_type is datetime.date:
+            return datetime.date.fromisoformat(value)
+        if python_type is decimal.Decimal:
+            return decimal.Decimal(value)
+        return python_type(value)
+    except (ValueError, decimal.InvalidOperation):
+        raise QueryArgumentError(f"'{value}' is not a valid value for {column.key}.")
+
+
+def parse_bool(value):
+    if value.lower() not in ("true", "false", "1", "0"):
+        raise QueryArgumentError(f"'{value}' is not true or false.")
+    return value.lower() in ("true", "1")
+
+
+def get_filters(model, args=None):
+    # SQL conditions for the request's filter[...] arguments, against whitelisted columns only
+    args = request.args if args is None else args
+    columns = queryable_columns(model)
+    conditions = []
+    for key, value in args.items(multi=True):
+        match = FILTER_ARG.match(key)
+        if match is None:
+            continue
+        name, op = match.group(1), match.group(2) or "eq"
+        if name not in columns:
+            raise QueryArgumentError(f"Cannot filter {model.__tablename__} on '{name}'.")
+        if op not in OPERATORS:
+            raise QueryArgumentError(f"Unknown filter operator '{op}', expected one of {', '.join(OPERATORS)}.")
+
+        column = columns[name]
+        if op == "in":
+            value = [parse_value(column, part.strip()) for part in value.split(",") if part.strip()]
+        elif op == "null":
+            value = parse_bool(value)
+        else:
+            value = parse_value(column, value)
+        conditions.append(OPERATORS[op](column, value))
+
+    if len(conditions) > MAX_FILTERS:
+        raise QueryArgumentError(f"At most {MAX_FILTERS} filters can be combined.")
+    return conditions
+
+
+def get_sort_keys(model, pk_column, args=None):
+    # ?sort=-price,title -> [(price, True), (title, False), (pk, False)]. The
+    # primary key always ends the keys, so every row has a distinct position.
+    args = request.args if args is None else args
+    columns = queryable_columns(model)
+    keys = []
+    for name in filter(None, (part.strip() for part in args.get("sort", "").split(","))):
+        descending = name.startswith("-")
+        name = name.lstrip("-+")
+        if name not in columns:
+            raise QueryArgumentError(f"Cannot sort {model.__tablename__} on '{name}'.")
+        if any(column.key == name for column, _ in keys):
+            raise QueryArgumentError(f"'{name}' appears more than once in sort.")
+        keys.append((columns[name], descending))
+    if not any(column.key == pk_column.key for column, _ in keys):
+        keys.append((pk_column, False))
+    return keys
+
+
+def get_fields(schema, args=None):
+    # ?fields=record_id,title -> the schema narrowed with only=
+    args = request.args if args is None else args
+    names = [name.strip() for name in args.get("fields", "").split(",") if name.strip()]
+    if not names:
+        return schema
+    unknown = [name for name in names if name not in schema.fields]
+    if unknown:
+        raise QueryArgumentError(f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(schema.fields)}.")
+    return type(schema)(many=schema.many, only=names)
+
+
+def narrow_columns(stmt, pk_column, schema, keys):
+    # Load only the fields' and sort keys' columns when rows go through the ORM
+    columns = queryable_columns(pk_column.class_)
+    loaded = {name for name in schema.fields if name in columns} | {column.key for column, _ in keys}
+    return stmt.options(load_only(*(columns[name] for name in loaded)))
+
+
+def order_by_keys(stmt, keys):
+    # Nullable columns sort NULLs last in either direction, as seek_condition expects
+    clauses = []
+    for column, descending in keys:
+        clause = column.desc() if descending else column
+        clauses.append(clause.nulls_last() if column.nullable else clause)
+    return stmt.order_by(*clauses)
+
+
+def seek_condition(keys, values):
+    # Rows after the one with these sort key values, in order_by_keys's order:
+    # (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND pk > z) ...
+    branches = []
+    equal = []
+    for (column, descending), value in zip(keys, values):
+        if value is None:
+            # Only NULLs come after a NULL, and they are all equal here
+            equal.append(column.is_(None))
+            continue
+        after = column < value if descending else column > value
+        if column.nullable:
+            after = or_(after, column.is_(None))
+        branches.append(and_(*equal, after))
+        equal.append(column == value)
+    return or_(*branches) if branches else false()
+
+
+def is_default_order(keys):
+    # Ascending primary key only - the order of a list route without ?sort=
+    return len(keys) == 1 and not keys[0][1]
+
+
+def encode_cursor(keys, values):
+    # The primary key alone for the default order, as before; an opaque token otherwise
+    if is_default_order(keys):
+        return str(values[0])
+    values = [value.isoformat() if isinstance(value, datetime.date) else str(value) if isinstance(value, decimal.Decimal) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(keys, token):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, ValueError):
+        raise QueryArgumentError("after is not a cursor from this listing's X-Next-Cursor.")
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise QueryArgumentError("after is not a cursor for this sort order.")
+    return [None if value is None else parse_value(column, str(value)) for (column, _), value in zip(keys, values)]
+
+
+def filter_query(stmt, pk_column, args=None):
+    # Apply ?filter[...] to a list route's select
+    return stmt.where(*get_filters(pk_column.class_, args))
+
+
+def list_query(stmt, pk_column, schema, args=None):
+    # Apply ?sort=, ?fields= and the keyset cursor to a list route's filtered
+    # select. Returns the statement, the narrowed schema and the sort keys.
+    args = request.args if args is None else args
+    model = pk_column.class_
+    keys = get_sort_keys(model, pk_column, args)
+    schema = get_fields(schema, args)
+
+    stmt = order_by_keys(stmt, keys)
+    if is_default_order(keys):
+        after = args.get("after", type=int)
+        if after is not None:
+            stmt = stmt.where(pk_column > after)
+    elif args.get("after"):
+        stmt = stmt.where(seek_condition(keys, decode_cursor(keys, args["after"])))
+    return stmt, schema, keys
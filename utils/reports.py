@@ -0,0 +1,220 @@
+import threading
+import time
+from datetime import date, timedelta
+import numpy as np  # type: ignore
+import pyarrow as pa  # type: ignore
+import pyarrow.compute as pc  # type: ignore
+from flask import current_app  # type: ignore
+from sqlalchemy import select  # type: ignore
+from init import db
+from models.orders import Orders
+from models.records import Records
+from utils.errors import QueryArgumentError
+from utils.export import record_batches
+from utils.versions import current_versions, rewrites
+
+REPORT_GROUPS = ("day", "genre", "artist")
+
+# Days in the trailing window of the rolling totals on day reports
+DEFAULT_ROLLING_DAYS = 7
+MAX_ROLLING_DAYS = 366
+
+# Longest from..to range a day report may cover
+MAX_REPORT_DAYS = 3660
+
+EPOCH = date(1970, 1, 1)
+
+# Versions that decide whether the snapshot can be reused, extended or must be reloaded
+SNAPSHOT_VERSIONS = ("orders", rewrites("orders"), "records")
+
+
+def to_day(value):
+    return (value - EPOCH).days
+
+
+def from_day(day):
+    return (EPOCH + timedelta(days=int(day))).isoformat()
+
+
+class SalesSnapshot:
+    # Columnar copy of the orders and records needed for sales reports, held as
+    # NumPy arrays. New orders are appended past the order_id watermark; it is
+    # only reloaded in full when orders are edited or deleted, or after max_age.
+
+    def __init__(self, max_age):
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.versions = None
+        self.loaded_at = 0
+        self.watermark = None
+        self.orders = None
+        self.records = None
+
+    def refresh(self):
+        with self.lock:
+            # Versions are read before the rows, so a write committed in between
+            # is picked up again by the next refresh
+            versions = current_versions(SNAPSHOT_VERSIONS)
+            if versions == self.versions and time.time() - self.loaded_at < self.max_age:
+                return self
+
+            orders_version, rewrites_version, records_version = versions
+            if self.versions is None or rewrites_version != self.versions[1] or time.time() - self.loaded_at >= self.max_age:
+                self.watermark = None
+                self.orders = self.load_orders(None)
+                self.loaded_at = time.time()
+            elif orders_version != self.versions[0]:
+                new_orders = self.load_orders(self.watermark)
+                self.orders = {key: np.concatenate((self.orders[key], new_orders[key])) for key in self.orders}
+
+            if self.versions is None or records_version != self.versions[2]:
+                self.records = self.load_records()
+
+            self.versions = versions
+            return self
+
+    def load_orders(self, after):
+        columns = {"order_id": [], "record_id": [], "quantity": [], "day": [], "dated": []}
+        for batch in record_batches(Orders, after):
+            columns["order_id"].append(batch.column("order_id").to_numpy())
+            columns["record_id"].append(batch.column("record_id").to_numpy())
+            columns["quantity"].append(batch.column("quantity").fill_null(1).to_numpy())
+            # Days since the epoch, negative before 1970. Orders without a date are
+            # kept, flagged in the dated mask, and left out of reports.
+            order_date = batch.column("order_date")
+            columns["day"].append(order_date.cast(pa.int32()).fill_null(0).to_numpy())
+            columns["dated"].append(order_date.is_valid().to_numpy(zero_copy_only=False))
+            self.watermark = int(columns["order_id"][-1][-1])
+
+        dtypes = {"order_id": np.int64, "record_id": np.int64, "quantity": np.int64, "day": np.int32, "dated": np.bool_}
+        return {
+            key: np.concatenate(arrays).astype(dtypes[key]) if arrays else np.empty(0, dtype=dtypes[key])
+            for key, arrays in columns.items()
+        }
+
+    def load_records(self):
+        stmt = select(Records.record_id, Records.price, Records.genre, Records.artist).order_by(Records.record_id)
+        rows = db.session.execute(stmt).all()
+        table = pa.Table.from_pylist(
+            [{"record_id": r[0], "price": r[1], "genre": r[2], "artist": r[3]} for r in rows],
+            schema=pa.schema([
+                ("record_id", pa.int64()),
+                ("price", pa.decimal128(10, 2)),
+                ("genre", pa.string()),
+                ("artist", pa.string()),
+            ]),
+        )
+
+        records = {
+            "record_id": table.column("record_id").to_numpy(),
+            # Prices in cents, so revenue is summed exactly
+            "cents": pc.multiply(table.column("price"), pa.scalar(100)).cast(pa.int64()).to_numpy(),
+        }
+        for key in ("genre", "artist"):
+            encoded = table.column(key).combine_chunks().dictionary_encode()
+            records[key] = encoded.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+            records[f"{key}_names"] = encoded.dictionary.to_pylist()
+        return records
+
+
+def get_snapshot():
+    snapshot = current_app.extensions.get("sales_snapshot")
+    if snapshot is None:
+        snapshot = current_app.extensions["sales_snapshot"] = SalesSnapshot(current_app.config.get("REPORT_SNAPSHOT_MAX_AGE", 3600))
+    return snapshot.refresh()
+
+
+def cents(value):
+    return f"{int(value) // 100}.{int(value) % 100:02d}"
+
+
+def sales_report(group_by, start=None, end=None, window=DEFAULT_ROLLING_DAYS):
+    snapshot = get_snapshot()
+    orders, records = snapshot.orders, snapshot.records
+
+    # Join each order to its record's price/genre/artist by binary search on the sorted record ids
+    position = np.searchsorted(records["record_id"], orders["record_id"])
+    position = np.minimum(position, max(len(records["record_id"]) - 1, 0))
+    known = (records["record_id"][position] == orders["record_id"]) if len(records["record_id"]) else np.zeros(len(position), dtype=bool)
+
+    selected = known & orders["dated"]
+    if start is not None:
+        selected &= orders["day"] >= to_day(start)
+    if end is not None:
+        selected &= orders["day"] <= to_day(end)
+
+    days = orders["day"][selected]
+    quantity = orders["quantity"][selected]
+    position = position[selected]
+    revenue = quantity * records["cents"][position]
+
+    totals = {"orders": int(len(days)), "units": int(quantity.sum()), "revenue": cents(revenue.sum())}
+
+    if group_by == "day":
+        groups = day_groups(days, quantity, revenue, start, end, window)
+    else:
+        codes = records[group_by][position]
+        names = records[f"{group_by}_names"]
+        groups = label_groups(group_by, codes, names, quantity, revenue)
+
+    return {
+        "group_by": group_by,
+        "from": start.isoformat() if start else None,
+        "to": end.isoformat() if end else None,
+        "undated_orders": int((~orders["dated"]).sum()),
+        "totals": totals,
+        "groups": groups,
+    }
+
+
+def day_groups(days, quantity, revenue, start, end, window):
+    if len(days) == 0 and (start is None or end is None):
+        return []
+
+    # Dense day axis, so days without orders show as zero and rolling windows line up
+    first = to_day(start) if start is not None else int(days.min())
+    last = to_day(end) if end is not None else int(days.max())
+    offsets = days - first
+    length = last - first + 1
+    # A single bound is capped too: the open end runs to the first or last order
+    if (start is not None or end is not None) and length > MAX_REPORT_DAYS:
+        raise QueryArgumentError(f"A day report covers at most {MAX_REPORT_DAYS} days.")
+
+    order_counts = np.bincount(offsets, minlength=length)
+    units = np.bincount(offsets, weights=quantity, minlength=length).astype(np.int64)
+    revenue = np.bincount(offsets, weights=revenue, minlength=length).astype(np.int64)
+
+    # Trailing sums over the last `window` days from running totals
+    rolling_units = np.cumsum(units)
+    rolling_units[window:] = rolling_units[window:] - rolling_units[:-window]
+    rolling_revenue = np.cumsum(revenue)
+    rolling_revenue[window:] = rolling_revenue[window:] - rolling_revenue[:-window]
+
+    return [
+        {
+            "day": from_day(first + offset),
+            "orders": int(order_counts[offset]),
+            "units": int(units[offset]),
+            "revenue": cents(revenue[offset]),
+            f"units_{window}d": int(rolling_units[offset]),
+            f"revenue_{window}d": cents(rolling_revenue[offset]),
+        }
+        for offset in range(length)
+    ]
+
+
+def label_groups(group_by, codes, names, quantity, revenue):
+    # Code -1 stands for a record without a genre/artist; shifted to bin 0
+    bins = codes + 1
+    length = len(names) + 1
+    order_counts = np.bincount(bins, minlength=length)
+    units = np.bincount(bins, weights=quantity, minlength=length).astype(np.int64)
+    revenue = np.bincount(bins, weights=revenue, minlength=length).astype(np.int64)
+
+    labels = [None] + names
+    # Highest revenue first
+    ordered = sorted(np.flatnonzero(order_counts), key=lambda index: (-revenue[index], str(labels[index])))
+    return [
+        {group_by: labels[index], "orders": int(order_counts[index]), "units": int(units[index]), "revenue": cents(revenue[index])}
+        for index in ordered
+    ]
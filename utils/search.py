@@ -0,0 +1,118 @@
+import re
+from sqlalchemy import inspect, text, column, Integer, or_  # type: ignore
+from init import db
+from models.records import Records
+
+# FTS5 trigram queries need at least three characters to use the index
+MIN_TRIGRAM_LENGTH = 3
+
+# Results returned by /records/search
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# Minimum pg_trgm word similarity for a typo-tolerant match
+MIN_SIMILARITY = 0.3
+
+# Whether a search table exists, per engine and table name
+_search_tables = {}
+
+
+def has_table(name):
+    engine = db.engine
+    key = (engine, name)
+    if key not in _search_tables:
+        _search_tables[key] = inspect(engine).has_table(name)
+    return _search_tables[key]
+
+
+def has_trigram_table():
+    return db.engine.dialect.name == "sqlite" and has_table("records_trgm")
+
+
+def contains(model_column, term):
+    # Case-insensitive substring match on a records column.
+    # Postgres answers ilike('%x%') from the pg_trgm GIN index; on SQLite the
+    # match is looked up in the records_trgm FTS5 table instead of scanning records.
+    if has_trigram_table() and len(term) >= MIN_TRIGRAM_LENGTH:
+        matches = text(f"SELECT rowid FROM records_trgm WHERE {model_column.key} LIKE :term")
+        matches = matches.bindparams(term=f"%{term}%").columns(column("rowid", Integer))
+        return model_column.table.c.record_id.in_(matches)
+    return model_column.ilike(f"%{term}%")
+
+
+def tokenize(query):
+    return re.findall(r"\w+", query.lower())
+
+
+def search_record_ids(query, limit):
+    # Ranked record ids for a search query: prefix matches on title/artist/genre
+    # first, then typo-tolerant trigram matches to fill up the remaining slots
+    words = tokenize(query)
+    if not words:
+        return []
+
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        ids = postgres_prefix_search(words, limit)
+        if len(ids) < limit:
+            ids += [i for i in postgres_similar_search(query, limit) if i not in ids]
+    elif dialect == "sqlite" and has_table("records_fts"):
+        ids = sqlite_prefix_search(words, limit)
+        if len(ids) < limit and has_table("records_trgm"):
+            ids += [i for i in sqlite_similar_search(words, limit) if i not in ids]
+    else:
+        # No precomputed search structure - fall back to an unranked substring match
+        conditions = [contains(field, word) for word in words for field in (Records.title, Records.artist, Records.genre)]
+        ids = list(db.session.scalars(db.select(Records.record_id).where(or_(*conditions)).limit(limit)))
+
+    return ids[:limit]
+
+
+def postgres_prefix_search(words, limit):
+    # Every word must match as a prefix; ts_rank uses the title/artist/genre weights
+    ts_query = " & ".join(f"{word}:*" for word in words)
+    stmt = text(
+        "SELECT record_id FROM records, to_tsquery('simple', :ts_query) AS query "
+        "WHERE search_vector @@ query "
+        "ORDER BY ts_rank(search_vector, query) DESC, record_id LIMIT :limit"
+    )
+    return list(db.session.scalars(stmt, {"ts_query": ts_query, "limit": limit}))
+
+
+def postgres_similar_search(query, limit):
+    # <% uses the pg_trgm GIN indexes on title/artist/genre
+    stmt = text(
+        "SELECT record_id FROM records "
+        "WHERE :query <% title OR :query <% artist OR :query <% genre "
+        "ORDER BY greatest(word_similarity(:query, title), word_similarity(:query, artist), "
+        "word_similarity(:query, coalesce(genre, ''))) DESC, record_id LIMIT :limit"
+    )
+    db.session.execute(
+        text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+        {"threshold": str(MIN_SIMILARITY)},
+    )
+    return list(db.session.scalars(stmt, {"query": query, "limit": limit}))
+
+
+def sqlite_prefix_search(words, limit):
+    # bm25 ranks lower-is-better; title and artist weighted above genre
+    match = " AND ".join(f'"{word}"*' for word in words)
+    stmt = text(
+        "SELECT rowid FROM records_fts WHERE records_fts MATCH :match "
+        "ORDER BY bm25(records_fts, 10.0, 10.0, 5.0), rowid LIMIT :limit"
+    )
+    return list(db.session.scalars(stmt, {"match": match, "limit": limit}))
+
+
+def sqlite_similar_search(words, limit):
+    # Match on any shared trigram and rank by how many of them overlap,
+    # so a misspelt word still finds the records that are close to it
+    trigrams = {word[i:i + 3] for word in words if len(word) >= MIN_TRIGRAM_LENGTH for i in range(len(word) - 2)}
+    if not trigrams:
+        return []
+    match = " OR ".join(f'"{trigram}"' for trigram in sorted(trigrams))
+    stmt = text(
+        "SELECT rowid FROM records_trgm WHERE records_trgm MATCH :match "
+        "ORDER BY bm25(records_trgm, 10.0, 10.0, 5.0), rowid LIMIT :limit"
+    )
+    return list(db.session.scalars(stmt, {"match": match, "limit": limit}))
@@ -0,0 +1,113 @@
+import re
+import orjson  # type: ignore
+from flask.json.provider import DefaultJSONProvider  # type: ignore
+from marshmallow import fields  # type: ignore
+from sqlalchemy import types  # type: ignore
+
+# orjson leaves dates, datetimes and dataclasses to the provider's default(), as Flask's encoder does
+ORJSON_OPTIONS = (
+    orjson.OPT_SORT_KEYS
+    | orjson.OPT_NON_STR_KEYS
+    | orjson.OPT_PASSTHROUGH_DATETIME
+    | orjson.OPT_PASSTHROUGH_DATACLASS
+)
+
+# Characters the stdlib encoder escapes with ensure_ascii but orjson writes as UTF-8
+NON_ASCII_BYTES = re.compile(rb"[\x7f-\xff]")
+NON_ASCII = re.compile(r"[\x7f-\U0010ffff]")
+
+# orjson writes 1e16 / 1.5e-7 where the stdlib writes 1e+16 / 1.5e-07
+EXPONENT = re.compile(rb"[0-9]e-?[0-9]")
+
+
+def escape_non_ascii(match):
+    code = ord(match.group())
+    if code < 0x10000:
+        return f"\\u{code:04x}"
+    code -= 0x10000
+    return f"\\u{0xd800 | (code >> 10):04x}\\u{0xdc00 | (code & 0x3ff):04x}"
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    # Encodes compact responses with orjson. The bytes are the same as Flask's
+    # json.dumps(sort_keys=True, ensure_ascii=True) output; payloads orjson
+    # can't encode, or with exponent floats, go through the stdlib encoder.
+
+    def dumps_compact(self, obj):
+        try:
+            data = orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS)
+        except TypeError:
+            data = None
+
+        if data is None or not self.sort_keys or EXPONENT.search(data):
+            # The base class's dumps, so a subclass timing dumps() doesn't count this call twice
+            return DefaultJSONProvider.dumps(self, obj, separators=(",", ":")).encode()
+        if self.ensure_ascii and NON_ASCII_BYTES.search(data):
+            return NON_ASCII.sub(escape_non_ascii, data.decode()).encode()
+        return data
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_compact(obj) + b"\n", mimetype=self.mimetype)
+
+
+# Generated row-to-dict functions, per schema class and field list
+row_serializers = {}
+
+
+def value_expression(field, column, index):
+    # Python expression for one dumped value, giving what the Marshmallow field
+    # plus Flask's encoder would produce for it
+    value = f"row[{index}]"
+    if type(field) is fields.Inferred:
+        # Inferred fields dump by value type - Decimals as they are (encoded as
+        # strings), dates and datetimes as ISO strings
+        if isinstance(column.type, types.Numeric) and column.type.asdecimal:
+            return f"(str({value}) if {value} is not None else None)"
+        if isinstance(column.type, (types.Date, types.DateTime)):
+            return f"({value}.isoformat() if {value} is not None else None)"
+        return value
+    if type(field) is fields.Date and field.format in (None, "iso"):
+        return f"({value}.isoformat() if {value} is not None else None)"
+    return None
+
+
+def row_serializer(schema, model):
+    # A function turning a column tuple into the dict schema.dump() gives for the
+    # same row, and the columns to select for it. None when the schema has fields
+    # other than plain columns (nested expansions, methods, ...).
+    key = (type(schema), tuple(schema.fields), model)
+    if key in row_serializers:
+        return row_serializers[key]
+
+    columns = []
+    items = []
+    for name, field in schema.fields.items():
+        column = model.__table__.columns.get(field.attribute or name)
+        expression = value_expression(field, column, len(columns)) if column is not None else None
+        if expression is None:
+            row_serializers[key] = None
+            return None
+        items.append(f"{field.data_key or name!r}: {expression}")
+        columns.append(getattr(model, column.key))
+
+    source = f"def to_dict(row):\n    return {{{', '.join(items)}}}\n"
+    namespace = {}
+    exec(compile(source, f"<row serializer {type(schema).__name__}>", "exec"), namespace)
+    row_serializers[key] = (namespace["to_dict"], columns)
+    return row_serializers[key]
+
+
+def column_select(stmt, schema):
+    # Swap the ORM entity of a select(Model) for the schema's columns. Returns
+    # (stmt, to_dict), or None when the fast path doesn't apply.
+    descriptions = stmt.column_descriptions
+    if len(descriptions) != 1 or descriptions[0]["entity"] is None or descriptions[0]["type"] is not descriptions[0]["entity"]:
+        return None
+    compiled = row_serializer(schema, descriptions[0]["entity"])
+    if compiled is None:
+        return None
+    to_dict, columns = compiled
+    return stmt.with_only_columns(*columns), to_dict
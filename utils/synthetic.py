@@ -0,0 +1,295 @@
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+import numpy as np  # type: ignore
+import pyarrow as pa  # type: ignore
+import pyarrow.compute as pc  # type: ignore
+import pyarrow.csv as pacsv  # type: ignore
+from init import db
+from models.customers import Customers
+from models.suppliers import Suppliers
+from models.records import Records, RECORDS_TRGM_SQLITE, RECORDS_FTS_SQLITE
+from models.inventory import Inventory
+from models.orders import Orders
+from utils.bulk import reset_pk_sequence
+from utils.inventory_summary import rebuild as rebuild_inventory_summary
+from utils.customer_stats import rebuild as rebuild_customer_stats
+from utils.versions import bump_versions
+from utils.search import has_table
+
+# Rows generated and loaded per chunk; each chunk is committed on its own
+SYNTHETIC_CHUNK_SIZE = 100000
+
+GENRES = ("rock", "pop", "jazz", "hiphop", "indie", "metal", "folk", "soul", "blues", "classical", "electronic", "country")
+
+TITLE_WORDS = (
+    "midnight", "blue", "river", "electric", "summer", "ghost", "golden", "city", "lights", "wild",
+    "heart", "static", "echo", "paper", "moon", "velvet", "broken", "radio", "silver", "highway",
+    "neon", "garden", "fire", "ocean", "dust", "northern", "dream", "machine", "sugar", "thunder",
+    "glass", "shadow", "crystal", "desert", "rain", "morning", "satellite", "honey", "stone", "wave",
+)
+
+ARTIST_WORDS = (
+    "The", "Black", "Young", "Royal", "Lonely", "Little", "Cosmic", "Lost", "Red", "Holy",
+    "Wolves", "Kings", "Sisters", "Boys", "Machines", "Arrows", "Owls", "Saints", "Tigers", "Ramblers",
+)
+
+# Orders are dated within this many days before END_DAY (2026-01-01, in days since the epoch)
+ORDER_DAYS = 3 * 365
+END_DAY = 20454
+
+# Share of orders placed without a customer
+GUEST_ORDER_SHARE = 0.1
+
+# SQLite full-text tables on records and the statements creating them and their triggers
+SQLITE_RECORDS_INDEXES = {"records_trgm": RECORDS_TRGM_SQLITE, "records_fts": RECORDS_FTS_SQLITE}
+
+
+def catalogue_sizes(scale):
+    # Row counts per table for a catalogue of `scale` records; inventory has 1.5 rows per record
+    return {
+        "suppliers": max(scale // 1000, 5),
+        "customers": max(scale // 10, 10),
+        "records": scale,
+        "orders": scale * 2,
+    }
+
+
+def next_id(model):
+    pk_column = model.__mapper__.primary_key[0]
+    return (db.session.scalar(db.select(db.func.max(pk_column))) or 0) + 1
+
+
+def id_column(start, count):
+    return pa.array(np.arange(start, start + count, dtype=np.int64))
+
+
+def prices(rng, count, low, high):
+    # Whole cents, so every price has two decimal places
+    return pa.array(rng.integers(low, high, count) / 100)
+
+
+def pick(words, indices):
+    return pc.take(pa.array(words), pa.array(indices))
+
+
+def suppliers_chunk(rng, start, count, ranges):
+    ids = id_column(start, count)
+    text_ids = ids.cast(pa.string())
+    return pa.table({
+        "supplier_id": ids,
+        "name": pc.binary_join_element_wise("supplier-", text_ids, ""),
+        "email": pc.binary_join_element_wise("supplier-", text_ids, "@example.com", ""),
+        "phone_number": pc.add(ids, 400000000),
+    })
+
+
+def customers_chunk(rng, start, count, ranges):
+    # Names and emails are derived from the id, so they are unique across chunks and workers
+    ids = id_column(start, count)
+    text_ids = ids.cast(pa.string())
+    street = pc.utf8_capitalize(pick(TITLE_WORDS, rng.integers(0, len(TITLE_WORDS), count)))
+    return pa.table({
+        "customer_id": ids,
+        "name": pc.binary_join_element_wise("customer-", text_ids, ""),
+        "email": pc.binary_join_element_wise("customer-", text_ids, "@example.com", ""),
+        "phone_number": pc.add(ids, 410000000),
+        "address": pc.binary_join_element_wise(pa.array(rng.integers(1, 1000, count)).cast(pa.string()), street, "st", " "),
+    })
+
+
+def records_chunk(rng, start, count, ranges):
+    # Titles of one to three words; about 20 records per artist
+    words = [pick(TITLE_WORDS, rng.integers(0, len(TITLE_WORDS), count)) for _ in range(3)]
+    length = rng.integers(1, 4, count)
+    words[1] = pc.if_else(pa.array(length >= 2), words[1], None)
+    words[2] = pc.if_else(pa.array(length >= 3), words[2], None)
+    title = pc.utf8_title(pc.binary_join_element_wise(*words, " ", null_handling="skip"))
+
+    artist_index = rng.integers(0, ranges["artists"], count)
+    artist = pc.binary_join_element_wise(
+        pick(ARTIST_WORDS, artist_index % len(ARTIST_WORDS)),
+        pick(ARTIST_WORDS, artist_index // len(ARTIST_WORDS) % len(ARTIST_WORDS)),
+        pa.array(artist_index).cast(pa.string()),
+        " ",
+    )
+    return pa.table({
+        "record_id": id_column(start, count),
+        "title": title,
+        "artist": artist,
+        "genre": pick(GENRES, rng.integers(0, len(GENRES), count)),
+        "price": prices(rng, count, 500, 4500),
+    })
+
+
+def inventory_chunk(rng, start, count, ranges):
+    # Stock for `count` records from `start`; one supplier for even record ids,
+    # two different suppliers for odd ones
+    record_ids = np.arange(start, start + count, dtype=np.int64)
+    first_supplier, supplier_count = ranges["suppliers"]
+    first = rng.integers(0, supplier_count, count)
+    second = (first + 1 + rng.integers(0, supplier_count - 1, count)) % supplier_count
+    paired = record_ids % 2 == 1
+
+    record_column = np.concatenate((record_ids, record_ids[paired]))
+    supplier_column = np.concatenate((first, second[paired])) + first_supplier
+    rows = len(record_column)
+    return pa.table({
+        "supplier_id": pa.array(supplier_column),
+        "record_id": pa.array(record_column),
+        "stock_quantity": pa.array(rng.integers(0, 501, rows)),
+        "price": prices(rng, rows, 200, 3000),
+    })
+
+
+def orders_chunk(rng, start, count, ranges):
+    first_record, record_count = ranges["records"]
+    first_customer, customer_count = ranges["customers"]
+    guest = rng.random(count) < GUEST_ORDER_SHARE
+    return pa.table({
+        "customer_id": pa.array(rng.integers(0, customer_count, count) + first_customer, mask=guest),
+        "record_id": pa.array(rng.integers(0, record_count, count) + first_record),
+        "order_date": pa.array((END_DAY - rng.integers(1, ORDER_DAYS + 1, count)).astype(np.int32)).cast(pa.date32()),
+        "quantity": pa.array(rng.integers(1, 4, count)),
+    })
+
+
+def copy_chunk(connection, table_name, table):
+    # Postgres: stream the chunk as CSV through COPY FROM STDIN
+    buffer = io.BytesIO()
+    pacsv.write_csv(table, buffer, pacsv.WriteOptions(include_header=False))
+    buffer.seek(0)
+    columns = ", ".join(table.column_names)
+    with connection.connection.driver_connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {table_name} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def executemany_chunk(connection, table_name, table):
+    # Other databases: one executemany of plain tuples; dates go in as ISO strings
+    columns = [
+        column.cast(pa.string()) if pa.types.is_date(column.type) else column
+        for column in table.columns
+    ]
+    placeholder = "?" if connection.dialect.paramstyle == "qmark" else "%s"
+    stmt = f"INSERT INTO {table_name} ({', '.join(table.column_names)}) VALUES ({', '.join(placeholder for _ in columns)})"
+    connection.exec_driver_sql(stmt, list(zip(*(column.to_pylist() for column in columns))))
+
+
+@contextmanager
+def sqlite_records_indexes_paused():
+    # The SQLite FTS triggers index records one row at a time; dropping them for
+    # the load and rebuilding each index once afterwards is several times faster
+    tables = [table for table in SQLITE_RECORDS_INDEXES if has_table(table)]
+    with db.engine.begin() as connection:
+        for table in tables:
+            for suffix in ("ai", "ad", "au"):
+                connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {table}_{suffix}")
+    try:
+        yield
+    finally:
+        with db.engine.begin() as connection:
+            for table in tables:
+                for statement in SQLITE_RECORDS_INDEXES[table]:
+                    connection.exec_driver_sql(statement)
+                connection.exec_driver_sql(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+
+
+def parallel_load(engine, workers):
+    # SQLite allows one writer at a time
+    return workers > 1 and engine.dialect.name != "sqlite"
+
+
+def load_table(table_name, make_chunk, total, first, ranges, seed, table_index, workers, chunk_size, done=(), on_chunk=None):
+    # Generate and load chunks in parallel. Each chunk has its own random stream,
+    # so the data does not depend on the number of workers. Chunks listed in done
+    # were loaded by an earlier run and are skipped; on_chunk(connection, index, rows)
+    # runs in each chunk's transaction.
+    # Resolved here, as the pool threads run outside the app context
+    engine = db.engine
+    write_chunk = copy_chunk if engine.dialect.driver == "psycopg2" else executemany_chunk
+    starts = range(first, first + total, chunk_size)
+
+    def load(chunk_index, start):
+        if chunk_index in done:
+            return 0
+        rng = np.random.default_rng([seed, table_index, chunk_index])
+        table = make_chunk(rng, start, min(chunk_size, first + total - start), ranges)
+        with engine.begin() as connection:
+            write_chunk(connection, table_name, table)
+            if on_chunk:
+                on_chunk(connection, chunk_index, table.num_rows)
+        return table.num_rows
+
+    if not parallel_load(engine, workers):
+        return sum(load(index, start) for index, start in enumerate(starts))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(load, range(len(starts)), starts))
+
+
+def generate_catalogue(scale, seed=0, workers=1, chunk_size=SYNTHETIC_CHUNK_SIZE, progress=None, checkpoint=None, on_checkpoint=None):
+    # Deterministic synthetic catalogue: the same scale and seed always produce the
+    # same rows. Rows are appended after the current maximum id of each table, and
+    # foreign keys only point at rows generated in the same run.
+    #
+    # With on_checkpoint(connection, state), every chunk's transaction also records
+    # state - the id ranges and the chunks loaded so far. Passing that state back
+    # as checkpoint resumes an interrupted run without loading any chunk twice.
+    sizes = catalogue_sizes(scale)
+    state = checkpoint or {"ranges": {"artists": max(scale // 20, 1)}, "chunks": {}, "rows": 0}
+    ranges = state["ranges"]
+    lock = threading.Lock()
+    results = {}
+    started = time.perf_counter()
+
+    tables = (
+        ("suppliers", Suppliers, suppliers_chunk, sizes["suppliers"]),
+        ("customers", Customers, customers_chunk, sizes["customers"]),
+        ("records", Records, records_chunk, sizes["records"]),
+        ("inventory", Inventory, inventory_chunk, sizes["records"]),
+        ("orders", Orders, orders_chunk, sizes["orders"]),
+    )
+    for table_index, (table_name, model, make_chunk, total) in enumerate(tables):
+        # Inventory chunks are ranges of the new record ids; its own ids come from the database
+        if table_name in ranges:
+            first = ranges[table_name][0]
+        else:
+            first = ranges["records"][0] if table_name == "inventory" else next_id(model)
+        db.session.commit()
+        ranges[table_name] = (first, total)
+        done = state["chunks"].setdefault(table_name, [])
+
+        def on_chunk(connection, chunk_index, rows):
+            with lock:
+                done.append(chunk_index)
+                state["rows"] += rows
+                if on_checkpoint:
+                    on_checkpoint(connection, state)
+
+        table_started = time.perf_counter()
+        paused = sqlite_records_indexes_paused() if table_name == "records" and db.engine.dialect.name == "sqlite" else nullcontext()
+        with paused:
+            rows = load_table(table_name, make_chunk, total, first, ranges, seed, table_index, workers, chunk_size, set(done), on_chunk)
+        elapsed = time.perf_counter() - table_started
+
+        reset_pk_sequence(model, model.__mapper__.primary_key[0])
+        db.session.commit()
+        results[table_name] = {"rows": rows, "seconds": round(elapsed, 3), "rows_per_second": round(rows / elapsed) if elapsed else None}
+        if progress:
+            progress(table_name, results[table_name])
+
+    # The chunks were written outside the session, so the table versions are bumped here
+    with db.engine.begin() as connection:
+        bump_versions(connection, [table_name for table_name, *_ in tables])
+    rebuild_inventory_summary()
+    rebuild_customer_stats()
+
+    elapsed = time.perf_counter() - started
+    total_rows = sum(result["rows"] for result in results.values())
+    return {
+        "tables": results,
+        "rows": total_rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(total_rows / elapsed) if elapsed else None,
+    }
@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import threading
+from functools import wraps
+from flask import current_app, request  # type: ignore
+from sqlalchemy import BigInteger, cast, delete, event, func, select, union_all, update, insert  # type: ignore
+from init import db
+from models.table_versions import TableVersions, TableVersionLog
+from utils.expand import expanded_table_names
+
+# Tables emptied by ON DELETE CASCADE when a row of the key table is deleted
+DELETE_CASCADES = {
+    "customers": ("orders",),
+    "suppliers": ("inventory",),
+}
+
+# Suffix of a second version per table, bumped only when existing rows are
+# updated or deleted - readers that append new rows past a primary key
+# watermark (the sales report snapshot) rescan when it changes
+REWRITES_SUFFIX = ":rewrites"
+
+# Version log rows this process appends before it folds the log into table_versions
+VERSION_LOG_COMPACT_EVERY = 1000
+
+logger = logging.getLogger(__name__)
+
+versions_table = TableVersions.__table__
+log_table = TableVersionLog.__table__
+
+# Log rows appended by this process since its last compaction, and the tables they were for
+_appended = {"rows": 0, "tables": set()}
+_appended_lock = threading.Lock()
+
+
+def bump_versions(connection, table_names):
+    # Append one log row per table in the writer's transaction. Unlike updating
+    # a counter row, an insert takes no lock another writer to the table waits on.
+    rows = [{"table_name": table_name} for table_name in sorted(table_names)]
+    connection.execute(insert(log_table), rows)
+    with _appended_lock:
+        _appended["rows"] += len(rows)
+        _appended["tables"].update(table_names)
+
+
+def compact_versions(connection, table_names):
+    # Fold the committed log rows of the tables into their base versions. A
+    # reader's single statement sees the log rows or the raised base, never
+    # both or neither, so versions don't move. Rows of transactions still open
+    # aren't deleted and count once they commit.
+    for table_name in sorted(table_names):
+        folded = connection.execute(delete(log_table).where(log_table.c.table_name == table_name)).rowcount
+        if not folded:
+            continue
+        stmt = (
+            update(versions_table)
+            .where(versions_table.c.table_name == table_name)
+            .values(version=versions_table.c.version + folded)
+        )
+        if connection.execute(stmt).rowcount == 0:
+            connection.execute(insert(versions_table).values(table_name=table_name, version=folded))
+
+
+def maybe_compact_versions(session):
+    # Every VERSION_LOG_COMPACT_EVERY appended rows, in a short transaction of its
+    # own after the write has committed. A failure only leaves the log longer.
+    with _appended_lock:
+        if _appended["rows"] < VERSION_LOG_COMPACT_EVERY:
+            return
+        table_names = _appended["tables"]
+        _appended["rows"], _appended["tables"] = 0, set()
+    try:
+        with db.engine.begin() as connection:
+            compact_versions(connection, table_names)
+    except Exception:
+        logger.warning("Compacting the table version log failed", exc_info=True)
+
+
+def with_cascades(table_name):
+    return {table_name, *DELETE_CASCADES.get(table_name, ())}
+
+
+def rewrites(table_name):
+    return f"{table_name}{REWRITES_SUFFIX}"
+
+
+def changed_tables(session):
+    return session.info.setdefault("changed_tables", set())
+
+
+def track_flush(session, flush_context):
+    # ORM writes - add/delete/attribute changes flushed by the session
+    table_names = changed_tables(session)
+    table_names.update(obj.__table__.name for obj in session.new)
+    for obj in session.dirty:
+        table_names.update((obj.__table__.name, rewrites(obj.__table__.name)))
+    for obj in session.deleted:
+        for table_name in with_cascades(obj.__table__.name):
+            table_names.update((table_name, rewrites(table_name)))
+
+
+def track_statement(orm_execute_state):
+    # Set-based writes - insert()/update()/delete() statements run through the session
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table_name = orm_execute_state.statement.table.name
+    if orm_execute_state.is_insert:
+        changed_tables(orm_execute_state.session).add(table_name)
+        return
+    table_names = with_cascades(table_name) if orm_execute_state.is_delete else {table_name}
+    changed_tables(orm_execute_state.session).update(table_names | {rewrites(name) for name in table_names})
+
+
+def publish_versions(session):
+    # Bumped in the writer's transaction just before it commits, so a table's
+    # version changes if and only if its data does. Flushed first, as the
+    # commit's own flush runs after this.
+    session.flush()
+    table_names = session.info.pop("changed_tables", set())
+    table_names.difference_update((versions_table.name, log_table.name))
+    if table_names:
+        bump_versions(session.connection(bind_arguments={"bind": db.engine}), table_names)
+
+
+def discard_versions(session):
+    session.info.pop("changed_tables", None)
+
+
+def init_versions(app):
+    # Track the tables each transaction writes and bump their versions as it commits
+    if not event.contains(db.session, "after_flush", track_flush):
+        event.listen(db.session, "after_flush", track_flush)
+        event.listen(db.session, "do_orm_execute", track_statement)
+        event.listen(db.session, "before_commit", publish_versions)
+        event.listen(db.session, "after_commit", maybe_compact_versions)
+        event.listen(db.session, "after_rollback", discard_versions)
+
+
+def versions_select(table_names):
+    # Base version plus log rows per table, in one statement so a concurrent compaction isn't seen halfway
+    parts = union_all(
+        select(versions_table.c.table_name, versions_table.c.version.label("version"))
+        .where(versions_table.c.table_name.in_(table_names)),
+        select(log_table.c.table_name, func.count().label("version"))
+        .where(log_table.c.table_name.in_(table_names))
+        .group_by(log_table.c.table_name),
+    ).subquery()
+    return select(parts.c.table_name, cast(func.sum(parts.c.version), BigInteger)).group_by(parts.c.table_name)
+
+
+def current_versions(table_names):
+    versions = dict(db.session.execute(versions_select(table_names)).all())
+    return [versions.get(table_name, 0) for table_name in table_names]
+
+
+def version_etag(read_tables, versions, full_path):
+    tag_source = f"{','.join(read_tables)}:{versions}:{full_path}"
+    return hashlib.sha1(tag_source.encode()).hexdigest()
+
+
+def conditional(*table_names):
+    # Strong ETag from the versions of the tables a view reads plus its full path
+    # (so each pagination cursor gets its own tag). A matching If-None-Match
+    # returns 304 without running the view's query or serialization.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # A POST body isn't part of the tag
+            if request.method not in ("GET", "HEAD"):
+                return view(*args, **kwargs)
+
+            # ?expand= pulls in related tables, whose versions count too
+            read_tables = list(table_names) + [name for name in expanded_table_names(table_names[0]) if name not in table_names]
+            etag = version_etag(read_tables, current_versions(read_tables), request.full_path)
+
+            if request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                return response
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+        return wrapper
+    return decorator